@@ -0,0 +1,147 @@
+# archive.py
+# Archivo de OTs cerradas: las que cerraron hace más de ARCHIVE_AFTER_DAYS días pasan
+# de `ots` a `ots_archive` en lotes (INSERT ... SELECT + DELETE, un commit por lote),
+# así el tablero de pendientes, los cierres y los índices de ots trabajan sobre una tabla chica.
+# Las archivadas se siguen viendo en GET /ots/{id}, /ots/, /admin/ots/closed, /ots/export
+# y en los rollups.
+#
+# Variables de entorno:
+#   ARCHIVE_AFTER_DAYS=90        antigüedad (por fecha de cierre) a partir de la cual se archiva
+#   ARCHIVE_BATCH_SIZE=1000      OTs por transacción
+#   ARCHIVE_INTERVAL_S=0         cada cuánto lo corre la app en segundo plano; 0 = solo a mano
+#
+# Uso:
+#   python archive.py                           (con los valores de arriba)
+#   python archive.py --days 30 --batch-size 5000
+#   python archive.py --dry-run                 (solo cuenta las que se moverían)
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, func, literal, select
+
+import metrics
+import models
+from database import dialect_insert
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL_S = float(os.getenv("ARCHIVE_INTERVAL_S", "0"))
+
+# columnas de ots, en el mismo orden en las dos tablas
+COLUMNS = tuple(c.name for c in models.OT.__table__.columns)
+
+log = logging.getLogger("archive")
+
+
+def cutoff_for(days, now=None):
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+
+def _archivable(cutoff, newest):
+    ot = models.OT
+    criteria = [ot.pendiente == False, ot.fin < cutoff]
+    if newest is not None:
+        # la OT con el mayor id nunca se archiva: en SQLite (sin AUTOINCREMENT) el próximo
+        # alta reusaría su id y chocaría con la archivada
+        criteria.append(ot.id < newest)
+    return criteria
+
+
+def count_archivable(db, cutoff):
+    newest = db.execute(select(func.max(models.OT.id))).scalar()
+    return db.execute(select(func.count()).select_from(models.OT)
+                      .where(*_archivable(cutoff, newest))).scalar()
+
+
+def _move_batch(db, criteria, batch_size, now):
+    """
+    Mueve hasta batch_size OTs (las de menor id que cumplen criteria). El lote se
+    delimita con `id <= último id`, así INSERT y DELETE usan las mismas condiciones
+    sin listas de parámetros. No hace commit. Devuelve cuántas se movieron.
+    """
+    ot = models.OT
+    # FOR UPDATE (Postgres): nadie reabre / edita el lote entre el INSERT y el DELETE
+    ids = db.execute(select(ot.id).where(*criteria).order_by(ot.id).limit(batch_size)
+                     .with_for_update()).scalars().all()
+    if not ids:
+        return 0
+    batch = criteria + [ot.id <= ids[-1]]
+    src = models.OT.__table__
+    rows = select(*[src.c[c] for c in COLUMNS], literal(now, DateTime)).where(*batch)
+    # DO NOTHING: si otro proceso ya archivó alguna (dos workers a la vez), solo falta borrarla
+    ins = dialect_insert(db, models.OTArchive.__table__)
+    db.execute(ins.from_select(COLUMNS + ("archived_at",), rows).on_conflict_do_nothing())
+    return db.execute(src.delete().where(*batch)).rowcount
+
+
+def archive_closed(db, days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None, dry_run=False):
+    """
+    Archiva las OTs cerradas con fin < ahora - days, un commit por lote. Los rollups
+    no cambian (cuentan también las archivadas). Devuelve el reporte de la corrida.
+    """
+    if days < 0 or batch_size < 1:
+        raise ValueError("days >= 0 y batch_size >= 1")
+    t0 = time.perf_counter()
+    now = datetime.utcnow()
+    cutoff = cutoff_for(days, now)
+    moved = batches = 0
+    if not dry_run:
+        # un SELECT / INSERT / DELETE por lote: no es un N+1 del request que lo dispara
+        metrics.batched_request()
+        newest = db.execute(select(func.max(models.OT.id))).scalar()
+        criteria = _archivable(cutoff, newest)
+        while max_batches is None or batches < max_batches:
+            n = _move_batch(db, criteria, batch_size, now)
+            db.commit()
+            if not n:
+                break
+            moved += n
+            batches += 1
+    remaining = count_archivable(db, cutoff)
+    db.rollback()
+    report = {
+        "moved": moved,
+        "batches": batches,
+        "remaining": remaining,
+        "cutoff": cutoff,
+        "days": days,
+        "batch_size": batch_size,
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    if moved:
+        log.info("archivadas %d OTs (cierre < %s) en %d lotes, %.1fs", moved, cutoff, batches, report["seconds"])
+    return report
+
+
+def run(**kwargs):
+    """archive_closed con una sesión propia (CLI y tarea periódica de la app)."""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return archive_closed(db, **kwargs)
+    finally:
+        db.close()
+
+
+def get_ot(db, ot_id):
+    """OT por id: primero en ots, después en ots_archive. None si no existe."""
+    return db.get(models.OT, ot_id) or db.get(models.OTArchive, ot_id)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mueve a ots_archive las OTs cerradas hace más de N días")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, help="corta después de N lotes (el resto queda para la próxima)")
+    parser.add_argument("--dry-run", action="store_true", help="no mueve nada, solo cuenta")
+    args = parser.parse_args()
+
+    r = run(days=args.days, batch_size=args.batch_size, max_batches=args.max_batches, dry_run=args.dry_run)
+    print(f"Archivadas: {r['moved']} OTs en {r['batches']} lotes ({r['seconds']}s); "
+          f"cerradas antes de {r['cutoff']:%Y-%m-%d %H:%M} que quedan en ots: {r['remaining']}")
@@ -0,0 +1,191 @@
+# assets.py
+# Estáticos y pantallas HTML pensados para los técnicos con conexiones lentas:
+#   - /static: al arrancar se lee cada archivo de static/, se calcula un hash del contenido
+#     y se guardan en memoria las versiones gzip (y brotli, si está instalado). Las URLs con
+#     hash que ponen los templates con asset_url() (/static/js/assign_ot.<hash>.js) se sirven
+#     con Cache-Control immutable por un año: el navegador no las vuelve a pedir hasta que
+#     cambia el contenido, y con él la URL. La ruta sin hash sigue andando, con ETag.
+#   - pantallas (home, técnicos, asignar OT, admin): el HTML no depende del request, así que
+#     se renderiza una vez, se comprime y se sirve con ETag (304 si el navegador ya lo tiene).
+# La codificación se elige por Accept-Encoding (br > gzip > sin comprimir), con Vary.
+#
+# Variables de entorno:
+#   STATIC_BUILD=1      0 = desarrollo: archivos leídos de disco y templates renderizados en cada hit
+#
+# Uso (manifiesto de URLs con hash):
+#   python assets.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from http_cache import etag_matches
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_BUILD = os.getenv("STATIC_BUILD", "1") not in ("0", "false", "no")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 256
+HASH_LEN = 16
+_HASHED = re.compile(r"^(?P<stem>.+)\.[0-9a-f]{%d}(?P<ext>\.[^./]+)$" % HASH_LEN)
+
+
+class Asset:
+    """Contenido en memoria con su hash y sus versiones comprimidas (solo si achican)."""
+    __slots__ = ("body", "media_type", "hash", "encoded")
+
+    def __init__(self, body, media_type):
+        self.body = body
+        self.media_type = media_type
+        self.hash = hashlib.blake2b(body, digest_size=HASH_LEN // 2).hexdigest()
+        self.encoded = {}   # "br" / "gzip" -> bytes
+        if len(body) >= MIN_COMPRESS_SIZE and media_type.startswith(COMPRESSIBLE):
+            if brotli is not None:
+                self._keep("br", brotli.compress(body, quality=11))
+            self._keep("gzip", gzip.compress(body, compresslevel=9, mtime=0))
+
+    def _keep(self, encoding, data):
+        if len(data) < len(self.body):
+            self.encoded[encoding] = data
+
+    def etag(self, encoding=None):
+        return f'"{self.hash}-{encoding}"' if encoding else f'"{self.hash}"'
+
+
+def choose_encoding(accept_encoding, available):
+    """br > gzip entre las que el cliente acepta (q > 0). None = sin comprimir."""
+    if not accept_encoding or not available:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def asset_response(asset, request_headers, cache_control):
+    """200 con la mejor codificación aceptada, o 304 si If-None-Match coincide con esa versión."""
+    encoding = choose_encoding(request_headers.get("accept-encoding"), asset.encoded)
+    headers = {"ETag": asset.etag(encoding), "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    inm = request_headers.get("if-none-match")
+    if inm is not None and etag_matches(inm, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    body = asset.encoded[encoding] if encoding else asset.body
+    return Response(body, media_type=asset.media_type, headers=headers)
+
+
+def _media_type(filename):
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles que sirve desde memoria lo que había al arrancar (con y sin hash en la URL).
+    Lo que no está en memoria (archivos nuevos, 404) lo resuelve StaticFiles como siempre.
+    """
+    def __init__(self, directory, prefix="/static", build=STATIC_BUILD, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.prefix = prefix.rstrip("/")
+        self.assets = {}   # "js/assign_ot.js" -> Asset
+        if build:
+            self.build()
+
+    def build(self):
+        root = str(self.directory)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                rel = os.path.relpath(full, root).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    self.assets[rel] = Asset(f.read(), _media_type(filename))
+        return self.assets
+
+    def url(self, path):
+        """URL con hash para los templates (asset_url); sin build, la ruta tal cual."""
+        asset = self.assets.get(path)
+        if asset is None:
+            return f"{self.prefix}/{path}"
+        stem, ext = posixpath.splitext(path)
+        return f"{self.prefix}/{stem}.{asset.hash}{ext}"
+
+    def manifest(self):
+        return {path: self.url(path) for path in sorted(self.assets)}
+
+    async def get_response(self, path, scope):
+        if self.assets and scope["method"] in ("GET", "HEAD"):
+            rel = path.replace(os.sep, "/")
+            headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+            m = _HASHED.match(rel)
+            if m:
+                asset = self.assets.get(m["stem"] + m["ext"])
+                if asset is not None:
+                    # hash viejo (HTML de antes de un deploy): se sirve lo actual, pero sin immutable
+                    fresh = rel == f"{m['stem']}.{asset.hash}{m['ext']}"
+                    return asset_response(asset, headers, IMMUTABLE if fresh else REVALIDATE)
+            asset = self.assets.get(rel)
+            if asset is not None:
+                return asset_response(asset, headers, REVALIDATE)
+        return await super().get_response(path, scope)
+
+
+class PageCache:
+    """
+    HTML de las pantallas renderizado una vez (no depende del request) y servido con
+    ETag + compresión. Con enabled=False se renderiza en cada hit (desarrollo).
+    """
+    def __init__(self, templates, enabled=STATIC_BUILD):
+        self.templates = templates
+        self.enabled = enabled
+        self._pages = {}
+
+    def render(self, name):
+        page = self._pages.get(name) if self.enabled else None
+        if page is None:
+            html = self.templates.get_template(name).render()
+            page = Asset(html.encode("utf-8"), "text/html; charset=utf-8")
+            if self.enabled:
+                self._pages[name] = page
+        return page
+
+    def prerender(self, *names):
+        for name in names:
+            self.render(name)
+
+    def response(self, request, name):
+        return asset_response(self.render(name), request.headers, REVALIDATE)
+
+
+if __name__ == "__main__":
+    static = PrecompressedStaticFiles(directory="static", build=True)
+    for path, url in static.manifest().items():
+        a = static.assets[path]
+        sizes = ", ".join(f"{enc} {len(data)}" for enc, data in sorted(a.encoded.items()))
+        print(f"{url}  ({len(a.body)} bytes{'; ' + sizes if sizes else ''})")
+    if brotli is None:
+        print("(brotli no instalado: solo gzip)")
@@ -0,0 +1,10 @@
+# benchmarks/
+# Suite de carga reproducible (se corre desde la raíz del repo):
+#
+#   1) BD sintética:   python -m benchmarks.generate --url sqlite:///./bench.db --materials 100000 --tecnicos 500 --ots 1000000
+#   2) servidor:       DATABASE_URL=sqlite:///./bench.db DB_AUTO_MIGRATE=0 uvicorn main:app --port 8000
+#   3) carga:          python -m benchmarks.load --url http://127.0.0.1:8000 --users 20 --duration 60
+#   4) comparar:       python -m benchmarks.report compare benchmarks/results/A.json benchmarks/results/B.json
+#
+# Con el mismo --seed el dataset y la secuencia de requests de cada usuario virtual son
+# los mismos, así dos corridas sobre commits distintos se pueden comparar.
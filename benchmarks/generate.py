@@ -0,0 +1,200 @@
+# benchmarks/generate.py
+# Genera una BD sintética a escala configurable: materiales, técnicos y OTs con
+# proporciones realistas (las OTs viejas casi todas cerradas, las recientes pendientes;
+# algunos materiales y técnicos concentran la mayoría de las OTs).
+#
+# Uso:
+#   python -m benchmarks.generate --url sqlite:///./bench.db --materials 100000 --tecnicos 500 --ots 1000000
+#   python -m benchmarks.generate --url sqlite:///./bench.db --reset   (borra y vuelve a generar)
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+import models
+import ot_service
+import rollups
+import timeseries
+from database import Base, configure_engine, engine_options
+
+SAP_BASE = 41000000
+BATCH_SIZE = 5000
+
+TIPOS = ["AMPLIFICADOR RF", "NODO OPTICO", "FUENTE", "CONECTOR", "CABLE COAXIAL",
+         "DERIVADOR", "ECUALIZADOR", "MODULO RF", "TRANSMISOR", "RECEPTOR"]
+MARCAS = ["CISCO", "ARRIS", "AURORA", "HARMONIC", "MOTOROLA", "TEXSCAN", "S. ATLANTA", "COMMSCOPE"]
+PALABRAS = ["módulo", "nodo", "amplificador", "transmisor", "receptor", "fuente", "carcasa",
+            "ecualizador", "conector", "cable", "retorno", "directa", "segmentación", "óptico",
+            "GaN", "1GHZ", "1.2GHZ", "SC/APC", "85/102", "42/54", "fiber", "deep", "troncal", "bridger"]
+NOMBRES = ["Ana", "Bruno", "Carla", "Diego", "Elena", "Facundo", "Gabriela", "Hernán", "Inés", "Julián",
+           "Karina", "Lucas", "María", "Nicolás", "Olga", "Pablo", "Rocío", "Sergio", "Tamara", "Víctor"]
+APELLIDOS = ["Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez", "Romero", "Sosa", "Álvarez", "Torres"]
+
+
+def sap_code(i):
+    """SAP del material i (0..n-1); load.py usa el mismo esquema para elegir materiales existentes."""
+    return str(SAP_BASE + i)
+
+
+def _zipf_cum_weights(n, s=0.8):
+    # pocos elementos concentran muchas OTs (como los materiales / técnicos más usados)
+    total = 0.0
+    cum = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** s
+        cum.append(total)
+    return cum
+
+
+def _materials(rng, n):
+    for i in range(n):
+        tipo = rng.choice(TIPOS)
+        marca = rng.choice(MARCAS)
+        modelo = f"{rng.choice('ABCDEFGHKMNRS')}{rng.randint(100, 9999)}"
+        palabras = " ".join(rng.sample(PALABRAS, 4))
+        yield {
+            "sap": sap_code(i),
+            "breve_descripcion": f"{tipo[:8]} {marca} #{modelo}",
+            "descripcion": f"{tipo.capitalize()} {palabras}. - Marca: {marca.title()}, Modelo: {modelo}",
+            "marca": marca,
+            "tipo": tipo,
+            "created_at": datetime.utcnow(),
+        }
+
+
+def _tecnicos(n):
+    for i in range(n):
+        nombre = NOMBRES[i % len(NOMBRES)]
+        apellido = APELLIDOS[(i // len(NOMBRES)) % len(APELLIDOS)]
+        yield {"nombre": f"{nombre} {apellido} {i + 1:04d}"}
+
+
+def _ots(rng, n, n_materials, n_tecnicos, days, pending_ratio, proceso_ratio, unassigned_ratio):
+    """
+    OTs en orden cronológico (los ids crecen con inicio, como en producción).
+    P(pendiente) decae con la antigüedad: exp(-edad / tau), con tau elegido para
+    que la proporción total de pendientes quede cerca de pending_ratio.
+    """
+    now = datetime.utcnow()
+    span = days * 86400.0
+    tau = max(pending_ratio, 1e-6) * span
+    mat_w = _zipf_cum_weights(n_materials)
+    tec_w = _zipf_cum_weights(n_tecnicos, s=0.5) if n_tecnicos else None
+    mat_idx = range(n_materials)
+    tec_ids = range(1, n_tecnicos + 1)
+    offsets = sorted(rng.random() * span for _ in range(n))
+    for number, off in enumerate(offsets, start=1):
+        inicio = now - timedelta(seconds=span - off)
+        age = span - off
+        pendiente = rng.random() < math.exp(-age / tau)
+        fin = None
+        if not pendiente:
+            # tiempo de ciclo ~ lognormal, mediana 1 día
+            fin = min(inicio + timedelta(hours=rng.lognormvariate(math.log(24), 1.0)), now)
+        id_tecnico = None
+        if tec_w and rng.random() >= unassigned_ratio:
+            id_tecnico = rng.choices(tec_ids, cum_weights=tec_w)[0]
+        yield {
+            "id": number,
+            "id_ot": ot_service.format_id_ot(number),
+            "sap_id": sap_code(rng.choices(mat_idx, cum_weights=mat_w)[0]),
+            "id_tecnico": id_tecnico,
+            "cantidad": rng.choices((1, 2, 3, 4, 5, 10), weights=(60, 15, 10, 5, 5, 5))[0],
+            "inicio": inicio,
+            "fin": fin,
+            "pendiente": pendiente,
+            "procesoIntermedio": rng.random() < proceso_ratio,
+            "observaciones": rng.choice((None, None, None, "Urgente", "Reclamo cliente", "Revisar en sitio")),
+        }
+
+
+def _insert(eng, table, rows, label):
+    t0 = time.perf_counter()
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            with eng.begin() as conn:
+                conn.execute(table.insert(), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        with eng.begin() as conn:
+            conn.execute(table.insert(), batch)
+        count += len(batch)
+    dt = time.perf_counter() - t0
+    print(f"  {label}: {count} filas en {dt:.1f}s ({count / dt if dt else 0:.0f} filas/s)")
+    return count
+
+
+def reset(eng):
+    with eng.begin() as conn:
+        if eng.dialect.name == "sqlite":
+            conn.execute(text("DROP TABLE IF EXISTS materials_fts"))
+    Base.metadata.drop_all(bind=eng)
+
+
+def generate(url, materials=100000, tecnicos=500, ots=1000000, days=365, pending_ratio=0.08,
+             proceso_ratio=0.10, unassigned_ratio=0.05, seed=42, do_reset=False):
+    eng = configure_engine(create_engine(url, **engine_options(url)))
+    if do_reset:
+        reset(eng)
+    migrations.upgrade(eng)
+    with eng.connect() as conn:
+        if conn.execute(select(func.count()).select_from(models.Material.__table__)).scalar():
+            raise SystemExit("La BD ya tiene datos; usar --reset para regenerarla.")
+
+    rng = random.Random(seed)
+    t0 = time.perf_counter()
+    print(f"Generando en {url} (seed={seed})")
+    # con los triggers FTS activos cada material queda indexado al insertarse
+    _insert(eng, models.Material.__table__, _materials(rng, materials), "materials")
+    _insert(eng, models.Tecnico.__table__, _tecnicos(tecnicos), "tecnicos")
+    _insert(eng, models.OT.__table__,
+            _ots(rng, ots, materials, tecnicos, days, pending_ratio, proceso_ratio, unassigned_ratio), "ots")
+
+    with eng.begin() as conn:
+        conn.execute(models.OTCounter.__table__.delete())
+        conn.execute(models.OTCounter.__table__.insert(), {"name": ot_service.OT_COUNTER, "value": ots})
+        if eng.dialect.name == "postgresql" and ots:
+            # los ids de OT se insertaron explícitos: la secuencia tiene que seguir desde ahí
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('ots', 'id'), :n)"), {"n": ots})
+    db = sessionmaker(bind=eng)()
+    try:
+        rollups.rebuild(db)
+        timeseries.backfill(db)
+        r = db.get(models.OTRollup, ("all", ""))
+        totals = {c: getattr(r, c) for c in rollups.COUNTERS} if r else {}
+    finally:
+        db.close()
+    if eng.dialect.name == "sqlite":
+        with eng.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    print(f"Listo en {time.perf_counter() - t0:.1f}s: {totals}")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera una BD sintética para benchmarks")
+    parser.add_argument("--url", default="sqlite:///./bench.db", help="DATABASE_URL destino")
+    parser.add_argument("--materials", type=int, default=100000)
+    parser.add_argument("--tecnicos", type=int, default=500)
+    parser.add_argument("--ots", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365, help="días de historia de OTs")
+    parser.add_argument("--pending-ratio", type=float, default=0.08, help="proporción aproximada de OTs pendientes")
+    parser.add_argument("--proceso-ratio", type=float, default=0.10, help="proporción con procesoIntermedio")
+    parser.add_argument("--unassigned-ratio", type=float, default=0.05, help="proporción de OTs sin técnico")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="borra las tablas antes de generar")
+    args = parser.parse_args()
+    if args.materials < 1:
+        sys.exit("--materials debe ser >= 1")
+    generate(args.url, args.materials, args.tecnicos, args.ots, args.days, args.pending_ratio,
+             args.proceso_ratio, args.unassigned_ratio, args.seed, args.reset)
@@ -0,0 +1,215 @@
+# benchmarks/load.py
+# Driver de carga local: N usuarios virtuales (threads, conexión keep-alive cada uno)
+# que reproducen el tráfico de las pantallas:
+#   search   -> búsqueda SAP con debounce en assign_ot (/materials/suggest, a veces con texto)
+#   tecnicos -> carga del select de técnicos (con If-None-Match, como el navegador)
+#   create   -> alta de OT
+#   pending  -> tablero de admin (pending + closed + summary)
+#   close    -> cierre de una OT del tablero
+# Al final escribe el reporte JSON (benchmarks/report.py) y muestra la tabla.
+#
+# Uso:
+#   python -m benchmarks.load --url http://127.0.0.1:8000 --users 20 --duration 60
+#   python -m benchmarks.load --mix search=50,tecnicos=10,create=15,pending=20,close=5 --out run.json
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks import report
+from benchmarks.generate import PALABRAS, sap_code
+
+DEFAULT_MIX = {"search": 40, "tecnicos": 10, "create": 20, "pending": 20, "close": 10}
+# el buscador dispara con >= 3 caracteres y 250 ms de debounce: no sale un request por tecla
+MIN_SAP = 3
+P_DEBOUNCE_FIRES = 0.35
+P_TEXT_SEARCH = 0.3
+
+
+def parse_mix(text):
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"acción desconocida: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+class VirtualUser:
+    def __init__(self, base_url, rng, n_materials, tecnico_ids, samples, lock, think_s=0.0):
+        u = urlsplit(base_url)
+        self.host, self.port = u.hostname, u.port or 80
+        self.rng = rng
+        self.n_materials = n_materials
+        self.tecnico_ids = tecnico_ids
+        self.samples = samples
+        self.lock = lock
+        self.think_s = think_s
+        self.conn = None
+        self.etags = {}          # path -> ETag (cache del navegador)
+        self.pending_ids = []    # ids vistos en el último tablero
+
+    def _request(self, name, method, path, body=None, conditional=False):
+        headers = {"Accept": "application/json"}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        if conditional and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        t0 = time.perf_counter()
+        status, data = 0, b""
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            data = resp.read()
+            status = resp.status
+            if conditional and resp.getheader("ETag"):
+                self.etags[path] = resp.getheader("ETag")
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self.lock:
+            self.samples.append((name, status, ms))
+        return status, data
+
+    def _sap(self):
+        return sap_code(self.rng.randrange(self.n_materials))
+
+    # ---- acciones ----
+
+    def search(self):
+        target = self._sap()
+        # tecleo con pausas: solo algunos prefijos llegan a disparar el debounce, el último siempre
+        for n in range(MIN_SAP, len(target) + 1):
+            if n == len(target) or self.rng.random() < P_DEBOUNCE_FIRES:
+                qs = urlencode({"sap": target[:n], "limit": 20})
+                self._request("GET /materials/suggest", "GET", f"/materials/suggest?{qs}")
+        if self.rng.random() < P_TEXT_SEARCH:
+            qs = urlencode({"sap": target[:MIN_SAP + 1], "q": self.rng.choice(PALABRAS)[:5], "limit": 50,
+                            "fields": "sap,breve_descripcion"})
+            self._request("GET /materials/?q", "GET", f"/materials/?{qs}")
+
+    def tecnicos(self):
+        self._request("GET /tecnicos/", "GET", "/tecnicos/", conditional=True)
+
+    def create(self):
+        body = {
+            "sap_id": self._sap(),
+            "id_tecnico": self.rng.choice(self.tecnico_ids) if self.tecnico_ids and self.rng.random() < 0.95 else None,
+            "cantidad": self.rng.choice((1, 1, 1, 2, 3, 5)),
+            "observaciones": None,
+            "procesoIntermedio": self.rng.random() < 0.1,
+        }
+        self._request("POST /ots/", "POST", "/ots/", body)
+
+    def pending(self):
+        # mismos ?fields= que pide admin_ots.js
+        params = {"fields": "id,id_ot,sap_id,cantidad,id_tecnico,inicio,pendiente"}
+        if self.rng.random() < 0.3:
+            params["sap"] = self._sap()[:5]
+        path = f"/admin/ots/pending?{urlencode(params)}"
+        status, data = self._request("GET /admin/ots/pending", "GET", path, conditional=True)
+        if status == 200:
+            self.pending_ids = [ot["id"] for ot in json.loads(data)]
+        self._request("GET /admin/ots/closed", "GET", "/admin/ots/closed?fields=id,id_ot,sap_id,id_tecnico,fin,pendiente",
+                      conditional=True)
+        self._request("GET /admin/ots/summary", "GET", "/admin/ots/summary", conditional=True)
+
+    def close(self):
+        if not self.pending_ids:
+            self.pending()
+        if self.pending_ids:
+            ot_id = self.pending_ids.pop(self.rng.randrange(len(self.pending_ids)))
+            self._request("POST /admin/ots/{id}/close", "POST", f"/admin/ots/{ot_id}/close")
+
+    def run(self, mix, deadline, max_actions=None):
+        actions = list(mix)
+        weights = [mix[a] for a in actions]
+        done = 0
+        while time.perf_counter() < deadline and (max_actions is None or done < max_actions):
+            getattr(self, self.rng.choices(actions, weights=weights)[0])()
+            done += 1
+            if self.think_s:
+                time.sleep(self.rng.expovariate(1.0 / self.think_s))
+        if self.conn is not None:
+            self.conn.close()
+
+
+def _discover(base_url, n_materials):
+    """Ids de técnicos reales y verificación de que el dataset coincide con --materials."""
+    u = urlsplit(base_url)
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=30)
+    try:
+        conn.request("GET", "/tecnicos/")
+        resp = conn.getresponse()
+        tecnicos = json.loads(resp.read()) if resp.status == 200 else []
+        last = sap_code(n_materials - 1)
+        conn.request("GET", "/materials/suggest?" + urlencode({"sap": last, "limit": 1}))
+        resp = conn.getresponse()
+        found = json.loads(resp.read()) if resp.status == 200 else []
+    finally:
+        conn.close()
+    if not found:
+        print(f"Aviso: no existe el material {last}; ¿la BD se generó con --materials {n_materials}?")
+    return [t["id"] for t in tecnicos]
+
+
+def run(base_url, users=20, duration=60.0, mix=None, n_materials=100000, seed=42, think_ms=0.0,
+        max_actions=None, warmup=0.0):
+    mix = mix or DEFAULT_MIX
+    tecnico_ids = _discover(base_url, n_materials)
+    samples = []
+    lock = threading.Lock()
+
+    def make_users(rng_seed, sink):
+        return [VirtualUser(base_url, random.Random(rng_seed * 1000 + i), n_materials, tecnico_ids,
+                            sink, lock, think_ms / 1000.0) for i in range(users)]
+
+    def run_users(vus, seconds):
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=vu.run, args=(mix, deadline, max_actions), daemon=True) for vu in vus]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - t0
+
+    if warmup:
+        # calienta caches / pool / page cache sin contar en el reporte
+        run_users(make_users(seed + 1, []), warmup)
+    elapsed = run_users(make_users(seed, samples), duration)
+    config = {"url": base_url, "users": users, "duration_s": duration, "mix": mix, "materials": n_materials,
+              "tecnicos": len(tecnico_ids), "seed": seed, "think_ms": think_ms, "max_actions": max_actions,
+              "warmup_s": warmup}
+    return report.build_report(samples, elapsed, config)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga sintética contra un servidor local")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60.0, help="segundos")
+    parser.add_argument("--warmup", type=float, default=5.0, help="segundos de calentamiento (no se reportan)")
+    parser.add_argument("--max-actions", type=int, help="tope de acciones por usuario")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="pesos por acción, ej. search=40,tecnicos=10,create=20,pending=20,close=10")
+    parser.add_argument("--materials", type=int, default=100000, help="igual que en benchmarks.generate")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pausa media entre acciones")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="ruta del JSON (default benchmarks/results/<fecha>-<commit>.json)")
+    args = parser.parse_args()
+
+    result = run(args.url, args.users, args.duration, args.mix, args.materials, args.seed,
+                 args.think_ms, args.max_actions, args.warmup)
+    path = report.write_report(result, args.out)
+    print(report.format_table(result))
+    print(f"\nReporte: {path}")
@@ -0,0 +1,150 @@
+# benchmarks/report.py
+# Resumen de una corrida de carga: throughput y latencia p50/p95/p99 por endpoint,
+# guardado como JSON (con el commit) para comparar corridas entre commits.
+#
+# Uso:
+#   python -m benchmarks.report show benchmarks/results/<corrida>.json
+#   python -m benchmarks.report compare base.json nuevo.json
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def _stats(latencies_ms, errors, duration_s):
+    lat = sorted(latencies_ms)
+    out = {
+        "count": len(lat),
+        "errors": errors,
+        "rps": round(len(lat) / duration_s, 2) if duration_s else None,
+        "mean_ms": round(sum(lat) / len(lat), 3) if lat else None,
+        "max_ms": round(lat[-1], 3) if lat else None,
+    }
+    for p in PERCENTILES:
+        v = percentile(lat, p)
+        out[f"p{p}_ms"] = round(v, 3) if v is not None else None
+    return out
+
+
+def summarize(samples, duration_s):
+    """samples: iterable de (endpoint, status, latencia_ms). Devuelve (total, {endpoint: stats})."""
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    statuses = defaultdict(lambda: defaultdict(int))
+    for name, status, ms in samples:
+        by_endpoint[name].append(ms)
+        statuses[name][str(status)] += 1
+        if status == 0 or status >= 400:
+            errors[name] += 1
+    endpoints = {}
+    for name in sorted(by_endpoint):
+        endpoints[name] = _stats(by_endpoint[name], errors[name], duration_s)
+        endpoints[name]["status"] = dict(statuses[name])
+    total = _stats([ms for v in by_endpoint.values() for ms in v], sum(errors.values()), duration_s)
+    return total, endpoints
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def build_report(samples, duration_s, config):
+    total, endpoints = summarize(samples, duration_s)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git("rev-parse", "HEAD") or None,
+            "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "duration_s": round(duration_s, 3),
+            "config": config,
+        },
+        "total": total,
+        "endpoints": endpoints,
+    }
+
+
+def default_path(report, directory=os.path.join("benchmarks", "results")):
+    ts = report["meta"]["timestamp"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    commit = (report["meta"]["git_commit"] or "nogit")[:10]
+    return os.path.join(directory, f"{ts}-{commit}.json")
+
+
+def write_report(report, path=None):
+    path = path or default_path(report)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def format_table(report):
+    cols = ("count", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    rows = [(name, s) for name, s in report["endpoints"].items()] + [("TOTAL", report["total"])]
+    width = max(len(name) for name, _ in rows)
+    lines = [f"{'endpoint':<{width}}  " + "  ".join(f"{c:>9}" for c in cols)]
+    for name, s in rows:
+        lines.append(f"{name:<{width}}  " + "  ".join(f"{_fmt(s.get(c)):>9}" for c in cols))
+    return "\n".join(lines)
+
+
+def _fmt(v):
+    if v is None:
+        return "-"
+    return f"{v:.1f}" if isinstance(v, float) else str(v)
+
+
+def _pct(base, new):
+    if not base or new is None:
+        return "-"
+    return f"{(new - base) / base * 100:+.1f}%"
+
+
+def format_compare(base, new):
+    """Diferencias por endpoint: rps y p50/p95/p99 (negativo en latencia = mejor)."""
+    names = sorted(set(base["endpoints"]) | set(new["endpoints"]))
+    width = max([len(n) for n in names] + [5])
+    cols = ("rps",) + tuple(f"p{p}_ms" for p in PERCENTILES)
+    lines = [
+        f"base: {base['meta'].get('git_commit')}  nuevo: {new['meta'].get('git_commit')}",
+        f"{'endpoint':<{width}}  " + "  ".join(f"{c:>22}" for c in cols),
+    ]
+    pairs = [(n, base["endpoints"].get(n, {}), new["endpoints"].get(n, {})) for n in names]
+    pairs.append(("TOTAL", base["total"], new["total"]))
+    for name, b, n in pairs:
+        cells = [f"{_fmt(b.get(c))} -> {_fmt(n.get(c))} ({_pct(b.get(c), n.get(c))})" for c in cols]
+        lines.append(f"{name:<{width}}  " + "  ".join(f"{cell:>22}" for cell in cells))
+    return "\n".join(lines)
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "show":
+        print(format_table(_load(sys.argv[2])))
+    elif len(sys.argv) == 4 and sys.argv[1] == "compare":
+        print(format_compare(_load(sys.argv[2]), _load(sys.argv[3])))
+    else:
+        print("Uso: python -m benchmarks.report show corrida.json | compare base.json nuevo.json")
+        sys.exit(2)
@@ -0,0 +1,132 @@
+# cache.py
+# Cache en memoria (por proceso) con TTL para datos que cambian poco y se leen mucho:
+# listado de técnicos y lookups de material por SAP / técnico por id.
+# Los handlers que escriben invalidan explícitamente; el TTL acota cuánto puede
+# quedar desactualizado un worker cuando la escritura la hizo otro.
+# Los técnicos además llevan una versión en la BD (fila 'tecnicos' de ot_counters,
+# incrementada en cada alta / edición / baja): la clave del cache incluye la versión,
+# así ningún worker sirve una lista vieja aunque la escritura la haya hecho otro.
+import os
+import threading
+import time
+
+from sqlalchemy import select
+
+import models
+from database import dialect_insert
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+
+
+class TTLCache:
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._data = {}   # key -> (expires_at, loaded_at, value)
+        self._lock = threading.Lock()
+
+    def get_entry(self, key):
+        """Devuelve (loaded_at, value) o None si no está o venció."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            return entry[1], entry[2]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, time.time(), value)
+
+    def get_or_load(self, key, loader):
+        """
+        Devuelve (loaded_at, value). Si no está en cache llama loader();
+        un resultado None no se guarda (así un alta nueva se ve enseguida).
+        """
+        entry = self.get_entry(key)
+        if entry is not None:
+            return entry
+        value = loader()
+        if value is None:
+            return time.time(), None
+        self.set(key, value)
+        return self.get_entry(key) or (time.time(), value)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+store = TTLCache()
+
+TECNICOS_LIST = "tecnicos:list"
+TECNICOS_VERSION = "tecnicos"   # name en ot_counters
+
+
+def tecnico_key(tecnico_id, version=0):
+    return f"tecnico:{version}:{tecnico_id}"
+
+
+def material_key(sap):
+    return f"material:{sap}"
+
+
+# ---- lookups cacheados (reciben una Session sync, se llaman dentro de db.run) ----
+# Se guardan dicts planos, no instancias ORM: se comparten entre sesiones/threads.
+
+def tecnicos_version(db):
+    counter = models.OTCounter.__table__
+    return db.execute(select(counter.c.value).where(counter.c.name == TECNICOS_VERSION)).scalar() or 0
+
+
+def bump_tecnicos_version(db):
+    """Incrementa la versión de los técnicos dentro de la transacción de la escritura (sin commit)."""
+    counter = models.OTCounter.__table__
+    stmt = dialect_insert(db, counter).values(name=TECNICOS_VERSION, value=1)
+    db.execute(stmt.on_conflict_do_update(index_elements=["name"], set_={"value": counter.c.value + 1}))
+
+
+def tecnicos_list(db):
+    """[ {id, nombre}, ... ] de la versión actual (una lectura de ot_counters si está en cache)."""
+    def load():
+        return [{"id": t.id, "nombre": t.nombre} for t in db.query(models.Tecnico).all()]
+    return store.get_or_load(f"{TECNICOS_LIST}:{tecnicos_version(db)}", load)[1]
+
+
+def tecnico_by_id(db, tecnico_id):
+    def load():
+        t = db.query(models.Tecnico).filter(models.Tecnico.id == tecnico_id).first()
+        return {"id": t.id, "nombre": t.nombre} if t else None
+    return store.get_or_load(tecnico_key(tecnico_id, tecnicos_version(db)), load)[1]
+
+
+def material_by_sap(db, sap):
+    def load():
+        m = db.query(models.Material).filter(models.Material.sap == sap).first()
+        return ({"id": m.id, "sap": m.sap, "breve_descripcion": m.breve_descripcion,
+                 "tipo": m.tipo, "marca": m.marca} if m else None)
+    return store.get_or_load(material_key(sap), load)[1]
+
+
+def invalidate_tecnico():
+    """Libera las entradas de versiones anteriores en este proceso (llamar después del commit)."""
+    store.invalidate_prefix(TECNICOS_LIST)
+    store.invalidate_prefix("tecnico:")
+
+
+def invalidate_material(sap=None):
+    if sap is None:
+        store.invalidate_prefix("material:")
+    else:
+        store.invalidate(material_key(sap))
@@ -1,20 +1,171 @@
 # database.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
 
-DATABASE_URL = "sqlite:///./materials.db"
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
-# Con SQLite no usamos pool grande por defecto, check same_thread
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+import metrics
+
+try:
+    # si hay un .env en el directorio de trabajo, sus variables se usan como default
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./materials.db")
+
+# DB_MODE=sync  -> Session clásica; la lógica de cada endpoint corre en el threadpool
+# DB_MODE=async -> AsyncSession (aiosqlite / asyncpg); el I/O no ocupa threads
+# Los endpoints son los mismos en ambos modos, así se pueden comparar con la misma carga;
+# la comparación es pareja solo en el I/O de BD: con run_sync el resto de op (armar
+# instancias ORM, filas de rollups) corre en el event loop en vez de en un thread.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+# DB_AUTO_MIGRATE=0 en producción: el esquema se prepara una vez con `python migrations.py`
+# y los workers arrancan sin hacer DDL.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") not in ("0", "false", "no")
+
+# ---- Perfil SQLite: WAL para que los lectores no esperen al writer de OTs ----
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    # negativo = KiB (-65536 -> 64 MiB de cache de páginas por conexión)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+}
+
+# ---- Perfil Postgres: pool de conexiones ----
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def _backend(url):
+    return url.split("://", 1)[0].split("+", 1)[0]
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    cur = dbapi_conn.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cur.execute(f"PRAGMA {name}={value}")
+    cur.close()
+
+
+def engine_options(url):
+    """kwargs de create_engine según el motor (perfil sqlite o postgres)."""
+    backend = _backend(url)
+    if backend == "sqlite":
+        return {"connect_args": {"check_same_thread": False} if "aiosqlite" not in url else {}}
+    if backend in ("postgresql", "postgres"):
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+    return {}
+
+
+def configure_engine(eng):
+    """Registra los PRAGMA de SQLite en cada conexión nueva del pool."""
+    if eng.dialect.name == "sqlite":
+        event.listen(eng, "connect", _set_sqlite_pragmas)
+    return eng
+
+
+engine = metrics.instrument_engine(configure_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL))))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def dialect_insert(db, table):
+    """INSERT con soporte de ON CONFLICT según el motor de la sesión (SQLite o Postgres)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise RuntimeError(f"Upsert no soportado para {dialect}")
+    return insert(table)
+
+
+def async_url(url):
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql://... -> postgresql+asyncpg://..."""
+    scheme, rest = url.split("://", 1)
+    base = scheme.split("+", 1)[0]
+    if base == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if base in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    raise ValueError(f"DB_MODE=async no soportado para {scheme}")
+
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    _async_url = async_url(DATABASE_URL)
+    async_engine = create_async_engine(_async_url, **engine_options(_async_url))
+    metrics.instrument_engine(configure_engine(async_engine.sync_engine))
+    # expire_on_commit=False: los objetos devueltos se serializan fuera de la sesión
+    AsyncSessionLocal = sessionmaker(bind=async_engine, class_=AsyncSession,
+                                     autoflush=False, expire_on_commit=False)
+
+
+def pool_stats():
+    """Estado del pool del engine activo (para /health y monitoreo)."""
+    eng = async_engine.sync_engine if async_engine is not None else engine
+    pool = eng.pool
+    stats = {"backend": eng.dialect.name, "mode": DB_MODE, "pool": type(pool).__name__, "status": pool.status()}
+    # QueuePool / AsyncAdaptedQueuePool exponen contadores; otros pools no
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    return stats
+
+
+class DbSession:
+    """
+    Sesión que reciben los endpoints. `await db.run(fn, *args)` ejecuta fn(session, *args)
+    con código ORM sync normal:
+      - modo sync: en el threadpool, con una Session
+      - modo async: con AsyncSession.run_sync, sin bloquear el event loop en el I/O
+    En modo async fn corre entero en el event loop (solo el I/O se suelta), así que el
+    trabajo de CPU que no necesita la sesión (parsear archivos, armar payloads grandes)
+    va afuera de fn, con run_in_threadpool (ver material_import.import_file_async).
+    """
+    def __init__(self, session):
+        self.session = session
+        self.is_async = not isinstance(session, Session)
+
+    async def run(self, fn, *args, **kwargs):
+        # db_timer: tiempo de query + ORM del request, para /metrics
+        with metrics.db_timer():
+            if self.is_async:
+                return await self.session.run_sync(fn, *args, **kwargs)
+            return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        if self.is_async:
+            await self.session.close()
+        else:
+            self.session.close()
+
+
 # Dependency for FastAPI endpoints
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    db = DbSession(AsyncSessionLocal() if AsyncSessionLocal is not None else SessionLocal())
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
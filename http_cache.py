@@ -0,0 +1,78 @@
+# http_cache.py
+# Validación condicional para las respuestas JSON de los GET (listados de la API):
+# agrega ETag (hash del body) y responde 304 sin body cuando el navegador ya tiene esa
+# versión (If-None-Match). No se usa Last-Modified / If-Modified-Since: con varios
+# workers cada uno tiene su propio cache y la resolución de un segundo no alcanza;
+# el hash del body es el mismo en todos los procesos si el contenido lo es.
+# Middleware ASGI puro: las respuestas que no son JSON (SSE, exports, estáticos)
+# pasan sin bufferear.
+import hashlib
+
+
+def make_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # comparación débil: W/"x" equivale a "x"
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag in tags
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app, cache_control="no-cache"):
+        self.app = app
+        # no-cache: el navegador guarda la respuesta pero revalida siempre (barato con 304)
+        self.cache_control = cache_control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        req_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = {k.decode("latin-1").lower() for k, _ in message.get("headers", [])}
+                ctype = next((v.decode("latin-1") for k, v in message.get("headers", [])
+                              if k.lower() == b"content-type"), "")
+                if message["status"] != 200 or not ctype.startswith("application/json") or "etag" in headers:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(start, b"".join(chunks), req_headers, send)
+
+        await self.app(scope, receive, wrapped_send)
+
+    async def _finish(self, start, body, req_headers, send):
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        names = {k.lower() for k, _ in headers}
+        etag = make_etag(body)
+        headers.append((b"etag", etag.encode("latin-1")))
+        if b"cache-control" not in names:
+            headers.append((b"cache-control", self.cache_control.encode("latin-1")))
+
+        inm = req_headers.get("if-none-match")
+        if inm is not None and etag_matches(inm, etag):
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,39 +1,98 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from typing import List
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from datetime import datetime
-
-import models, schemas
-from database import engine, get_db, Base
-
-# Crear tablas si no existen
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Materials ABM - FastAPI (tutorial)")
-
-# montar archivos estáticos y plantillas
-app.mount("/static", StaticFiles(directory="static"), name="static")
+import asyncio
+import csv
+import logging
+import tempfile
+
+import models, schemas, search, material_import, ot_service, migrations, pagination, cache, rollups
+import ot_events, ot_export, metrics, projection, archive, write_queue, timeseries, assets
+from http_cache import ConditionalGetMiddleware
+from sap_index import sap_index
+from database import engine, async_engine, get_db, DbSession, DB_AUTO_MIGRATE, pool_stats
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Crear tablas si no existen (y los índices nuevos en BDs existentes).
+    # Se hace al arrancar y no al importar; con DB_AUTO_MIGRATE=0 se saltea
+    # (correr `python migrations.py` una vez antes de levantar los workers).
+    if DB_AUTO_MIGRATE:
+        await run_in_threadpool(migrations.upgrade, engine)
+    else:
+        await run_in_threadpool(search.detect_fts, engine)
+    # archivo periódico de OTs cerradas viejas (ARCHIVE_INTERVAL_S=0 -> solo a mano)
+    archiver = asyncio.create_task(_archive_loop()) if archive.ARCHIVE_INTERVAL_S > 0 else None
+    # escritor único de altas / cierres de OT (WRITE_QUEUE=1)
+    if write_queue.writer is not None:
+        write_queue.writer.start()
+    yield
+    if write_queue.writer is not None:
+        await write_queue.writer.stop()
+    if archiver is not None:
+        archiver.cancel()
+
+
+async def _archive_loop():
+    while True:
+        await asyncio.sleep(archive.ARCHIVE_INTERVAL_S)
+        try:
+            await run_in_threadpool(archive.run)
+        except Exception:
+            logging.getLogger("archive").exception("Falló el archivo periódico de OTs")
+
+
+app = FastAPI(title="Materials ABM - FastAPI (tutorial)", lifespan=lifespan)
+# ETag / 304 para las respuestas JSON de los GET
+app.add_middleware(ConditionalGetMiddleware)
+# latencia por endpoint + SQL por request (afuera de todo, así mide también el 304)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.gauge("ot_stream_subscribers", "Clientes conectados a /ots/stream", lambda: ot_events.bus.subscribers)
+metrics.gauge("db_pool_checked_out", "Conexiones del pool en uso", lambda: pool_stats().get("checkedout"))
+
+# montar archivos estáticos (precomprimidos, URLs con hash) y plantillas
+static_files = assets.PrecompressedStaticFiles(directory="static")
+app.mount("/static", static_files, name="static")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = static_files.url
+# el HTML de las pantallas no depende del request: se renderiza una vez y se sirve con ETag
+UI_PAGES = ("home.html", "tecnicos.html", "assign_ot.html", "admin_ots.html")
+pages = assets.PageCache(templates)
+pages.prerender(*UI_PAGES)
 
 # ------ RUTAS UI (HTML) ------
 
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
-    return templates.TemplateResponse("home.html", {"request": request})
+    return pages.response(request, "home.html")
 
 @app.get("/ui/tecnicos", response_class=HTMLResponse)
 def ui_tecnicos(request: Request):
     # la página pedirá los datos vía fetch a /tecnicos/
-    return templates.TemplateResponse("tecnicos.html", {"request": request})
+    return pages.response(request, "tecnicos.html")
 
 @app.get("/ui/assign-ot", response_class=HTMLResponse)
 def ui_assign_ot(request: Request):
     # la página pedirá materiales y técnicos con fetch
-    return templates.TemplateResponse("assign_ot.html", {"request": request})
+    return pages.response(request, "assign_ot.html")
+
+# estado de la app (lo usa home.html) + estadísticas del pool de conexiones
+@app.get("/health")
+def health():
+    return {"status": "ok", "db": pool_stats(), "ot_stream": {"subscribers": ot_events.bus.subscribers},
+            "write_queue": write_queue.writer.stats() if write_queue.writer is not None else None}
+
+# métricas en formato Prometheus (latencias, SQL por request, N+1, requests lentos)
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
 
 # (Opcional) redirect para /docs, si quieres
 @app.get("/docs-ui")
@@ -44,163 +103,324 @@ def redirect_docs():
 # ------ API Endpoints existentes (resumo/uso) ------
 # Incluye los endpoints de materials, tecnicos y ots que ya tenías.
 # Pega aquí tus endpoints CRUD tal cual estaban; por ejemplo:
+#
+# Los endpoints son async: la lógica ORM va en un `op(db)` sync que se ejecuta con
+# `await db.run(op)` (threadpool con DB_MODE=sync, AsyncSession.run_sync con DB_MODE=async).
 
 # Materials endpoints (ejemplo resumido; copia lo que ya tenías)
 @app.post("/materials/", response_model=schemas.MaterialOut, status_code=status.HTTP_201_CREATED)
-def create_material(material_in: schemas.MaterialCreate, db: Session = Depends(get_db)):
-    existing = db.query(models.Material).filter(models.Material.sap == material_in.sap).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Material con ese SAP ya existe")
-    m = models.Material(**material_in.dict())
-    db.add(m)
-    db.commit()
-    db.refresh(m)
-    return m
+async def create_material(material_in: schemas.MaterialCreate, db: DbSession = Depends(get_db)):
+    def op(db: Session):
+        existing = db.query(models.Material).filter(models.Material.sap == material_in.sap).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Material con ese SAP ya existe")
+        m = models.Material(**material_in.dict())
+        db.add(m)
+        db.commit()
+        db.refresh(m)
+        sap_index.upsert(m.sap, m.breve_descripcion)
+        cache.invalidate_material(m.sap)
+        return m
+    return await db.run(op)
+
+# Importación masiva: el body (CSV o NDJSON) se copia en streaming a un archivo
+# temporal y se importa con upserts por lotes (el parseo va al threadpool en ambos modos).
+@app.post("/materials/bulk", response_model=schemas.MaterialImportResult)
+async def bulk_import_materials(request: Request, format: Optional[str] = None, delimiter: str = ",",
+                                batch_size: int = material_import.DEFAULT_BATCH_SIZE,
+                                update_existing: bool = True, db: DbSession = Depends(get_db)):
+    """
+    Ejemplo: curl -X POST --data-binary @catalogo.csv -H 'Content-Type: text/csv' /materials/bulk
+    El formato se toma de ?format=csv|ndjson o del Content-Type.
+    """
+    fmt = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Formato no soportado (csv o ndjson)")
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            result = await material_import.import_file_async(db, spool, fmt, delimiter,
+                                                             max(batch_size, 1), update_existing)
+        except (ValueError, TypeError, csv.Error) as e:
+            raise HTTPException(status_code=400, detail=f"Archivo inválido: {e}")
+    sap_index.invalidate()
+    cache.invalidate_material()
+    return result
 
 from typing import Optional
 from sqlalchemy import or_
 
 @app.get("/materials/", response_model=List[schemas.MaterialOut])
-def list_materials(skip: int = 0, limit: int = 100, sap: Optional[str] = None, q: Optional[str] = None, db: Session = Depends(get_db)):
+async def list_materials(skip: int = 0, limit: int = 100, sap: Optional[str] = None, q: Optional[str] = None,
+                         fields: Optional[str] = None, db: DbSession = Depends(get_db)):
     """
     Listar materiales. Filtros:
       - sap: buscar por código SAP (prefijo/contains)
-      - q: búsqueda por texto en breve_descripcion o descripcion
+      - q: búsqueda por texto en breve_descripcion, descripcion, marca o tipo
+           (índice FTS5, sin importar mayúsculas ni acentos, ordenado por relevancia)
+      - fields: subconjunto de campos a devolver, p.ej. fields=sap,breve_descripcion
     Ejemplo: /materials/?sap=40600&q=transmisor
     """
-    qdb = db.query(models.Material)
-    if sap:
-        #  (búsqueda por prefijo -)
-       qdb = qdb.filter(models.Material.sap.ilike(f"{sap}%"))
+    cols = projection.parse_fields(fields, projection.MATERIAL_FIELDS)
+
+    def op(db: Session):
+        # solo las columnas de la respuesta, como tuplas (sin instancias ORM)
+        qdb = db.query(*projection.material_columns(cols))
+        if sap:
+            #  (búsqueda por prefijo -)
+            qdb = qdb.filter(models.Material.sap.ilike(f"{sap}%"))
         
-    if q:
-        term = f"%{q}%"
-        qdb = qdb.filter(or_(models.Material.breve_descripcion.ilike(term),
-                             models.Material.descripcion.ilike(term)))
-    return qdb.offset(skip).limit(limit).all()
+        if q:
+            match = search.build_match_query(q) if search.FTS_ENABLED else None
+            if match:
+                fts = search.fts_ranked_subquery(match)
+                qdb = qdb.join(fts, fts.c.rowid == models.Material.id).order_by(fts.c.rank, models.Material.id)
+            else:
+                # fallback sin índice (BD que no es SQLite o sin FTS5)
+                term = f"%{q}%"
+                qdb = qdb.filter(or_(models.Material.breve_descripcion.ilike(term),
+                                     models.Material.descripcion.ilike(term)))
+        return qdb.offset(skip).limit(limit).all()
+    return projection.response(await db.run(op), cols)
+
+# Autocompletado por prefijo SAP (índice en memoria, sin consultar la BD)
+@app.get("/materials/suggest", response_model=List[List[str]])
+async def suggest_materials(sap: str, limit: int = 20, db: DbSession = Depends(get_db)):
+    """
+    Devuelve pares compactos [sap, breve_descripcion] para los SAP que empiezan con `sap`.
+    Ejemplo: /materials/suggest?sap=40600&limit=20
+    """
+    if sap_index.is_stale():
+        await db.run(sap_index.load)
+    return sap_index.suggest(sap.strip(), min(max(limit, 1), 200))
 
 
 @app.get("/materials/{material_id}", response_model=schemas.MaterialOut)
-def get_material(material_id: int, db: Session = Depends(get_db)):
-    m = db.query(models.Material).filter(models.Material.id == material_id).first()
-    if not m:
-        raise HTTPException(status_code=404, detail="Material no encontrado")
-    return m
+async def get_material(material_id: int, db: DbSession = Depends(get_db)):
+    def op(db: Session):
+        m = db.query(models.Material).filter(models.Material.id == material_id).first()
+        if not m:
+            raise HTTPException(status_code=404, detail="Material no encontrado")
+        return m
+    return await db.run(op)
 
 # Tecnicos endpoints (asegurate de tenerlos tal como en tu código)
 @app.post("/tecnicos/", response_model=schemas.TecnicoOut, status_code=status.HTTP_201_CREATED)
-def create_tecnico(tecnico_in: schemas.TecnicoCreate, db: Session = Depends(get_db)):
-    exist = db.query(models.Tecnico).filter(models.Tecnico.nombre == tecnico_in.nombre).first()
-    if exist:
-        raise HTTPException(status_code=400, detail="Técnico ya existe")
-    t = models.Tecnico(nombre=tecnico_in.nombre)
-    db.add(t)
-    db.commit()
-    db.refresh(t)
-    return t
+async def create_tecnico(tecnico_in: schemas.TecnicoCreate, db: DbSession = Depends(get_db)):
+    def op(db: Session):
+        exist = db.query(models.Tecnico).filter(models.Tecnico.nombre == tecnico_in.nombre).first()
+        if exist:
+            raise HTTPException(status_code=400, detail="Técnico ya existe")
+        t = models.Tecnico(nombre=tecnico_in.nombre)
+        db.add(t)
+        cache.bump_tecnicos_version(db)
+        db.commit()
+        db.refresh(t)
+        cache.invalidate_tecnico()
+        return t
+    return await db.run(op)
 
 @app.get("/tecnicos/", response_model=List[schemas.TecnicoOut])
-def list_tecnicos(db: Session = Depends(get_db)):
-    return db.query(models.Tecnico).all()
+async def list_tecnicos(db: DbSession = Depends(get_db)):
+    # cacheado por versión (ot_counters): si está en cache solo lee esa fila; el ETag
+    # lo pone ConditionalGetMiddleware y es el mismo en todos los workers
+    return await db.run(cache.tecnicos_list)
 
 @app.get("/tecnicos/{tecnico_id}", response_model=schemas.TecnicoOut)
-def get_tecnico(tecnico_id: int, db: Session = Depends(get_db)):
-    t = db.query(models.Tecnico).filter(models.Tecnico.id == tecnico_id).first()
-    if not t:
-        raise HTTPException(status_code=404, detail="Técnico no encontrado")
-    return t
+async def get_tecnico(tecnico_id: int, db: DbSession = Depends(get_db)):
+    def op(db: Session):
+        t = cache.tecnico_by_id(db, tecnico_id)
+        if not t:
+            raise HTTPException(status_code=404, detail="Técnico no encontrado")
+        return t
+    return await db.run(op)
 
 @app.put("/tecnicos/{tecnico_id}", response_model=schemas.TecnicoOut)
-def update_tecnico(tecnico_id: int, tecnico_in: schemas.TecnicoCreate, db: Session = Depends(get_db)):
-    t = db.query(models.Tecnico).filter(models.Tecnico.id == tecnico_id).first()
-    if not t:
-        raise HTTPException(status_code=404, detail="Técnico no encontrado")
-    t.nombre = tecnico_in.nombre
-    db.commit()
-    db.refresh(t)
-    return t
+async def update_tecnico(tecnico_id: int, tecnico_in: schemas.TecnicoCreate, db: DbSession = Depends(get_db)):
+    def op(db: Session):
+        t = db.query(models.Tecnico).filter(models.Tecnico.id == tecnico_id).first()
+        if not t:
+            raise HTTPException(status_code=404, detail="Técnico no encontrado")
+        t.nombre = tecnico_in.nombre
+        cache.bump_tecnicos_version(db)
+        db.commit()
+        db.refresh(t)
+        cache.invalidate_tecnico()
+        return t
+    return await db.run(op)
 
 @app.delete("/tecnicos/{tecnico_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_tecnico(tecnico_id: int, db: Session = Depends(get_db)):
-    t = db.query(models.Tecnico).filter(models.Tecnico.id == tecnico_id).first()
-    if not t:
-        raise HTTPException(status_code=404, detail="Técnico no encontrado")
-    db.delete(t)
-    db.commit()
-    return
+async def delete_tecnico(tecnico_id: int, db: DbSession = Depends(get_db)):
+    def op(db: Session):
+        t = db.query(models.Tecnico).filter(models.Tecnico.id == tecnico_id).first()
+        if not t:
+            raise HTTPException(status_code=404, detail="Técnico no encontrado")
+        db.delete(t)
+        cache.bump_tecnicos_version(db)
+        db.commit()
+        cache.invalidate_tecnico()
+        return
+    return await db.run(op)
 
 
 
 # ---------- OT endpoints ----------
 
-from datetime import datetime, timezone
+from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 
 @app.post("/ots/", response_model=schemas.OTOut, status_code=201)
-def create_ot(ot_in: schemas.OTCreate, db: Session = Depends(get_db)):
-    # validar material
-    material = db.query(models.Material).filter(models.Material.sap == ot_in.sap_id).first()
-    if not material:
-        raise HTTPException(status_code=400, detail="Material (sap_id) no existe")
-
-    # validar tecnico si viene
-    if ot_in.id_tecnico:
-        tech = db.query(models.Tecnico).filter(models.Tecnico.id == ot_in.id_tecnico).first()
-        if not tech:
-            raise HTTPException(status_code=400, detail="Tecnico indicado no existe")
-
-    # crear instancia SIN id_ot (nullable) para obtener id autoincremental
-    ot = models.OT(
-        sap_id=ot_in.sap_id,
-        id_tecnico=ot_in.id_tecnico,
-        cantidad=ot_in.cantidad,
-        observaciones=ot_in.observaciones,
-        procesoIntermedio=ot_in.procesoIntermedio,
-        # inicio tomará default si se pasa None; si querés timezone-aware explícito:
-        inicio=ot_in.inicio or datetime.now(timezone.utc),
-        pendiente=True  # por defecto pendiente = True
-    )
-
-    db.add(ot)
-    try:
-        # primer commit para que la BD asigne el id autoincremental
-        db.commit()
-        db.refresh(ot)
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Error al insertar OT (posible constraint)")
-
-    # ahora tenemos ot.id; generamos id_ot legible y lo guardamos
-    try:
-        # formato: OT-0001 (4 dígitos) — ajustá f-string si querés otro formato
-        ot.id_ot = f"OT-{ot.id:04d}"
-        db.add(ot)
-        db.commit()
-        db.refresh(ot)
-    except IntegrityError:
-        db.rollback()
-        # si por alguna razón chocó con unique (muy raro), generamos con timestamp
-        ot.id_ot = f"OT-{int(datetime.now().timestamp())}"
+async def create_ot(ot_in: schemas.OTCreate, db: DbSession = Depends(get_db)):
+    if write_queue.writer is not None:
+        # modo write-behind: se graba junto con las altas / cierres que llegan en la misma ventana
+        ot = await write_queue.writer.create_ot(ot_in)
+        ot_events.bus.publish(ot_events.OT_CREATED, ot)
+        return ot
+
+    def op(db: Session):
+        # validar material (lookup cacheado)
+        material = cache.material_by_sap(db, ot_in.sap_id)
+        if not material:
+            raise HTTPException(status_code=400, detail="Material (sap_id) no existe")
+
+        # validar tecnico si viene
+        if ot_in.id_tecnico:
+            tech = cache.tecnico_by_id(db, ot_in.id_tecnico)
+            if not tech:
+                raise HTTPException(status_code=400, detail="Tecnico indicado no existe")
+
+        # reservamos el número legible y creamos la OT con su id_ot en un único commit
+        ot = ot_service.build_ot(ot_in, ot_service.allocate_ot_numbers(db))
         db.add(ot)
-        db.commit()
+        rollups.apply_change(db, None, rollups.state_of(ot))
+        timeseries.apply_change(db, None, timeseries.state_of(ot))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Error al insertar OT (posible constraint)")
         db.refresh(ot)
-
+        return ot
+    ot = await db.run(op)
+    ot_events.bus.publish(ot_events.OT_CREATED, ot_service.ot_to_dict(ot))
     return ot
 
 
+# Alta de varias OTs en una sola transacción
+@app.post("/ots/batch", response_model=List[schemas.OTOut], status_code=201)
+async def create_ots_batch(ots_in: List[schemas.OTCreate], db: DbSession = Depends(get_db)):
+    """
+    Crea N OTs de una vez. Valida todos los sap_id e id_tecnico con una consulta
+    por conjunto; si alguno no existe no se crea ninguna.
+    """
+    def op(db: Session):
+        if not ots_in:
+            return []
+        if len(ots_in) > ot_service.OT_BATCH_MAX:
+            raise HTTPException(status_code=400, detail=f"Máximo {ot_service.OT_BATCH_MAX} OTs por lote")
+
+        bad_saps, bad_tecs = ot_service.missing_references(db, ots_in)
+        if bad_saps:
+            raise HTTPException(status_code=400, detail=f"Material (sap_id) no existe: {', '.join(bad_saps)}")
+        if bad_tecs:
+            raise HTTPException(status_code=400, detail=f"Tecnico indicado no existe: {', '.join(map(str, bad_tecs))}")
+
+        first = ot_service.allocate_ot_numbers(db, len(ots_in))
+        ots = [ot_service.build_ot(o, first + i) for i, o in enumerate(ots_in)]
+        db.add_all(ots)
+        rollups.apply_changes(db, [(None, rollups.state_of(o)) for o in ots])
+        timeseries.apply_changes(db, [(None, timeseries.state_of(o)) for o in ots])
+        try:
+            db.flush()
+            ids = [o.id for o in ots]
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Error al insertar OTs (posible constraint)")
+        # una sola consulta para devolverlas (en vez de un refresh por OT); se recargan de la BD
+        # también en modo async, así el payload es el mismo que en modo sync
+        return ot_service.load_ots(db, ids)
+    ots = await db.run(op)
+    for ot in ots:
+        ot_events.bus.publish(ot_events.OT_CREATED, ot_service.ot_to_dict(ot))
+    return ots
+
+
 
 from typing import List, Optional
 
 @app.get("/ots/", response_model=List[schemas.OTOut])
-def list_ots(skip: int = 0, limit: int = 100, proceso_intermedio: Optional[bool] = None, db: Session = Depends(get_db)):
+async def list_ots(skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                   proceso_intermedio: Optional[bool] = None, desc: bool = False, fields: Optional[str] = None,
+                   include_archive: bool = True, db: DbSession = Depends(get_db)):
     """
-    Lista OTs. Opcionalmente filtra por procesoIntermedio (True/False).
+    Lista OTs ordenadas por (inicio, id); con desc=true las más recientes primero.
+    Opcionalmente filtra por procesoIntermedio (True/False).
+    Incluye las OTs archivadas (include_archive=false para leer solo ots).
+    Paginación: si hay más filas, el header X-Next-Cursor trae el cursor de la página
+    siguiente (?cursor=...). `skip` sigue funcionando pero es lento en páginas profundas.
+    `fields=id,id_ot,sap_id` devuelve solo esos campos.
     Ejemplo: /ots/?proceso_intermedio=true
     """
-    q = db.query(models.OT)
-    if proceso_intermedio is not None:
-        q = q.filter(models.OT.procesoIntermedio == proceso_intermedio)
-    return q.offset(skip).limit(limit).all()
+    cols = projection.parse_fields(fields, projection.OT_FIELDS)
+
+    def op(db: Session):
+        sources = []
+        for model in (models.OT, models.OTArchive) if include_archive else (models.OT,):
+            q = db.query(*projection.ot_columns(cols, model=model))
+            if proceso_intermedio is not None:
+                q = q.filter(model.procesoIntermedio == proceso_intermedio)
+            sources.append((q, model.inicio, model.id))
+        return pagination.paginate_merged(sources, cursor, limit, desc=desc, skip=skip, nullable=False)
+    rows, next_cursor = await db.run(op)
+    return projection.response(rows, cols, pagination.next_cursor_headers(next_cursor))
+
+# Feed en vivo (Server-Sent Events): ot_created / ot_updated con la OT completa como delta.
+# Al reconectar, EventSource manda Last-Event-ID y se reenvía lo que faltó; si ya no
+# está en el buffer llega un evento `reset` y el cliente recarga el listado una vez.
+@app.get("/ots/stream")
+async def stream_ots(request: Request, last_event_id: Optional[str] = None):
+    last_id = request.headers.get("last-event-id") or last_event_id
+    return StreamingResponse(
+        ot_events.bus.stream(request, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Exportación del histórico (reportes): CSV o NDJSON en streaming desde un cursor del servidor
+@app.get("/ots/export")
+def export_ots(format: str = "csv", desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+               sap_id: Optional[str] = None, id_tecnico: Optional[int] = None, pendiente: Optional[bool] = None,
+               include_names: bool = False, include_archive: bool = True):
+    """
+    Filtra por rango de inicio [desde, hasta), sap_id, id_tecnico y pendiente; ordenado por (inicio, id).
+    include_names=true agrega la descripción del material y el nombre del técnico.
+    Incluye las OTs archivadas (include_archive=false para leer solo ots).
+    Ejemplo: /ots/export?format=ndjson&desde=2024-01-01&hasta=2024-02-01
+    """
+    if format not in ot_export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato no soportado (csv o ndjson)")
+    stmts = ot_export.export_queries(desde, hasta, sap_id, id_tecnico, pendiente, include_names, include_archive)
+    names = ot_export.columns(include_names)
+    if async_engine is not None:
+        body = ot_export.aiter_export(async_engine, stmts, format, names)
+    else:
+        body = ot_export.iter_export(engine, stmts, format, names)
+    return StreamingResponse(
+        body,
+        media_type=ot_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="ots.{format}"'},
+    )
+
+# OT por id (declarada después de /ots/stream y /ots/export): busca en ots y, si ya se archivó, en ots_archive
+@app.get("/ots/{ot_id}", response_model=schemas.OTOut)
+async def get_ot(ot_id: int, db: DbSession = Depends(get_db)):
+    ot = await db.run(archive.get_ot, ot_id)
+    if not ot:
+        raise HTTPException(status_code=404, detail="OT no encontrada")
+    return ot
 
 ######################################################################################################################
 # ---------------------------
@@ -213,58 +433,188 @@ from fastapi import Request
 # UI para admin (plantilla)
 @app.get("/ui/admin_ots", response_class=HTMLResponse)
 def ui_admin_ots(request: Request):
-    return templates.TemplateResponse("admin_ots.html", {"request": request})
+    return pages.response(request, "admin_ots.html")
 
 # Lista OTs pendientes (con filtros opcionales)
 @app.get("/admin/ots/pending", response_model=List[schemas.OTOut])
-def admin_list_pending(sap: Optional[str] = None, tec: Optional[str] = None, skip: int = 0, limit: int = 200, db: Session = Depends(get_db)):
-    q = db.query(models.OT).filter(models.OT.pendiente == True)
-    if sap:
-        q = q.filter(models.OT.sap_id.ilike(f"%{sap}%"))
-    if tec:
-        # filtrar por id_tecnico si tec es numérico, o por nombre (join) si no
-        try:
-            t_id = int(tec)
-            q = q.filter(models.OT.id_tecnico == t_id)
-        except ValueError:
-            q = q.join(models.Tecnico).filter(models.Tecnico.nombre.ilike(f"%{tec}%"))
-    return q.order_by(models.OT.inicio.desc()).offset(skip).limit(limit).all()
+async def admin_list_pending(sap: Optional[str] = None, tec: Optional[str] = None, skip: int = 0,
+                             limit: int = 200, cursor: Optional[str] = None, fields: Optional[str] = None,
+                             db: DbSession = Depends(get_db)):
+    cols = projection.parse_fields(fields, projection.OT_FIELDS)
+
+    def op(db: Session):
+        q = db.query(*projection.ot_columns(cols)).filter(models.OT.pendiente == True)
+        if sap:
+            q = q.filter(models.OT.sap_id.ilike(f"%{sap}%"))
+        if tec:
+            # filtrar por id_tecnico si tec es numérico, o por nombre (join) si no
+            try:
+                t_id = int(tec)
+                q = q.filter(models.OT.id_tecnico == t_id)
+            except ValueError:
+                q = q.join(models.Tecnico, models.Tecnico.id == models.OT.id_tecnico) \
+                     .filter(models.Tecnico.nombre.ilike(f"%{tec}%"))
+        # más recientes primero; cursor sobre (inicio, id)
+        return pagination.paginate(q, models.OT.inicio, models.OT.id, cursor, limit, desc=True,
+                                   skip=skip, nullable=False)
+    rows, next_cursor = await db.run(op)
+    return projection.response(rows, cols, pagination.next_cursor_headers(next_cursor))
 
 # Últimas N OTs cerradas
 @app.get("/admin/ots/closed", response_model=List[schemas.OTOut])
-def admin_list_closed(limit: int = 10, db: Session = Depends(get_db)):
-    q = db.query(models.OT).filter(models.OT.pendiente == False)
-    return q.order_by(models.OT.fin.desc().nullslast()).limit(limit).all()
+async def admin_list_closed(limit: int = 10, cursor: Optional[str] = None, fields: Optional[str] = None,
+                            include_archive: bool = True, db: DbSession = Depends(get_db)):
+    cols = projection.parse_fields(fields, projection.OT_FIELDS)
+
+    def op(db: Session):
+        sources = [(db.query(*projection.ot_columns(cols)).filter(models.OT.pendiente == False),
+                    models.OT.fin, models.OT.id)]
+        if include_archive:
+            # en ots_archive solo hay cerradas
+            sources.append((db.query(*projection.ot_columns(cols, model=models.OTArchive)),
+                            models.OTArchive.fin, models.OTArchive.id))
+        # cursor sobre (fin, id), las cerradas sin fecha de fin quedan al final
+        return pagination.paginate_merged(sources, cursor, limit, desc=True)
+    rows, next_cursor = await db.run(op)
+    return projection.response(rows, cols, pagination.next_cursor_headers(next_cursor))
 
 # Resumen: cantidad por material de OTs con procesoIntermedio = True (simple)
 @app.get("/admin/ots/summary")
-def admin_summary(db: Session = Depends(get_db)):
-    # devolvemos lista de {sap_id, total_proceso}
-    from sqlalchemy import func
-    rows = db.query(models.OT.sap_id, func.count(models.OT.id).label("total")).filter(models.OT.procesoIntermedio == True).group_by(models.OT.sap_id).all()
-    return [{"sap_id": r[0], "total": r[1]} for r in rows]
+async def admin_summary(db: DbSession = Depends(get_db)):
+    # devolvemos lista de {sap_id, total_proceso}, leída de los rollups (sin GROUP BY sobre ots)
+    return await db.run(rollups.summary_proceso_intermedio)
+
+# Estadísticas de carga: totales, por material y por técnico (pendientes / cerradas / proceso intermedio)
+@app.get("/admin/ots/stats", response_model=schemas.OTStats)
+async def admin_stats(sap_id: Optional[str] = None, id_tecnico: Optional[int] = None, db: DbSession = Depends(get_db)):
+    """
+    Sin filtros devuelve todo el desglose; con sap_id / id_tecnico solo esas filas
+    (lecturas por clave primaria de ot_rollups).
+    """
+    return await db.run(rollups.stats, sap_id, id_tecnico)
+
+# Series por día / hora para tableros: abiertas, cerradas y tiempo de ciclo (leídas de ot_timeseries)
+@app.get("/admin/ots/timeseries", response_model=schemas.OTTimeseries)
+async def admin_timeseries(desde: Optional[datetime] = Query(None, alias="from"),
+                           hasta: Optional[datetime] = Query(None, alias="to"),
+                           group_by: str = "all", grain: str = "day", key: Optional[str] = None,
+                           db: DbSession = Depends(get_db)):
+    """
+    group_by: all | material | tipo | marca | tecnico; grain: day | hour; rango [from, to) en UTC
+    (por defecto los últimos 30 días / 48 horas). key filtra una sola clave del group_by.
+    Ejemplo: /admin/ots/timeseries?from=2024-01-01&to=2024-02-01&group_by=tecnico
+    """
+    try:
+        return await db.run(timeseries.query, desde, hasta, grain, group_by, key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ---- operaciones masivas: un UPDATE por conjunto en una sola transacción ----
+
+def _bulk_criteria(sel: schemas.OTBulkSelection, pendiente: Optional[bool]):
+    if sel.ids is not None and len(sel.ids) > ot_service.OT_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo {ot_service.OT_BULK_MAX} ids por operación")
+    try:
+        return ot_service.bulk_criteria(sel.ids, sel.sap_id, sel.id_tecnico, pendiente)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _run_bulk(db: DbSession, criteria, values):
+    def op(db: Session):
+        try:
+            ids = ot_service.bulk_update(db, criteria, values)
+        except ValueError as e:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        db.commit()
+        return ot_service.load_ots(db, ids)
+    ots = await db.run(op)
+    for ot in ots:
+        ot_events.bus.publish(ot_events.OT_UPDATED, ot_service.ot_to_dict(ot))
+    return {"affected": len(ots), "ots": ots}
+
+# Cerrar varias OTs pendientes (por ids y/o sap_id / id_tecnico)
+@app.post("/admin/ots/bulk-close", response_model=schemas.OTBulkResult)
+async def admin_bulk_close(sel: schemas.OTBulkClose, db: DbSession = Depends(get_db)):
+    """
+    Ejemplos: {"ids": [12, 15, 18]}  |  {"sap_id": "40600244"}  |  {"id_tecnico": 3}
+    Solo toca las que siguen pendientes; todas quedan con el mismo `fin`.
+    """
+    criteria = _bulk_criteria(sel, pendiente=True)
+    return await _run_bulk(db, criteria, {"pendiente": False, "fin": ot_service.close_time()})
+
+# Editar varias OTs a la vez (reasignar técnico, marcar procesoIntermedio, etc.)
+@app.post("/admin/ots/bulk-update", response_model=schemas.OTBulkResult)
+async def admin_bulk_update(body: schemas.OTBulkUpdate, db: DbSession = Depends(get_db)):
+    """
+    Ejemplo (reasignar las pendientes de un técnico a otro):
+      {"id_tecnico": 3, "pendiente": true, "changes": {"id_tecnico": 7}}
+    """
+    values = ot_service.normalize_times(body.changes.dict(exclude_unset=True))
+    if not values:
+        raise HTTPException(status_code=400, detail="Sin cambios para aplicar")
+    criteria = _bulk_criteria(body, body.pendiente)
+    if values.get("id_tecnico") is not None:
+        tech = await db.run(cache.tecnico_by_id, values["id_tecnico"])
+        if not tech:
+            raise HTTPException(status_code=400, detail="Tecnico indicado no existe")
+    return await _run_bulk(db, criteria, values)
+
+# Archivar OTs cerradas hace más de `days` días (mueve de ots a ots_archive, un commit por lote)
+@app.post("/admin/ots/archive", response_model=schemas.OTArchiveReport)
+async def admin_archive_ots(days: int = archive.ARCHIVE_AFTER_DAYS, batch_size: int = archive.ARCHIVE_BATCH_SIZE,
+                            max_batches: Optional[int] = None, dry_run: bool = False,
+                            db: DbSession = Depends(get_db)):
+    """
+    Ejemplo: /admin/ots/archive?days=180&max_batches=10  (el resto queda en `remaining`)
+    dry_run=true solo cuenta las que se moverían.
+    """
+    try:
+        return await db.run(archive.archive_closed, days, batch_size, max_batches, dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Cerrar OT -> marcar pendiente = False y poner fin = ahora()
 @app.post("/admin/ots/{ot_id}/close")
-def admin_close_ot(ot_id: int, db: Session = Depends(get_db)):
-    ot = db.query(models.OT).filter(models.OT.id == ot_id).first()
-    if not ot:
-        raise HTTPException(status_code=404, detail="OT no encontrada")
-    ot.pendiente = False
-    from datetime import datetime, timezone
-    ot.fin = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(ot)
-    return {"status": "ok", "ot": ot}
+async def admin_close_ot(ot_id: int, db: DbSession = Depends(get_db)):
+    if write_queue.writer is not None:
+        ot = await write_queue.writer.close_ot(ot_id)
+        ot_events.bus.publish(ot_events.OT_UPDATED, ot)
+        return {"status": "ok", "ot": ot}
+
+    def op(db: Session):
+        # FOR UPDATE (Postgres): dos cierres / ediciones concurrentes no leen el mismo
+        # estado previo, si no los deltas de rollups y series se aplicarían dos veces
+        ot = db.query(models.OT).filter(models.OT.id == ot_id).with_for_update().first()
+        if not ot:
+            raise HTTPException(status_code=404, detail="OT no encontrada")
+        before, ts_before = rollups.state_of(ot), timeseries.state_of(ot)
+        ot.pendiente = False
+        ot.fin = ot_service.close_time()
+        rollups.apply_change(db, before, rollups.state_of(ot))
+        timeseries.apply_change(db, ts_before, timeseries.state_of(ot))
+        db.commit()
+        db.refresh(ot)
+        return {"status": "ok", "ot": ot}
+    result = await db.run(op)
+    ot_events.bus.publish(ot_events.OT_UPDATED, ot_service.ot_to_dict(result["ot"]))
+    return result
 
 # Actualizar OT (PUT) — permite editar observaciones, pendiente, fin, cantidad, id_tecnico
 @app.put("/admin/ots/{ot_id}", response_model=schemas.OTOut)
-def admin_update_ot(ot_id: int, ot_in: schemas.OTUpdate, db: Session = Depends(get_db)):
-    ot = db.query(models.OT).filter(models.OT.id == ot_id).first()
-    if not ot:
-        raise HTTPException(status_code=404, detail="OT no encontrada")
-    for k, v in ot_in.dict(exclude_unset=True).items():
-        setattr(ot, k, v)
-    db.commit()
-    db.refresh(ot)
+async def admin_update_ot(ot_id: int, ot_in: schemas.OTUpdate, db: DbSession = Depends(get_db)):
+    def op(db: Session):
+        ot = db.query(models.OT).filter(models.OT.id == ot_id).with_for_update().first()
+        if not ot:
+            raise HTTPException(status_code=404, detail="OT no encontrada")
+        before, ts_before = rollups.state_of(ot), timeseries.state_of(ot)
+        for k, v in ot_service.normalize_times(ot_in.dict(exclude_unset=True)).items():
+            setattr(ot, k, v)
+        rollups.apply_change(db, before, rollups.state_of(ot))
+        timeseries.apply_change(db, ts_before, timeseries.state_of(ot))
+        db.commit()
+        db.refresh(ot)
+        return ot
+    ot = await db.run(op)
+    ot_events.bus.publish(ot_events.OT_UPDATED, ot_service.ot_to_dict(ot))
     return ot
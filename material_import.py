@@ -0,0 +1,224 @@
+# material_import.py
+# Importación masiva de materiales (catálogo SAP) desde CSV o NDJSON.
+# Se parsea en streaming, se deduplica en memoria por SAP (gana la última línea) y se
+# hace upsert por lotes con INSERT ... ON CONFLICT(sap) DO UPDATE de las columnas que
+# trae la entrada, un commit por lote.
+#
+# Uso CLI:
+#   python material_import.py catalogo.csv
+#   python material_import.py catalogo.ndjson --format ndjson --batch-size 5000
+import csv
+import io
+import json
+import time
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+import models
+from database import dialect_insert
+
+FIELDS = ("sap", "breve_descripcion", "descripcion", "marca", "tipo")
+DEFAULT_BATCH_SIZE = 2000
+
+
+def iter_csv_rows(text_stream, delimiter=","):
+    """Lee un CSV con encabezado (sap, breve_descripcion, ...) fila por fila."""
+    for row in csv.DictReader(text_stream, delimiter=delimiter):
+        yield row
+
+
+def iter_ndjson_rows(text_stream):
+    """Lee un objeto JSON por línea; las líneas vacías se ignoran."""
+    for line in text_stream:
+        line = line.strip()
+        if line:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("cada línea NDJSON debe ser un objeto")
+            yield row
+
+
+def iter_rows(text_stream, fmt="csv", delimiter=","):
+    if fmt == "csv":
+        return iter_csv_rows(text_stream, delimiter=delimiter)
+    if fmt == "ndjson":
+        return iter_ndjson_rows(text_stream)
+    raise ValueError(f"Formato no soportado: {fmt}")
+
+
+def _clean(row):
+    # normaliza una fila: solo columnas conocidas que vinieron en la entrada (las que
+    # faltan no se tocan en el upsert), strings recortados, vacío -> None
+    out = {}
+    for k in FIELDS:
+        if k not in row:
+            continue
+        v = row[k]
+        if v is not None:
+            v = str(v).strip() or None
+        out[k] = v
+    return out
+
+
+def iter_batches(rows, batch_size, counts):
+    """
+    Agrupa las filas limpias en lotes {sap: fila} de hasta batch_size SAP distintos.
+    Un SAP repetido dentro del lote se combina con el anterior (gana la última línea,
+    columna por columna) y cuenta como skipped; las filas sin sap también.
+    Va sumando counts["total"] a medida que lee.
+    """
+    pending = {}
+    for raw in rows:
+        counts["total"] += 1
+        row = _clean(raw)
+        sap = row.get("sap")
+        if not sap:
+            counts["skipped"] += 1
+            continue
+        if sap in pending:
+            pending[sap].update(row)
+            counts["skipped"] += 1
+            continue
+        pending[sap] = row
+        if len(pending) >= batch_size:
+            yield pending
+            pending = {}
+    if pending:
+        yield pending
+
+
+def flush_batch(db, pending, update_existing, seen, counts):
+    """
+    Upsert de un lote de iter_batches y commit. Cada sentencia actualiza solo las
+    columnas presentes en sus filas (se agrupan por conjunto de columnas).
+    `seen` son los SAP de lotes anteriores de este import: esos se vuelven a escribir
+    (gana la última línea) pero ya se contaron, así que suman skipped.
+    """
+    table = models.Material.__table__
+    existing = set(db.execute(select(table.c.sap).where(table.c.sap.in_(list(pending)))).scalars())
+    groups = {}
+    for sap, row in pending.items():
+        if sap in seen:
+            counts["skipped"] += 1
+        elif sap not in existing:
+            counts["inserted"] += 1
+        elif update_existing:
+            counts["updated"] += 1
+        else:
+            counts["skipped"] += 1
+            continue
+        groups.setdefault((tuple(row), sap in existing), []).append(row)
+
+    for (cols, update), group in groups.items():
+        stmt = dialect_insert(db, table)
+        set_cols = [k for k in cols if k != "sap"]
+        if update and set_cols:
+            stmt = stmt.on_conflict_do_update(index_elements=["sap"],
+                                              set_={k: stmt.excluded[k] for k in set_cols})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["sap"])
+        db.execute(stmt, group)
+    db.commit()
+    seen.update(pending)
+
+
+def _new_counts():
+    return {"inserted": 0, "updated": 0, "skipped": 0, "total": 0}
+
+
+def _result(counts, started):
+    seconds = time.perf_counter() - started
+    return {
+        **counts,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(counts["total"] / seconds, 1) if seconds > 0 else float(counts["total"]),
+    }
+
+
+def import_materials(db, rows, batch_size=DEFAULT_BATCH_SIZE, update_existing=True):
+    """
+    Upsert de materiales desde cualquier iterable de dicts.
+    - filas sin sap -> skipped
+    - SAP repetido en el mismo import: gana la última línea (las anteriores suman skipped)
+    - solo se actualizan las columnas que trae la entrada (un CSV sap,breve_descripcion
+      no borra la descripción de los materiales existentes)
+    - update_existing=False: los SAP que ya están en la BD no se tocan (skipped)
+    Devuelve dict con inserted / updated / skipped / total / seconds / rows_per_second.
+    """
+    counts = _new_counts()
+    seen = set()
+    started = time.perf_counter()
+    try:
+        for pending in iter_batches(rows, batch_size, counts):
+            flush_batch(db, pending, update_existing, seen, counts)
+    except Exception:
+        db.rollback()
+        raise
+    return _result(counts, started)
+
+
+def _open_text(binary_file):
+    return io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+
+
+def import_file(db, binary_file, fmt="csv", delimiter=",", batch_size=DEFAULT_BATCH_SIZE, update_existing=True):
+    """Importa desde un archivo binario abierto (utf-8, con o sin BOM)."""
+    text_stream = _open_text(binary_file)
+    try:
+        rows = iter_rows(text_stream, fmt, delimiter=delimiter)
+        return import_materials(db, rows, batch_size=batch_size, update_existing=update_existing)
+    finally:
+        text_stream.detach()
+
+
+async def import_file_async(db, binary_file, fmt="csv", delimiter=",", batch_size=DEFAULT_BATCH_SIZE,
+                            update_existing=True):
+    """
+    import_file para los endpoints (recibe la DbSession de database.py): cada lote se
+    parsea en el threadpool y solo el upsert pasa por db.run, así con DB_MODE=async el
+    parseo del archivo no corre en el event loop (run_sync ejecuta todo fn en el loop).
+    """
+    counts = _new_counts()
+    seen = set()
+    started = time.perf_counter()
+    text_stream = _open_text(binary_file)
+    try:
+        batches = iter_batches(iter_rows(text_stream, fmt, delimiter=delimiter), batch_size, counts)
+        while True:
+            pending = await run_in_threadpool(next, batches, None)
+            if pending is None:
+                break
+            await db.run(flush_batch, pending, update_existing, seen, counts)
+    except Exception:
+        await db.run(lambda session: session.rollback())
+        raise
+    finally:
+        text_stream.detach()
+    return _result(counts, started)
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, engine
+    import migrations
+
+    parser = argparse.ArgumentParser(description="Importación masiva de materiales (CSV/NDJSON)")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None,
+                        help="por defecto se deduce de la extensión")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--no-update", action="store_true", help="no actualizar SAP existentes")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            result = import_file(db, f, fmt, delimiter=args.delimiter,
+                                 batch_size=args.batch_size, update_existing=not args.no_update)
+    finally:
+        db.close()
+    print(json.dumps(result))
@@ -0,0 +1,321 @@
+# metrics.py
+# Instrumentación por request para /metrics (formato de texto de Prometheus):
+#   - latencia por endpoint (método + ruta declarada, no la URL con ids)
+#   - SQL por request: cantidad de queries y tiempo total, con hooks
+#     before/after_cursor_execute del engine
+#   - tiempo dentro de db.run (query + armado de objetos ORM); el resto del request
+#     es validación / serialización / framework
+#   - sentencias idénticas repetidas en un mismo request (patrón N+1, p.ej. lazy
+#     loads de OT.material / OT.tecnico)
+# y un log opcional de requests lentos con las sentencias que más tardaron.
+#
+# Variables de entorno:
+#   SLOW_REQUEST_MS=500         loguea (logger "slow_requests") los requests más lentos que eso; 0 = apagado
+#   N_PLUS_ONE_THRESHOLD=5      repeticiones de la misma sentencia en un request para marcarla
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+slow_log = logging.getLogger("slow_requests")
+n_plus_one_log = logging.getLogger("n_plus_one")
+
+
+# ---- métricas ----
+
+def _labels_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1.0):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, v in items:
+            lines.append(f"{self.name}{_labels_str(self.labels, values)} {_num(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._data = {}   # label_values -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            d = self._data.get(label_values)
+            if d is None:
+                d = self._data[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    d[0][i] += 1
+                    break
+            d[1] += value
+            d[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._data.items())
+        for values, (counts, total, count) in items:
+            acc = 0
+            for b, c in zip(self.buckets, counts):
+                acc += c
+                labels = _labels_str(self.labels + ("le",), values + (_num(b),))
+                lines.append(f"{self.name}_bucket{labels} {acc}")
+            labels = _labels_str(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_num(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge calculado al momento del scrape (fn devuelve un número o {labels_tuple: número})."""
+    def __init__(self, name, help, fn, labels=()):
+        self.name, self.help, self.fn, self.labels = name, help, fn, tuple(labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.fn()
+        except Exception:   # un gauge roto no tiene que romper /metrics
+            return lines
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, v in items:
+            if v is not None:
+                lines.append(f"{self.name}{_labels_str(self.labels, values)} {_num(v)}")
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def gauge(name, help, fn, labels=()):
+    return register(Gauge(name, help, fn, labels))
+
+
+HTTP_LABELS = ("method", "route")
+http_requests = register(Counter("http_requests_total", "Requests HTTP atendidos", HTTP_LABELS + ("status",)))
+http_latency = register(Histogram("http_request_duration_seconds", "Latencia total del request", HTTP_LABELS))
+db_run_time = register(Histogram("http_request_db_seconds",
+                                 "Tiempo dentro de db.run por request (SQL + ORM)", HTTP_LABELS))
+sql_time = register(Histogram("http_request_sql_seconds", "Tiempo de SQL por request", HTTP_LABELS))
+sql_queries = register(Histogram("http_request_sql_queries", "Cantidad de queries SQL por request",
+                                 HTTP_LABELS, buckets=QUERY_COUNT_BUCKETS))
+sql_repeated = register(Counter("http_request_sql_repeated_total",
+                                "Requests con una misma sentencia repetida >= N_PLUS_ONE_THRESHOLD veces (N+1)",
+                                HTTP_LABELS))
+sql_statements = register(Counter("sql_statements_total", "Sentencias SQL ejecutadas (dentro y fuera de requests)"))
+sql_seconds = register(Counter("sql_seconds_total", "Tiempo total de SQL en segundos"))
+slow_requests = register(Counter("http_slow_requests_total", "Requests más lentos que SLOW_REQUEST_MS",
+                                 HTTP_LABELS))
+
+
+def render():
+    lines = []
+    for m in REGISTRY:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- estado por request ----
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "db_seconds", "statements", "batched")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.db_seconds = 0.0
+        self.statements = {}   # sql -> [veces, segundos]
+        self.batched = False   # trabajo por lotes: repetir sentencias es lo esperado, no N+1
+
+    def add_query(self, statement, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        s = self.statements.get(statement)
+        if s is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            s[0] += 1
+            s[1] += seconds
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        if self.batched:
+            return []
+        return [(sql, n) for sql, (n, _) in self.statements.items() if n >= threshold]
+
+    def top_statements(self, n=5):
+        return sorted(self.statements.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+
+
+# El objeto se crea en el middleware y se muta desde el threadpool / greenlet de db.run:
+# el contexto se copia al thread, pero apunta al mismo RequestStats.
+current = contextvars.ContextVar("request_stats", default=None)
+
+
+def batched_request():
+    """
+    Marca el request actual como trabajo por lotes (p.ej. archive.archive_closed: las mismas
+    sentencias una vez por lote). Se siguen midiendo sus queries, pero no cuentan como N+1.
+    Fuera de un request no hace nada.
+    """
+    stats = current.get()
+    if stats is not None:
+        stats.batched = True
+
+
+class db_timer:
+    """Context manager para DbSession.run: suma el tiempo al request actual."""
+    __slots__ = ("t0",)
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        stats = current.get()
+        if stats is not None:
+            stats.db_seconds += time.perf_counter() - self.t0
+
+
+# ---- hooks de SQLAlchemy ----
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    sql_statements.inc()
+    sql_seconds.inc(amount=elapsed)
+    stats = current.get()
+    if stats is not None:
+        stats.add_query(statement, elapsed)
+
+
+def instrument_engine(eng):
+    """Registra los hooks de cursor en un engine sync (o en async_engine.sync_engine)."""
+    if not event.contains(eng, "before_cursor_execute", _before_cursor_execute):
+        event.listen(eng, "before_cursor_execute", _before_cursor_execute)
+        event.listen(eng, "after_cursor_execute", _after_cursor_execute)
+    return eng
+
+
+# ---- middleware ----
+
+_reported_n_plus_one = set()
+
+
+def _short(sql, limit=300):
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: mide cada request hasta el último byte del body.
+    La ruta es la plantilla declarada (/admin/ots/{ot_id}/close) para no explotar
+    la cardinalidad; lo que no matchea ninguna ruta queda como "unmatched".
+    Los streams SSE (/ots/stream) no se miden: duran lo que dure la conexión.
+    """
+    def __init__(self, app, slow_request_ms=SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current.set(stats)
+        status = 500
+        streaming = False
+        t0 = time.perf_counter()
+
+        async def wrapped_send(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(k.lower() == b"content-type" and v.startswith(b"text/event-stream")
+                                for k, v in message.get("headers", []))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            current.reset(token)
+            if not streaming:
+                self._record(scope, status, time.perf_counter() - t0, stats)
+
+    def _record(self, scope, status, elapsed, stats):
+        route = scope.get("route")
+        labels = (scope["method"], getattr(route, "path", None) or "unmatched")
+        http_requests.inc(*labels, str(status))
+        http_latency.observe(elapsed, *labels)
+        db_run_time.observe(stats.db_seconds, *labels)
+        sql_time.observe(stats.sql_seconds, *labels)
+        sql_queries.observe(stats.queries, *labels)
+
+        repeated = stats.repeated()
+        if repeated:
+            sql_repeated.inc(*labels)
+            for sql, n in repeated:
+                # se loguea una vez por (ruta, sentencia); el contador sigue sumando
+                if (labels, sql) in _reported_n_plus_one:
+                    continue
+                _reported_n_plus_one.add((labels, sql))
+                n_plus_one_log.warning("%s %s: sentencia repetida %d veces en un request: %s",
+                                       labels[0], labels[1], n, _short(sql))
+
+        if self.slow_request_ms and elapsed * 1000.0 >= self.slow_request_ms:
+            slow_requests.inc(*labels)
+            top = "\n".join(f"    {n}x {secs * 1000.0:.1f} ms  {_short(sql)}"
+                            for sql, (n, secs) in stats.top_statements())
+            slow_log.warning("%s %s -> %s en %.1f ms (db.run %.1f ms, SQL %.1f ms en %d queries)\n%s",
+                             scope["method"], scope.get("path"), status, elapsed * 1000.0,
+                             stats.db_seconds * 1000.0, stats.sql_seconds * 1000.0, stats.queries, top)
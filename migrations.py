@@ -0,0 +1,73 @@
+# migrations.py
+# Cambios de esquema para BDs que ya existían antes (create_all solo crea tablas
+# nuevas; no agrega índices a tablas existentes).
+#
+# También llena las tablas derivadas de ots (ot_rollups, ot_timeseries / ot_cycle_hist)
+# cuando están vacías en una BD con OTs. El backfill de las series recorre todas las OTs:
+# con cientos de miles tarda minutos, y con DB_AUTO_MIGRATE=1 eso pasa en el arranque de
+# la app. Para BDs grandes, correr `python migrations.py` una vez antes del deploy y
+# levantar los workers con DB_AUTO_MIGRATE=0.
+#
+# Uso: python migrations.py
+import logging
+
+from sqlalchemy import inspect, select
+
+from database import engine, Base
+import models
+import search
+import rollups
+import timeseries
+from database import SessionLocal
+
+log = logging.getLogger("migrations")
+
+
+def create_missing_indexes(bind):
+    """Crea los índices declarados en los modelos que falten en la BD. Devuelve sus nombres."""
+    insp = inspect(bind)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=bind)
+                created.append(index.name)
+    return created
+
+
+def _empty_with_ots(db, model):
+    """True si la tabla derivada `model` está vacía pero ya hay OTs (en ots o en ots_archive)."""
+    if db.execute(select(model).limit(1)).first() is not None:
+        return False
+    return any(db.execute(select(m.id).limit(1)).first() is not None for m in (models.OT, models.OTArchive))
+
+
+def upgrade(bind=engine):
+    """
+    create_all + índices faltantes + FTS. Además llena los contadores derivados de ots
+    si están vacíos en una BD que ya tiene OTs (tabla recién creada, o creada vacía por
+    un create_all suelto). Es el punto de entrada para preparar cualquier BD.
+    """
+    Base.metadata.create_all(bind=bind)
+    created = create_missing_indexes(bind)
+    db = SessionLocal(bind=bind)
+    try:
+        if _empty_with_ots(db, models.OTRollup):
+            rollups.rebuild(db)
+        if timeseries.TIMESERIES_GRAINS and _empty_with_ots(db, models.OTTimeseries):
+            # lineal en la cantidad de OTs (~8 s cada 20k; ~7 min con 1M): ver nota arriba
+            log.info("Llenando ot_timeseries desde las OTs existentes (puede tardar con muchas OTs)")
+            timeseries.backfill(db)
+    finally:
+        db.close()
+    # índice de texto completo para /materials/?q= (no-op si no es SQLite con FTS5)
+    search.setup_fts(bind)
+    return created
+
+
+if __name__ == "__main__":
+    created = upgrade()
+    print("Índices creados: " + (", ".join(created) if created else "ninguno (ya estaban)"))
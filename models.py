@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -41,3 +41,83 @@ class OT(Base):
     # relaciones
     material = relationship("Material", back_populates="ots", foreign_keys=[sap_id])
     tecnico = relationship("Tecnico", back_populates="ots")
+
+    # índices compuestos alineados con los filtros/orden de los listados
+    # (en BDs existentes los crea migrations.py)
+    __table_args__ = (
+        Index("ix_ots_inicio", "inicio"),                                   # /ots/
+        Index("ix_ots_pendiente_inicio", "pendiente", "inicio"),            # /admin/ots/pending
+        Index("ix_ots_pendiente_fin", "pendiente", "fin"),                  # /admin/ots/closed
+        Index("ix_ots_proceso_sap", "procesoIntermedio", "sap_id"),         # /admin/ots/summary
+        Index("ix_ots_tecnico_pendiente", "id_tecnico", "pendiente", "inicio"),  # pendientes por técnico
+    )
+
+
+class OTCounter(Base):
+    # secuencia para el número legible de OT (id_ot = OT-0001, ...),
+    # así la OT se inserta con su id_ot en un solo commit
+    __tablename__ = "ot_counters"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class OTRollup(Base):
+    # contadores de OTs mantenidos en la misma transacción que cada alta/cierre/edición
+    # dim: 'all' (key ''), 'material' (key = sap_id), 'tecnico' (key = id_tecnico, '' = sin técnico)
+    __tablename__ = "ot_rollups"
+    dim = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    pendientes = Column(Integer, nullable=False, default=0)
+    cerradas = Column(Integer, nullable=False, default=0)
+    proceso_intermedio = Column(Integer, nullable=False, default=0)
+
+
+class OTTimeseries(Base):
+    # series por período (timeseries.py): OTs abiertas / cerradas y tiempo de ciclo,
+    # mantenidas en la misma transacción que cada alta / cierre / edición.
+    # grain: 'day' | 'hour'; period: inicio del período en UTC (abiertas por inicio, cerradas por fin)
+    # dim: 'all' | 'material' | 'tipo' | 'marca' | 'tecnico' (key como en ot_rollups)
+    __tablename__ = "ot_timeseries"
+    grain = Column(String, primary_key=True)
+    dim = Column(String, primary_key=True)
+    period = Column(DateTime, primary_key=True)
+    key = Column(String, primary_key=True)
+    abiertas = Column(Integer, nullable=False, default=0)
+    cerradas = Column(Integer, nullable=False, default=0)
+    ciclo_n = Column(Integer, nullable=False, default=0)          # cerradas con inicio (tiempo de ciclo conocido)
+    ciclo_sum_s = Column(Float, nullable=False, default=0.0)
+
+
+class OTCycleHistogram(Base):
+    # histograma del tiempo de ciclo (fin - inicio) de las cerradas en cada período,
+    # para estimar percentiles sin leer ots (bucket = índice en timeseries.CYCLE_BOUNDS_H)
+    __tablename__ = "ot_cycle_hist"
+    grain = Column(String, primary_key=True)
+    dim = Column(String, primary_key=True)
+    period = Column(DateTime, primary_key=True)
+    key = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    n = Column(Integer, nullable=False, default=0)
+
+
+class OTArchive(Base):
+    # OTs cerradas hace más de ARCHIVE_AFTER_DAYS días, movidas por archive.py para que
+    # `ots` quede chica. Mismas columnas (y mismo id) que OT; solo lectura desde la API.
+    __tablename__ = "ots_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    id_ot = Column(String, unique=True, nullable=True)
+    sap_id = Column(String, nullable=False, index=True)
+    id_tecnico = Column(Integer, nullable=True)
+    cantidad = Column(Integer)
+    inicio = Column(DateTime)
+    fin = Column(DateTime, nullable=True)
+    pendiente = Column(Boolean)
+    procesoIntermedio = Column(Boolean)
+    observaciones = Column(String, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ots_archive_inicio", "inicio", "id"),   # /ots/export, /ots/
+        Index("ix_ots_archive_fin", "fin", "id"),         # /admin/ots/closed
+    )
@@ -0,0 +1,110 @@
+# ot_events.py
+# Pub/sub en proceso para el feed en vivo de OTs (/ots/stream, Server-Sent Events).
+# create_ot / admin_close_ot / admin_update_ot publican la OT creada o modificada y las
+# pantallas aplican el delta en vez de volver a bajar los listados.
+#
+# Los ids de evento son "<boot>-<seq>", con `boot` único por proceso: si el cliente
+# reconecta con un Last-Event-ID que este proceso no emitió (otro arranque u otro
+# worker) o más viejo que el buffer, recibe un evento `reset` y recarga el listado
+# completo una vez.
+#
+# Al suscribirse el stream manda primero `ready` (sin id): recién ahí el cliente pide el
+# snapshot de los listados, y aplica encima los deltas que llegaron mientras tanto. Así
+# no se pierde una escritura que cae entre la lectura del snapshot y la suscripción.
+#
+# Nota: el bus es por proceso. Con varios workers cada uno publica solo sus propias
+# escrituras; para eso hay que correr un solo worker o poner un broker delante.
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+
+from fastapi.encoders import jsonable_encoder
+
+OT_EVENTS_BUFFER = int(os.getenv("OT_EVENTS_BUFFER", "1000"))
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 3000
+
+OT_CREATED = "ot_created"
+OT_UPDATED = "ot_updated"
+RESET = "reset"
+READY = "ready"
+
+
+class OTEventBus:
+    def __init__(self, buffer_size=OT_EVENTS_BUFFER):
+        self.boot = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._buffer = deque(maxlen=buffer_size)   # (seq, sse_bytes)
+        self._subscribers = set()
+
+    def _format(self, seq, event, data):
+        payload = json.dumps(jsonable_encoder(data), separators=(",", ":"))
+        return f"id: {self.boot}-{seq}\nevent: {event}\ndata: {payload}\n\n"
+
+    def publish(self, event, data):
+        """Publica un evento. Llamar desde el event loop (después del commit)."""
+        self._seq += 1
+        msg = self._format(self._seq, event, data)
+        self._buffer.append((self._seq, msg))
+        for q in list(self._subscribers):
+            try:
+                q.put_nowait(msg)
+            except asyncio.QueueFull:
+                # cliente demasiado lento: se le corta el stream con un reset y recarga
+                self._subscribers.discard(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(self._format(self._seq, RESET, {}))
+                q.put_nowait(None)
+
+    def _backlog(self, last_event_id):
+        """Eventos a reenviar tras una reconexión, o [reset] si no se pueden recuperar."""
+        if not last_event_id:
+            return []
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self.boot or not seq.isdigit() or int(seq) > self._seq:
+            # no lo emitió este proceso: no hay forma de saber qué le falta
+            return [self._format(self._seq, RESET, {})]
+        seq = int(seq)
+        if self._buffer and seq < self._buffer[0][0] - 1:
+            return [self._format(self._seq, RESET, {})]
+        return [msg for s, msg in self._buffer if s > seq]
+
+    def subscribe(self, last_event_id=None, maxsize=1000):
+        q = asyncio.Queue(maxsize=maxsize)
+        for msg in self._backlog(last_event_id):
+            q.put_nowait(msg)
+        self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self._subscribers.discard(q)
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    async def stream(self, request, last_event_id=None):
+        """Generador SSE para StreamingResponse."""
+        q = self.subscribe(last_event_id)
+        try:
+            # ready va sin id: no cambia el Last-Event-ID con el que reconecta el navegador
+            yield f"retry: {RETRY_MS}\n\nevent: {READY}\ndata: {{}}\n\n"
+            while True:
+                try:
+                    msg = await asyncio.wait_for(q.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if msg is None:
+                    break
+                yield msg
+        finally:
+            self.unsubscribe(q)
+
+
+bus = OTEventBus()
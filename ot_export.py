@@ -0,0 +1,208 @@
+# ot_export.py
+# Exportación del histórico de OTs (CSV / NDJSON) en streaming.
+# Se lee con un cursor del lado del servidor (stream_results + yield_per) sobre
+# tuplas de columnas, sin instancias ORM ni schemas: la memoria queda acotada al
+# tamaño de un lote sin importar cuántas filas salgan.
+# Las OTs archivadas (ots_archive) salen junto con las de ots: cada tabla se lee con
+# su propio cursor ordenado y los dos se intercalan por (inicio, id) con un merge.
+#
+# Uso CLI:
+#   python ot_export.py --format csv --desde 2024-01-01 --hasta 2024-02-01 > ots_enero.csv
+import csv
+import heapq
+import io
+import json
+from itertools import islice
+from datetime import datetime
+
+from sqlalchemy import select
+
+import models
+from ot_service import naive_utc
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+FIELDS = ("id", "id_ot", "sap_id", "id_tecnico", "cantidad", "inicio", "fin",
+          "pendiente", "procesoIntermedio", "observaciones")
+NAME_FIELDS = ("material_breve_descripcion", "tecnico_nombre")
+YIELD_PER = 1000
+
+
+def export_query(desde=None, hasta=None, sap_id=None, id_tecnico=None, pendiente=None, include_names=False,
+                 model=models.OT):
+    """
+    SELECT de columnas planas sobre `model` (OT u OTArchive), filtrado por rango de
+    inicio [desde, hasta) y ordenado por (inicio, id).
+    """
+    ot = model
+    cols = [getattr(ot, f) for f in FIELDS]
+    if include_names:
+        cols += [models.Material.breve_descripcion.label(NAME_FIELDS[0]),
+                 models.Tecnico.nombre.label(NAME_FIELDS[1])]
+    stmt = select(*cols)
+    if include_names:
+        stmt = (stmt.outerjoin(models.Material, models.Material.sap == ot.sap_id)
+                    .outerjoin(models.Tecnico, models.Tecnico.id == ot.id_tecnico))
+    if desde is not None:
+        stmt = stmt.where(ot.inicio >= desde)
+    if hasta is not None:
+        stmt = stmt.where(ot.inicio < hasta)
+    if sap_id is not None:
+        stmt = stmt.where(ot.sap_id == sap_id)
+    if id_tecnico is not None:
+        stmt = stmt.where(ot.id_tecnico == id_tecnico)
+    if pendiente is not None:
+        stmt = stmt.where(ot.pendiente == pendiente)
+    # (inicio, id) recorre ix_ots_inicio / ix_ots_archive_inicio; el rango de fechas es un seek
+    return stmt.order_by(ot.inicio, ot.id)
+
+
+def export_queries(desde=None, hasta=None, sap_id=None, id_tecnico=None, pendiente=None, include_names=False,
+                   include_archive=True):
+    """Una consulta por tabla (ots y, si corresponde, ots_archive) para iter_export / aiter_export."""
+    # inicio se guarda en UTC naive: un desde con offset se convierte antes de comparar
+    args = (naive_utc(desde), naive_utc(hasta), sap_id, id_tecnico, pendiente, include_names)
+    stmts = [export_query(*args)]
+    # en el archivo solo hay cerradas: con pendiente=true no hace falta leerlo
+    if include_archive and pendiente is not True:
+        stmts.append(export_query(*args, model=models.OTArchive))
+    return stmts
+
+
+def columns(include_names=False):
+    return FIELDS + (NAME_FIELDS if include_names else ())
+
+
+def _value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def encode_csv(rows, header=None):
+    """Codifica un lote de filas (tuplas) como CSV; con header agrega la línea de encabezado."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    if header:
+        w.writerow(header)
+    w.writerows([_value(v) for v in r] for r in rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def encode_ndjson(rows, names):
+    return "".join(
+        json.dumps({k: _value(v) for k, v in zip(names, r)}, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for r in rows
+    ).encode("utf-8")
+
+
+class _Encoder:
+    """Convierte lotes de tuplas a bytes; el encabezado CSV sale siempre, aunque no haya filas."""
+    def __init__(self, fmt, names):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato no soportado: {fmt}")
+        self.fmt = fmt
+        self.names = names
+
+    def header(self):
+        return encode_csv([], header=self.names) if self.fmt == "csv" else b""
+
+    def chunk(self, rows):
+        return encode_csv(rows) if self.fmt == "csv" else encode_ndjson(rows, self.names)
+
+
+def _sort_key(names, nulls_first):
+    """Clave (inicio, id) con los NULL donde los pone el motor (primero en SQLite, al final en Postgres)."""
+    i, j = names.index("inicio"), names.index("id")
+
+    def key(r):
+        return ((r[i] is not None) if nulls_first else (r[i] is None), r[i] or datetime.min, r[j])
+    return key
+
+
+async def _amerge(results, key):
+    """heapq.merge para resultados async: intercala filas ya ordenadas de cada cursor."""
+    iters = [r.__aiter__() for r in results]
+    heap = []
+    for n, it in enumerate(iters):
+        row = await anext(it, None)
+        if row is not None:
+            heap.append((key(row), n, row))
+    heapq.heapify(heap)
+    while heap:
+        _, n, row = heap[0]
+        yield row
+        nxt = await anext(iters[n], None)
+        if nxt is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (key(nxt), n, nxt))
+
+
+def iter_export(engine, stmts, fmt, names, yield_per=YIELD_PER):
+    """
+    Generador sync (StreamingResponse lo consume desde el threadpool). Abre su propia
+    conexión; con varias consultas (export_queries) las intercala por (inicio, id).
+    """
+    stmts = stmts if isinstance(stmts, (list, tuple)) else [stmts]
+    enc = _Encoder(fmt, names)
+    yield enc.header()
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=yield_per)
+        results = [conn.execute(s) for s in stmts]
+        if len(results) == 1:
+            for rows in results[0].partitions():
+                yield enc.chunk(rows)
+            return
+        rows = heapq.merge(*results, key=_sort_key(names, engine.dialect.name == "sqlite"))
+        while True:
+            batch = list(islice(rows, yield_per))
+            if not batch:
+                break
+            yield enc.chunk(batch)
+
+
+async def aiter_export(async_engine, stmts, fmt, names, yield_per=YIELD_PER):
+    """Versión para DB_MODE=async: AsyncConnection.stream, sin ocupar threads."""
+    stmts = stmts if isinstance(stmts, (list, tuple)) else [stmts]
+    enc = _Encoder(fmt, names)
+    yield enc.header()
+    async with async_engine.connect() as conn:
+        results = [await conn.stream(s.execution_options(yield_per=yield_per)) for s in stmts]
+        if len(results) == 1:
+            async for rows in results[0].partitions():
+                yield enc.chunk(rows)
+            return
+        batch = []
+        async for row in _amerge(results, _sort_key(names, async_engine.dialect.name == "sqlite")):
+            batch.append(row)
+            if len(batch) >= yield_per:
+                yield enc.chunk(batch)
+                batch = []
+        if batch:
+            yield enc.chunk(batch)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Exporta OTs a CSV o NDJSON (stdout)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--desde", type=datetime.fromisoformat)
+    parser.add_argument("--hasta", type=datetime.fromisoformat)
+    parser.add_argument("--sap-id")
+    parser.add_argument("--id-tecnico", type=int)
+    parser.add_argument("--pendiente", choices=("true", "false"))
+    parser.add_argument("--include-names", action="store_true", help="incluir descripción del material y nombre del técnico")
+    parser.add_argument("--no-archive", action="store_true", help="no incluir las OTs de ots_archive")
+    args = parser.parse_args()
+
+    pend = None if args.pendiente is None else args.pendiente == "true"
+    stmts = export_queries(args.desde, args.hasta, args.sap_id, args.id_tecnico, pend, args.include_names,
+                           include_archive=not args.no_archive)
+    out = sys.stdout.buffer
+    for chunk in iter_export(engine, stmts, args.format, columns(args.include_names)):
+        out.write(chunk)
+    out.flush()
@@ -0,0 +1,175 @@
+# ot_service.py
+# Lógica compartida de creación de OTs (alta simple y por lote).
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import select, text, update
+
+import models
+import rollups
+import timeseries
+
+OT_COUNTER = "ots"
+# máximo de OTs por request en POST /ots/batch
+OT_BATCH_MAX = 1000
+# máximo de OTs afectadas por /admin/ots/bulk-close y /admin/ots/bulk-update
+OT_BULK_MAX = 5000
+# ids por sentencia en los UPDATE ... WHERE id IN (...) (límite de parámetros de SQLite)
+IN_CHUNK = 500
+
+
+def format_id_ot(number):
+    # formato: OT-0001 (4 dígitos) — ajustá f-string si querés otro formato
+    return f"OT-{number:04d}"
+
+
+def allocate_ot_numbers(db, n=1):
+    """
+    Reserva n números consecutivos de OT dentro de la transacción actual y
+    devuelve el primero. El UPDATE toma el lock de escritura, así que dos
+    requests concurrentes nunca reciben el mismo rango. No hace commit.
+    """
+    counter = models.OTCounter.__table__
+    bump = update(counter).where(counter.c.name == OT_COUNTER).values(value=counter.c.value + n)
+    if db.execute(bump).rowcount == 0:
+        # primera vez: arrancamos desde el mayor id existente (compatible con los OT-{id:04d} viejos),
+        # contando también las archivadas
+        db.execute(
+            text(
+                "INSERT INTO ot_counters (name, value) "
+                "SELECT :name, COALESCE(MAX(id), 0) "
+                "FROM (SELECT id FROM ots UNION ALL SELECT id FROM ots_archive) AS t WHERE 1 = 1 "
+                "ON CONFLICT (name) DO NOTHING"
+            ),
+            {"name": OT_COUNTER},
+        )
+        db.execute(bump)
+    last = db.execute(select(counter.c.value).where(counter.c.name == OT_COUNTER)).scalar_one()
+    return last - n + 1
+
+
+def build_ot(ot_in, number):
+    """Arma la instancia OT (sin agregarla a la sesión) con su id_ot ya asignado."""
+    return models.OT(
+        id_ot=format_id_ot(number),
+        sap_id=ot_in.sap_id,
+        id_tecnico=ot_in.id_tecnico,
+        cantidad=ot_in.cantidad,
+        observaciones=ot_in.observaciones,
+        procesoIntermedio=ot_in.procesoIntermedio,
+        # sin inicio -> ahora; con offset (-03:00) se pasa a UTC antes de guardarlo
+        inicio=naive_utc(ot_in.inicio) or close_time(),
+        pendiente=True  # por defecto pendiente = True
+    )
+
+
+def naive_utc(dt):
+    """
+    datetime naive en UTC, que es como se guardan inicio / fin (la columna no guarda el
+    offset: un 22:30-03:00 sin convertir quedaría como 22:30). Los naive se toman como UTC.
+    """
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def normalize_times(values):
+    """Pasa a naive_utc el inicio / fin de un dict de cambios (PUT, bulk-update). Lo modifica y lo devuelve."""
+    for key in ("inicio", "fin"):
+        if values.get(key) is not None:
+            values[key] = naive_utc(values[key])
+    return values
+
+
+def close_time():
+    """
+    `fin` de un cierre: ahora en UTC, naive (como se guarda y como lo devuelve la BD).
+    La usan el cierre directo, el cierre por lote y la cola de escritura.
+    """
+    return naive_utc(datetime.now(timezone.utc))
+
+
+def missing_references(db, ots_in):
+    """
+    Valida con una consulta por conjunto los sap_id e id_tecnico referenciados.
+    Devuelve (saps_faltantes, tecnicos_faltantes) ordenados.
+    """
+    saps = {o.sap_id for o in ots_in}
+    tecs = {o.id_tecnico for o in ots_in if o.id_tecnico}
+    found_saps = set()
+    found_tecs = set()
+    if saps:
+        found_saps = set(db.execute(select(models.Material.sap).where(models.Material.sap.in_(saps))).scalars())
+    if tecs:
+        found_tecs = set(db.execute(select(models.Tecnico.id).where(models.Tecnico.id.in_(tecs))).scalars())
+    return sorted(saps - found_saps), sorted(tecs - found_tecs)
+
+
+def ot_to_dict(ot):
+    """OT como dict plano (mismos campos que OTOut) para publicarla en el feed de eventos."""
+    return {c.name: getattr(ot, c.name) for c in models.OT.__table__.columns}
+
+
+def bulk_criteria(ids=None, sap_id=None, id_tecnico=None, pendiente=None):
+    """
+    Condiciones WHERE para las operaciones masivas: lista de ids y/o filtros.
+    Sin ids ni filtros -> ValueError (no se actualiza toda la tabla por accidente).
+    """
+    ot = models.OT
+    criteria = []
+    if ids is not None:
+        criteria.append(ot.id.in_(ids))
+    if sap_id is not None:
+        criteria.append(ot.sap_id == sap_id)
+    if id_tecnico is not None:
+        criteria.append(ot.id_tecnico == id_tecnico)
+    if not criteria:
+        raise ValueError("Indicar ids o al menos un filtro (sap_id, id_tecnico)")
+    if pendiente is not None:
+        criteria.append(ot.pendiente == pendiente)
+    return criteria
+
+
+def bulk_update(db, criteria, values):
+    """
+    Aplica `values` a todas las OTs que cumplen `criteria` con UPDATE ... WHERE id IN (...)
+    y ajusta los rollups con un upsert por grupo (material / técnico / estado) y las series por período.
+    No hace commit. Devuelve los ids afectados.
+    """
+    ot = models.OT
+    # LIMIT máximo + 1: un filtro demasiado amplio se rechaza sin leer (ni bloquear) toda la tabla
+    rows = db.execute(
+        select(ot.id, ot.sap_id, ot.id_tecnico, ot.pendiente, ot.procesoIntermedio, ot.inicio, ot.fin)
+        .where(*criteria).order_by(ot.id).limit(OT_BULK_MAX + 1).with_for_update()
+    ).all()
+    if len(rows) > OT_BULK_MAX:
+        raise ValueError(f"La operación afecta más de {OT_BULK_MAX} OTs; acotá el filtro")
+    ids = [r.id for r in rows]
+    for i in range(0, len(ids), IN_CHUNK):
+        db.execute(update(ot).where(ot.id.in_(ids[i:i + IN_CHUNK])).values(**values)
+                   .execution_options(synchronize_session=False))
+
+    groups = Counter(
+        (rollups.state_of(r), rollups.state_of(SimpleNamespace(**{**r._asdict(), **values})))
+        for r in rows
+    )
+    rollups.apply_counts(db, [(before, after, n) for (before, after), n in groups.items()])
+    timeseries.apply_changes(db, [
+        (timeseries.state_of(r), timeseries.state_of(SimpleNamespace(**{**r._asdict(), **values}))) for r in rows
+    ])
+    return ids
+
+
+def load_ots(db, ids, for_update=False):
+    """
+    OTs por id (en bloques), ordenadas por id. populate_existing: las que ya estaban en la
+    sesión se recargan de la BD, como un refresh (en DB_MODE=async no se expiran al commit).
+    for_update=True las bloquea hasta el commit (SELECT ... FOR UPDATE; SQLite lo ignora).
+    """
+    out = []
+    for i in range(0, len(ids), IN_CHUNK):
+        q = (db.query(models.OT).filter(models.OT.id.in_(ids[i:i + IN_CHUNK]))
+             .order_by(models.OT.id).populate_existing())
+        out.extend(q.with_for_update() if for_update else q)
+    return out
@@ -0,0 +1,107 @@
+# pagination.py
+# Paginación por cursor (keyset) para los listados de OTs.
+# El cursor es opaco para el cliente: base64 de [valor_de_orden, id] de la última fila.
+# Así cada página es un seek sobre el índice en vez de saltear `offset` filas.
+import base64
+import heapq
+import json
+from datetime import datetime
+from itertools import islice
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value, row_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Devuelve (datetime|None, id). Cursor mal formado -> 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        return (datetime.fromisoformat(value) if value is not None else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def order_by_keyset(q, col, id_col, desc=False):
+    # NULLs siempre al final, en ambos sentidos, para que el cursor sea determinístico
+    if desc:
+        return q.order_by(col.desc().nullslast(), id_col.desc())
+    return q.order_by(col.asc().nullslast(), id_col.asc())
+
+
+def after_cursor(q, col, id_col, cursor, desc=False, nullable=True):
+    """
+    Filtra las filas que vienen después del cursor según el orden de order_by_keyset.
+    Con nullable=False (p.ej. inicio, que siempre se completa al crear la OT) se omite
+    la rama `col IS NULL`, así el motor puede hacer el seek directo sobre el índice.
+    """
+    if not cursor:
+        return q
+    value, row_id = decode_cursor(cursor)
+    if value is None:
+        # ya estamos en la cola de NULLs: solo sigue el desempate por id
+        return q.filter(and_(col.is_(None), (id_col < row_id) if desc else (id_col > row_id)))
+    if desc:
+        cond = tuple_(col, id_col) < tuple_(value, row_id)
+    else:
+        cond = tuple_(col, id_col) > tuple_(value, row_id)
+    return q.filter(or_(cond, col.is_(None)) if nullable else cond)
+
+
+def paginate(q, col, id_col, cursor, limit, desc=False, skip=0, nullable=True):
+    """
+    Aplica cursor + orden + limit. Devuelve (filas, next_cursor);
+    next_cursor es None cuando no hay más páginas.
+    `skip` (offset) se mantiene por compatibilidad con los clientes viejos.
+    """
+    q = order_by_keyset(after_cursor(q, col, id_col, cursor, desc, nullable), col, id_col, desc)
+    if skip:
+        q = q.offset(skip)
+    rows = q.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, col.key), getattr(last, id_col.key))
+
+
+def _merge_key(col_key, id_key, desc):
+    # mismo orden que order_by_keyset (NULLs al final); None == None no rompe la comparación
+    if desc:
+        return lambda row: (getattr(row, col_key) is not None, getattr(row, col_key), getattr(row, id_key))
+    return lambda row: (getattr(row, col_key) is None, getattr(row, col_key), getattr(row, id_key))
+
+
+def paginate_merged(sources, cursor, limit, desc=False, skip=0, nullable=True):
+    """
+    paginate sobre varias consultas con las mismas columnas e ids disjuntos (ots y
+    ots_archive): `sources` es [(q, col, id_col), ...]. Cada una hace su propio seek
+    desde el cursor y trae hasta skip + limit + 1 filas; se intercalan con un merge
+    y el cursor resultante sirve para todas. Devuelve (filas, next_cursor).
+    """
+    parts = []
+    for q, col, id_col in sources:
+        q = order_by_keyset(after_cursor(q, col, id_col, cursor, desc, nullable), col, id_col, desc)
+        parts.append(q.limit(skip + limit + 1).all())
+    col_key, id_key = sources[0][1].key, sources[0][2].key
+    merged = heapq.merge(*parts, key=_merge_key(col_key, id_key, desc), reverse=desc)
+    rows = list(islice(merged, skip, skip + limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, col_key), getattr(last, id_key))
+
+
+def next_cursor_headers(next_cursor):
+    """Headers para una respuesta construida a mano (p.ej. projection.response)."""
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
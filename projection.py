@@ -0,0 +1,90 @@
+# projection.py
+# Camino rápido para los listados (materials, ots, admin): en vez de hidratar
+# instancias ORM y validarlas una por una con los schemas orm_mode, se seleccionan
+# solo las columnas de la respuesta como tuplas y se codifican directo a JSON
+# (orjson si está instalado). El JSON es el mismo que con response_model, así que
+# el schema de OpenAPI no cambia.
+#
+# `?fields=a,b,c` permite pedir un subconjunto (p.ej. el buscador de assign_ot.js
+# solo necesita sap y breve_descripcion).
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+import models
+import schemas
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(value):
+    # fechas como las serializa pydantic: ISO 8601 y UTC con "Z" (no "+00:00")
+    if isinstance(value, (datetime, date)):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return jsonable_encoder(value)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+        return json.dumps(content, default=_json_default, ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+
+def _schema_fields(schema):
+    # pydantic v2 (model_fields) o v1 (__fields__), en el orden del schema
+    return tuple(getattr(schema, "model_fields", None) or schema.__fields__)
+
+
+MATERIAL_FIELDS = _schema_fields(schemas.MaterialOut)
+OT_FIELDS = _schema_fields(schemas.OTOut)
+
+
+def parse_fields(fields, allowed):
+    """`a,b,c` -> tupla en el orden del schema. None/vacío -> todos. Campo desconocido -> 400."""
+    if not fields:
+        return allowed
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Campos desconocidos: {', '.join(sorted(unknown))} "
+                                   f"(disponibles: {', '.join(allowed)})")
+    return tuple(f for f in allowed if f in wanted)
+
+
+def columns(model, fields, extra=()):
+    """
+    Columnas a seleccionar: los campos pedidos y después las `extra` que falten
+    (claves de orden / cursor). Las extra no salen en la respuesta.
+    """
+    names = list(fields) + [k for k in extra if k not in fields]
+    return [getattr(model, name) for name in names]
+
+
+def material_columns(fields, extra=()):
+    return columns(models.Material, fields, extra)
+
+
+def ot_columns(fields, extra=("inicio", "fin", "id"), model=models.OT):
+    """Columnas de ots, o de ots_archive con model=models.OTArchive (mismos nombres)."""
+    return columns(model, fields, extra)
+
+
+def to_dicts(rows, fields):
+    # las columnas extra quedan al final de cada tupla: zip las descarta
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def response(rows, fields, headers=None):
+    return FastJSONResponse(to_dicts(rows, fields), headers=headers)
@@ -0,0 +1,152 @@
+# rollups.py
+# Contadores de OTs (por material, por técnico y total) mantenidos incrementalmente.
+# Cada alta / cierre / edición de OT aplica su delta en la misma transacción,
+# así /admin/ots/summary y /admin/ots/stats no recorren la tabla ots.
+#
+# Si los contadores se desincronizan (SQL a mano, restore, etc.):
+#   python rollups.py rebuild
+from collections import defaultdict
+
+from sqlalchemy import and_, case, delete, func, or_, select, union_all
+
+import models
+from database import dialect_insert
+
+COUNTERS = ("total", "pendientes", "cerradas", "proceso_intermedio")
+
+
+def state_of(ot):
+    """Lo que cuenta de una OT para los rollups (None = la OT no existe)."""
+    pendiente = True if ot.pendiente is None else bool(ot.pendiente)
+    return (ot.sap_id, ot.id_tecnico, pendiente, bool(ot.procesoIntermedio))
+
+
+def _keys(state):
+    sap_id, id_tecnico, _, _ = state
+    return [("all", ""), ("material", sap_id), ("tecnico", "" if id_tecnico is None else str(id_tecnico))]
+
+
+def _add(deltas, state, sign):
+    _, _, pendiente, proceso = state
+    for k in _keys(state):
+        d = deltas[k]
+        d["total"] += sign
+        d["pendientes" if pendiente else "cerradas"] += sign
+        if proceso:
+            d["proceso_intermedio"] += sign
+
+
+def apply_changes(db, changes):
+    """
+    changes: iterable de (estado_antes, estado_despues); None en el alta.
+    Acumula los deltas y hace un upsert por fila de rollup afectada. No hace commit.
+    """
+    apply_counts(db, ((before, after, 1) for before, after in changes))
+
+
+def apply_counts(db, changes):
+    """Como apply_changes, con (antes, despues, n) agrupados (UPDATEs por conjunto)."""
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for before, after, n in changes:
+        if before == after:
+            continue
+        if before is not None:
+            _add(deltas, before, -n)
+        if after is not None:
+            _add(deltas, after, +n)
+    rows = [{"dim": dim, "key": key, **d} for (dim, key), d in deltas.items() if any(d.values())]
+    if not rows:
+        return
+    table = models.OTRollup.__table__
+    stmt = dialect_insert(db, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dim", "key"],
+        set_={c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+    )
+    db.execute(stmt, rows)
+
+
+def apply_change(db, before, after):
+    apply_changes(db, [(before, after)])
+
+
+def rebuild(db):
+    """Recalcula todos los contadores desde ots + ots_archive (las archivadas siguen contando). Hace commit."""
+    cols = ("id", "sap_id", "id_tecnico", "pendiente", "procesoIntermedio")
+    ot = union_all(*[select(*[m.__table__.c[c] for c in cols]) for m in (models.OT, models.OTArchive)]).subquery().c
+    pend = func.coalesce(ot.pendiente, True)
+    aggs = [
+        func.count(ot.id),
+        func.sum(case((pend == True, 1), else_=0)),
+        func.sum(case((pend == True, 0), else_=1)),
+        func.sum(case((ot.procesoIntermedio == True, 1), else_=0)),
+    ]
+    rows = []
+    for dim, col in (("all", None), ("material", ot.sap_id), ("tecnico", ot.id_tecnico)):
+        q = select(*aggs) if col is None else select(col, *aggs).group_by(col)
+        for r in db.execute(q):
+            if col is None:
+                key, values = "", r
+            else:
+                key, values = ("" if r[0] is None else str(r[0])), r[1:]
+            if values[0]:
+                rows.append({"dim": dim, "key": key, **dict(zip(COUNTERS, (int(v or 0) for v in values)))})
+    db.execute(delete(models.OTRollup))
+    if rows:
+        db.execute(models.OTRollup.__table__.insert(), rows)
+    db.commit()
+    return len(rows)
+
+
+def _row_out(r):
+    return {c: getattr(r, c) for c in COUNTERS}
+
+
+def summary_proceso_intermedio(db):
+    """[{sap_id, total}] de OTs con procesoIntermedio, por material (compatible con el summary viejo)."""
+    rows = (db.query(models.OTRollup)
+            .filter(models.OTRollup.dim == "material", models.OTRollup.proceso_intermedio > 0)
+            .order_by(models.OTRollup.key).all())
+    return [{"sap_id": r.key, "total": r.proceso_intermedio} for r in rows]
+
+
+def stats(db, sap_id=None, id_tecnico=None):
+    """Totales + desglose por material y por técnico (o solo los pedidos)."""
+    q = db.query(models.OTRollup)
+    if sap_id is not None or id_tecnico is not None:
+        wanted = [("all", "")]
+        if sap_id is not None:
+            wanted.append(("material", sap_id))
+        if id_tecnico is not None:
+            wanted.append(("tecnico", str(id_tecnico)))
+        # búsquedas por clave primaria: no depende del tamaño de ots ni de rollups
+        rows = q.filter(or_(*[and_(models.OTRollup.dim == d, models.OTRollup.key == k) for d, k in wanted])).all()
+    else:
+        rows = q.all()
+
+    out = {"total": dict.fromkeys(COUNTERS, 0), "por_material": [], "por_tecnico": []}
+    for r in rows:
+        if r.dim == "all":
+            out["total"] = _row_out(r)
+        elif r.dim == "material":
+            out["por_material"].append({"sap_id": r.key, **_row_out(r)})
+        elif r.dim == "tecnico":
+            out["por_tecnico"].append({"id_tecnico": int(r.key) if r.key else None, **_row_out(r)})
+    out["por_material"].sort(key=lambda x: x["sap_id"])
+    out["por_tecnico"].sort(key=lambda x: (x["id_tecnico"] is None, x["id_tecnico"] or 0))
+    return out
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Uso: python rollups.py rebuild")
+        sys.exit(2)
+    db = SessionLocal()
+    try:
+        n = rebuild(db)
+    finally:
+        db.close()
+    print(f"Rollups reconstruidos: {n} filas.")
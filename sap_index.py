@@ -0,0 +1,78 @@
+# sap_index.py
+# Índice en memoria de códigos SAP para el autocompletado de /materials/suggest.
+# Lista ordenada + bisect: cada búsqueda por prefijo es O(log n + k) sin tocar la BD.
+import bisect
+import os
+import threading
+import time
+
+import models
+
+# cada worker tiene su propia copia; se recarga completa pasado este tiempo
+# para tomar materiales creados por otros workers (0 = no recargar por edad)
+SAP_INDEX_MAX_AGE = float(os.getenv("SAP_INDEX_MAX_AGE", "300"))
+
+
+class SapIndex:
+    def __init__(self, max_age=SAP_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self._saps = []       # códigos SAP ordenados
+        self._breve = {}      # sap -> breve_descripcion
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        """Carga (o recarga) el índice completo desde la tabla materials."""
+        rows = db.query(models.Material.sap, models.Material.breve_descripcion).all()
+        breve = {sap: desc or "" for sap, desc in rows}
+        saps = sorted(breve)
+        with self._lock:
+            self._saps = saps
+            self._breve = breve
+            self._loaded_at = time.monotonic()
+
+    def is_stale(self):
+        if self._loaded_at is None:
+            return True
+        return bool(self.max_age) and time.monotonic() - self._loaded_at > self.max_age
+
+    def ensure_loaded(self, db):
+        if self.is_stale():
+            self.load(db)
+
+    def upsert(self, sap, breve_descripcion=None):
+        """Agrega o actualiza un material sin recargar todo (llamar después del commit)."""
+        with self._lock:
+            if sap not in self._breve:
+                bisect.insort(self._saps, sap)
+            self._breve[sap] = breve_descripcion or ""
+
+    def remove(self, sap):
+        with self._lock:
+            if sap in self._breve:
+                del self._breve[sap]
+                i = bisect.bisect_left(self._saps, sap)
+                if i < len(self._saps) and self._saps[i] == sap:
+                    del self._saps[i]
+
+    def invalidate(self):
+        """Fuerza recarga en el próximo uso."""
+        self._loaded_at = None
+
+    def suggest(self, prefix, limit=20):
+        """Devuelve [[sap, breve], ...] de los SAP que empiezan con prefix, en orden."""
+        with self._lock:
+            saps, breve = self._saps, self._breve
+            i = bisect.bisect_left(saps, prefix)
+            out = []
+            while i < len(saps) and len(out) < limit and saps[i].startswith(prefix):
+                out.append([saps[i], breve[saps[i]]])
+                i += 1
+        return out
+
+    def __len__(self):
+        return len(self._saps)
+
+
+# instancia única usada por main.py
+sap_index = SapIndex()
@@ -1,6 +1,6 @@
 # schemas.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 # Material
@@ -26,6 +26,14 @@ class MaterialOut(MaterialBase):
     class Config:
         orm_mode = True
 
+class MaterialImportResult(BaseModel):
+    inserted: int
+    updated: int
+    skipped: int
+    total: int
+    seconds: float
+    rows_per_second: float
+
 # Tecnico
 class TecnicoBase(BaseModel):
     nombre: str
@@ -76,3 +84,71 @@ class OTOut(OTBase):
     class Config:
         orm_mode = True
 
+# Operaciones masivas (admin): ids y/o filtros sobre las OTs a tocar
+class OTBulkSelection(BaseModel):
+    ids: Optional[List[int]] = None
+    sap_id: Optional[str] = None
+    id_tecnico: Optional[int] = None
+
+class OTBulkClose(OTBulkSelection):
+    pass
+
+class OTBulkUpdate(OTBulkSelection):
+    pendiente: Optional[bool] = None    # filtro (no cambio): p.ej. solo las pendientes
+    changes: OTUpdate
+
+class OTBulkResult(BaseModel):
+    affected: int
+    ots: List[OTOut] = []
+
+
+# Estadísticas (rollups)
+class OTCounts(BaseModel):
+    total: int = 0
+    pendientes: int = 0
+    cerradas: int = 0
+    proceso_intermedio: int = 0
+
+class OTCountsMaterial(OTCounts):
+    sap_id: str
+
+class OTCountsTecnico(OTCounts):
+    id_tecnico: Optional[int] = None
+
+class OTStats(BaseModel):
+    total: OTCounts
+    por_material: List[OTCountsMaterial] = []
+    por_tecnico: List[OTCountsTecnico] = []
+
+
+# Series de tiempo (timeseries.py); ciclo = fin - inicio en horas, percentiles aproximados
+class OTTimeseriesValues(BaseModel):
+    key: str                    # '' en group_by=all (o sin técnico / tipo / marca)
+    abiertas: int = 0
+    cerradas: int = 0
+    ciclo_promedio_h: Optional[float] = None
+    ciclo_p50_h: Optional[float] = None
+    ciclo_p90_h: Optional[float] = None
+    ciclo_p95_h: Optional[float] = None
+
+class OTTimeseriesPoint(OTTimeseriesValues):
+    period: datetime
+
+class OTTimeseries(BaseModel):
+    grain: str
+    group_by: str
+    desde: datetime
+    hasta: datetime
+    series: List[OTTimeseriesPoint] = []
+    totales: List[OTTimeseriesValues] = []   # todo el rango, por clave
+
+# Archivo de OTs cerradas (archive.py)
+class OTArchiveReport(BaseModel):
+    moved: int                  # OTs movidas a ots_archive en esta corrida
+    batches: int
+    remaining: int              # cerradas antes de cutoff que siguen en ots (por max_batches)
+    cutoff: datetime
+    days: int
+    batch_size: int
+    dry_run: bool = False
+    seconds: float
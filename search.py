@@ -0,0 +1,139 @@
+# search.py
+# Índice de texto completo (SQLite FTS5) sobre materials para /materials/?q=
+import re
+
+from sqlalchemy import text, Integer, Float
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "materials_fts"
+
+# Se pone en True cuando setup_fts pudo crear/verificar el índice.
+# Si la BD no es SQLite o el build de SQLite no trae FTS5, queda en False
+# y list_materials sigue usando ilike.
+FTS_ENABLED = False
+
+# unicode61 + remove_diacritics: "modulo" encuentra "Módulo", sin importar mayúsculas.
+# prefix='2 3' acelera las búsquedas por prefijo que hace el buscador mientras se tipea.
+_CREATE_FTS = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    breve_descripcion, descripcion, marca, tipo,
+    content='materials', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+"""
+
+# triggers para mantener el índice sincronizado con cualquier escritura en materials
+# (ORM, seed, SQL a mano...)
+_CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS materials_fts_ai AFTER INSERT ON materials BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, breve_descripcion, descripcion, marca, tipo)
+        VALUES (new.id, new.breve_descripcion, new.descripcion, new.marca, new.tipo);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS materials_fts_ad AFTER DELETE ON materials BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, breve_descripcion, descripcion, marca, tipo)
+        VALUES ('delete', old.id, old.breve_descripcion, old.descripcion, old.marca, old.tipo);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS materials_fts_au AFTER UPDATE ON materials BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, breve_descripcion, descripcion, marca, tipo)
+        VALUES ('delete', old.id, old.breve_descripcion, old.descripcion, old.marca, old.tipo);
+        INSERT INTO {FTS_TABLE}(rowid, breve_descripcion, descripcion, marca, tipo)
+        VALUES (new.id, new.breve_descripcion, new.descripcion, new.marca, new.tipo);
+    END
+    """,
+]
+
+# pesos bm25 por columna (breve_descripcion, descripcion, marca, tipo):
+# un match en la descripción breve pesa más que uno en el texto largo
+_BM25_WEIGHTS = "10.0, 1.0, 5.0, 2.0"
+
+
+def setup_fts(engine):
+    """
+    Crea la tabla virtual FTS5 y sus triggers si no existen.
+    Si la tabla es nueva, la llena con los materiales ya cargados.
+    """
+    global FTS_ENABLED
+    if engine.dialect.name != "sqlite":
+        FTS_ENABLED = False
+        return False
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"),
+                {"n": FTS_TABLE},
+            ).first()
+            conn.execute(text(_CREATE_FTS))
+            for ddl in _CREATE_TRIGGERS:
+                conn.execute(text(ddl))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError:
+        # SQLite compilado sin FTS5
+        FTS_ENABLED = False
+        return False
+    FTS_ENABLED = True
+    return True
+
+
+def detect_fts(engine):
+    """Solo verifica que el índice exista (arranque de workers sin DDL)."""
+    global FTS_ENABLED
+    if engine.dialect.name != "sqlite":
+        FTS_ENABLED = False
+        return False
+    with engine.connect() as conn:
+        FTS_ENABLED = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"),
+            {"n": FTS_TABLE},
+        ).first() is not None
+    return FTS_ENABLED
+
+
+def rebuild_fts(engine):
+    """Reconstruye el índice completo (por si quedó desincronizado)."""
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(q):
+    """
+    Convierte el texto del usuario en una expresión MATCH de FTS5.
+    Cada palabra se busca como prefijo y todas deben aparecer (AND):
+      "transm cisco" -> "transm"* "cisco"*
+    Devuelve None si no quedó ninguna palabra útil.
+    """
+    tokens = re.findall(r"\w+", q or "", flags=re.UNICODE)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def fts_ranked_subquery(match):
+    """
+    Subquery (rowid, rank) con los materiales que matchean, ordenables por relevancia
+    (bm25 devuelve valores más bajos para los más relevantes).
+    """
+    return (
+        text(
+            f"SELECT rowid AS rowid, bm25({FTS_TABLE}, {_BM25_WEIGHTS}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        )
+        .bindparams(match=match)
+        .columns(rowid=Integer, rank=Float)
+        .subquery("fts")
+    )
+
+
+if __name__ == "__main__":
+    from database import engine
+    if setup_fts(engine):
+        rebuild_fts(engine)
+        print(f"Índice {FTS_TABLE} reconstruido.")
+    else:
+        print("FTS5 no disponible: se usa búsqueda con ilike.")
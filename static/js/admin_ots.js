@@ -1,7 +1,11 @@
 // admin_ots.js - cliente para /ui/admin_ots
 
+// campos que usan las tablas (pedido reducido: ?fields=...)
+const PENDING_FIELDS = 'id,id_ot,sap_id,cantidad,id_tecnico,inicio,pendiente';
+const CLOSED_FIELDS = 'id,id_ot,sap_id,id_tecnico,fin,pendiente';
+
 async function fetchPending(sap='', tec='') {
-  const params = new URLSearchParams();
+  const params = new URLSearchParams({ fields: PENDING_FIELDS });
   if (sap) params.append('sap', sap);
   if (tec) params.append('tec', tec);
   const url = '/admin/ots/pending' + (params.toString() ? `?${params.toString()}` : '');
@@ -11,7 +15,7 @@ async function fetchPending(sap='', tec='') {
 }
 
 async function fetchClosed() {
-  const res = await fetch('/admin/ots/closed');
+  const res = await fetch('/admin/ots/closed?fields=' + CLOSED_FIELDS);
   if (!res.ok) throw new Error('Error fetching closed');
   return await res.json();
 }
@@ -25,7 +29,9 @@ async function fetchSummary() {
 function rowTemplate(ot) {
   // crea <tr> DOM para una OT
   const tr = document.createElement('tr');
+  tr.dataset.id = ot.id;
   tr.innerHTML = `
+    <td style="border:1px solid #ddd; padding:6px;"><input type="checkbox" class="ot-select" data-id="${ot.id}" ${selected.has(String(ot.id)) ? 'checked' : ''} /></td>
     <td style="border:1px solid #ddd; padding:6px;">${ot.id}</td>
     <td style="border:1px solid #ddd; padding:6px;">${ot.id_ot || ('#' + ot.id)}</td>
     <td style="border:1px solid #ddd; padding:6px;">${ot.sap_id || '-'}</td>
@@ -40,6 +46,105 @@ function rowTemplate(ot) {
   return tr;
 }
 
+const CLOSED_SHOWN = 10;
+
+// ---- selección múltiple + operaciones masivas ----
+const selected = new Set();
+
+function updateSelectionUI() {
+  // descartar ids que ya no están en el tablero (cerradas por otro, filtro nuevo, etc.)
+  const visible = new Set(Array.from(document.querySelectorAll('#admin_pending_table .ot-select')).map(cb => cb.dataset.id));
+  for (const id of Array.from(selected)) if (!visible.has(id)) selected.delete(id);
+  document.getElementById('admin_selected_count').textContent = String(selected.size);
+  document.getElementById('admin_bulk_close').disabled = selected.size === 0;
+  document.getElementById('admin_bulk_reassign').disabled = selected.size === 0;
+  const all = document.getElementById('admin_select_all');
+  all.checked = visible.size > 0 && selected.size === visible.size;
+}
+
+async function postBulk(url, payload) {
+  const res = await fetch(url, {
+    method: 'POST',
+    headers: {'Content-Type':'application/json'},
+    body: JSON.stringify(payload)
+  });
+  if (!res.ok) {
+    const err = await res.json().catch(()=>({detail:'Error'}));
+    alert('Error: ' + (err.detail || res.status));
+    return null;
+  }
+  const body = await res.json();
+  body.ots.forEach(applyOtChange);
+  return body;
+}
+
+async function bulkCloseSelected() {
+  const ids = Array.from(selected, Number);
+  if (!ids.length || !confirm(`Cerrar ${ids.length} OT(s)?`)) return;
+  try {
+    const body = await postBulk('/admin/ots/bulk-close', { ids });
+    if (body) alert(`${body.affected} OT(s) cerradas`);
+  } catch (err) {
+    console.error(err); alert('Error en cierre masivo (ver consola)');
+  }
+}
+
+async function bulkReassignSelected() {
+  const ids = Array.from(selected, Number);
+  if (!ids.length) return;
+  const tec = prompt(`Reasignar ${ids.length} OT(s) al técnico (id):`);
+  if (tec === null || !/^\d+$/.test(tec.trim())) return;
+  try {
+    const body = await postBulk('/admin/ots/bulk-update', { ids, changes: { id_tecnico: Number(tec.trim()) } });
+    if (body) alert(`${body.affected} OT(s) reasignadas`);
+  } catch (err) {
+    console.error(err); alert('Error en reasignación (ver consola)');
+  }
+}
+
+async function closeOt(id) {
+  if (!confirm('Cerrar OT #' + id + ' ?')) return;
+  try {
+    const res = await fetch(`/admin/ots/${id}/close`, { method: 'POST' });
+    if (!res.ok) {
+      const err = await res.json().catch(()=>({detail:'Error'}));
+      alert('Error: ' + (err.detail || res.status));
+      return;
+    }
+    const body = await res.json();
+    applyOtChange(body.ot);
+    alert('OT cerrada');
+  } catch (err) {
+    console.error(err); alert('Error en cierre (ver consola)');
+  }
+}
+
+async function editOt(id) {
+  // edit: preguntar observaciones y pendiente
+  const obs = prompt('Nueva observación (vacío = no cambiar):');
+  const pendienteStr = prompt('Pendiente? (true/false) dejar vacío para no cambiar:');
+  const payload = {};
+  if (obs !== null && obs !== '') payload.observaciones = obs;
+  if (pendienteStr === 'true' || pendienteStr === 'false') payload.pendiente = (pendienteStr === 'true');
+  if (Object.keys(payload).length === 0) return;
+  try {
+    const res = await fetch(`/admin/ots/${id}`, {
+      method: 'PUT',
+      headers: {'Content-Type':'application/json'},
+      body: JSON.stringify(payload)
+    });
+    if (!res.ok) {
+      const err = await res.json().catch(()=>({detail:'Error'}));
+      alert('Error: ' + (err.detail || res.status));
+      return;
+    }
+    applyOtChange(await res.json());
+    alert('OT actualizada');
+  } catch (err) {
+    console.error(err); alert('Error actualizando OT');
+  }
+}
+
 async function loadPending() {
   try {
     const sap = document.getElementById('admin_filter_sap').value.trim();
@@ -51,66 +156,25 @@ async function loadPending() {
       const r = rowTemplate(ot);
       tbody.appendChild(r);
     });
-    // attach handlers
-    document.querySelectorAll('.btn-close').forEach(b => b.addEventListener('click', async (e) => {
-      const id = e.currentTarget.dataset.id;
-      if (!confirm('Cerrar OT #' + id + ' ?')) return;
-      try {
-        const res = await fetch(`/admin/ots/${id}/close`, { method: 'POST' });
-        if (!res.ok) {
-          const err = await res.json().catch(()=>({detail:'Error'}));
-          alert('Error: ' + (err.detail || res.status));
-          return;
-        }
-        alert('OT cerrada');
-        await reloadAll();
-      } catch (err) {
-        console.error(err); alert('Error en cierre (ver consola)');
-      }
-    }));
-
-    document.querySelectorAll('.btn-edit').forEach(b => b.addEventListener('click', async (e) => {
-      const id = e.currentTarget.dataset.id;
-      // edit: preguntar observaciones y pendiente
-      const obs = prompt('Nueva observación (vacío = no cambiar):');
-      const pendienteStr = prompt('Pendiente? (true/false) dejar vacío para no cambiar:');
-      const payload = {};
-      if (obs !== null && obs !== '') payload.observaciones = obs;
-      if (pendienteStr === 'true' || pendienteStr === 'false') payload.pendiente = (pendienteStr === 'true');
-      if (Object.keys(payload).length === 0) return;
-      try {
-        const res = await fetch(`/admin/ots/${id}`, {
-          method: 'PUT',
-          headers: {'Content-Type':'application/json'},
-          body: JSON.stringify(payload)
-        });
-        if (!res.ok) {
-          const err = await res.json().catch(()=>({detail:'Error'}));
-          alert('Error: ' + (err.detail || res.status));
-          return;
-        }
-        alert('OT actualizada');
-        await reloadAll();
-      } catch (err) {
-        console.error(err); alert('Error actualizando OT');
-      }
-    }));
-
+    updateSelectionUI();
   } catch (err) {
     console.error('loadPending error', err);
   }
 }
 
+function closedItem(ot) {
+  const li = document.createElement('li');
+  li.dataset.id = ot.id;
+  li.textContent = `${ot.id_ot || ot.id} | SAP: ${ot.sap_id} | Tec: ${ot.id_tecnico || '-'} | Fin: ${ot.fin ? new Date(ot.fin).toLocaleString() : '-'}`;
+  return li;
+}
+
 async function loadClosed() {
   try {
     const items = await fetchClosed();
     const ul = document.getElementById('admin_closed_list');
     ul.innerHTML = '';
-    items.forEach(ot => {
-      const li = document.createElement('li');
-      li.textContent = `${ot.id_ot || ot.id} | SAP: ${ot.sap_id} | Tec: ${ot.id_tecnico || '-'} | Fin: ${ot.fin ? new Date(ot.fin).toLocaleString() : '-'}`;
-      ul.appendChild(li);
-    });
+    items.forEach(ot => ul.appendChild(closedItem(ot)));
   } catch (err) { console.error('loadClosed', err); }
 }
 
@@ -131,8 +195,108 @@ async function reloadAll() {
   await Promise.all([loadPending(), loadClosed(), loadSummary()]);
 }
 
+// ---- deltas del feed en vivo (/ots/stream) ----
+
+function debounce(fn, ms = 500) {
+  let t;
+  return (...args) => {
+    clearTimeout(t);
+    t = setTimeout(() => fn(...args), ms);
+  };
+}
+
+// el summary es una lectura de rollups (barata); se refresca una vez por ráfaga de eventos
+const refreshSummary = debounce(loadSummary);
+const refreshPending = debounce(loadPending);
+
+// ¿la OT entra en el tablero de pendientes con los filtros actuales?
+// null = no se puede saber en el cliente (filtro por nombre de técnico)
+function matchesPendingFilters(ot) {
+  const sap = document.getElementById('admin_filter_sap').value.trim().toLowerCase();
+  const tec = document.getElementById('admin_filter_tec').value.trim();
+  if (sap && !(ot.sap_id || '').toLowerCase().includes(sap)) return false;
+  if (tec) {
+    if (!/^-?\d+$/.test(tec)) return null;
+    if (ot.id_tecnico !== Number(tec)) return false;
+  }
+  return true;
+}
+
+function applyOtChange(ot) {
+  const tbody = document.querySelector('#admin_pending_table tbody');
+  const row = tbody.querySelector(`tr[data-id="${ot.id}"]`);
+  const matches = ot.pendiente ? matchesPendingFilters(ot) : false;
+  if (matches === null) {
+    refreshPending();
+  } else if (matches) {
+    const r = rowTemplate(ot);
+    if (row) row.replaceWith(r); else tbody.prepend(r);
+  } else if (row) {
+    row.remove();
+  }
+  updateSelectionUI();
+
+  const ul = document.getElementById('admin_closed_list');
+  const li = ul.querySelector(`li[data-id="${ot.id}"]`);
+  if (ot.pendiente) {
+    if (li) li.remove();
+  } else if (li) {
+    li.replaceWith(closedItem(ot));
+  } else {
+    ul.prepend(closedItem(ot));
+    while (ul.children.length > CLOSED_SHOWN) ul.lastElementChild.remove();
+  }
+  refreshSummary();
+}
+
+// primero la suscripción y después el snapshot: los deltas que llegan mientras se
+// cargan los listados se guardan y se aplican encima, en orden
+function subscribeOts() {
+  if (!window.EventSource) { reloadAll(); return; }
+  let buffered = [];   // null = snapshot cargado, los deltas se aplican directo
+  const resync = async () => {
+    buffered = buffered || [];
+    await reloadAll();
+    const pending = buffered;
+    buffered = null;
+    pending.forEach(applyOtChange);
+  };
+  const onChange = (e) => {
+    const ot = JSON.parse(e.data);
+    if (buffered) buffered.push(ot); else applyOtChange(ot);
+  };
+  let ready = false;
+  const es = new EventSource('/ots/stream');
+  es.addEventListener('ready', () => { if (!ready) { ready = true; resync(); } });
+  es.addEventListener('ot_created', onChange);
+  es.addEventListener('ot_updated', onChange);
+  es.addEventListener('reset', resync);
+}
+
 document.addEventListener('DOMContentLoaded', () => {
   document.getElementById('admin_apply_filters').addEventListener('click', (e) => { e.preventDefault(); loadPending(); });
   document.getElementById('admin_clear_filters').addEventListener('click', (e) => { e.preventDefault(); document.getElementById('admin_filter_sap').value=''; document.getElementById('admin_filter_tec').value=''; loadPending(); });
-  reloadAll();
+  // un solo listener para los botones de todas las filas (también las que llegan por el feed)
+  const tbody = document.querySelector('#admin_pending_table tbody');
+  tbody.addEventListener('change', (e) => {
+    if (!e.target.classList.contains('ot-select')) return;
+    if (e.target.checked) selected.add(e.target.dataset.id); else selected.delete(e.target.dataset.id);
+    updateSelectionUI();
+  });
+  document.getElementById('admin_select_all').addEventListener('change', (e) => {
+    tbody.querySelectorAll('.ot-select').forEach(cb => {
+      cb.checked = e.target.checked;
+      if (cb.checked) selected.add(cb.dataset.id); else selected.delete(cb.dataset.id);
+    });
+    updateSelectionUI();
+  });
+  document.getElementById('admin_bulk_close').addEventListener('click', (e) => { e.preventDefault(); bulkCloseSelected(); });
+  document.getElementById('admin_bulk_reassign').addEventListener('click', (e) => { e.preventDefault(); bulkReassignSelected(); });
+  tbody.addEventListener('click', (e) => {
+    const btn = e.target.closest('button[data-id]');
+    if (!btn) return;
+    if (btn.classList.contains('btn-close')) closeOt(btn.dataset.id);
+    else if (btn.classList.contains('btn-edit')) editOt(btn.dataset.id);
+  });
+  subscribeOts();   // carga los listados cuando el feed está suscripto
 });
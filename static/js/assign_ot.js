@@ -4,6 +4,7 @@
 const MIN_SAP = 3;
 const DEBOUNCE_MS = 250;
 const RESULTS_LIMIT = 50;
+const SUGGEST_LIMIT = 20;
 
 // helpers
 function debounce(fn, ms = DEBOUNCE_MS) {
@@ -19,6 +20,7 @@ async function fetchMaterialsBySap(sap, q = '') {
   if (sap) params.append('sap', sap);
   if (q) params.append('q', q);
   params.append('limit', String(RESULTS_LIMIT));
+  params.append('fields', 'sap,breve_descripcion');
   const url = '/materials/' + (params.toString() ? `?${params.toString()}` : '');
   console.log('fetch ->', url);
   const res = await fetch(url);
@@ -26,6 +28,15 @@ async function fetchMaterialsBySap(sap, q = '') {
   return await res.json();
 }
 
+// autocompletado por prefijo SAP: payload compacto [[sap, breve], ...]
+async function fetchSapSuggestions(sap) {
+  const params = new URLSearchParams({ sap, limit: String(SUGGEST_LIMIT) });
+  const res = await fetch('/materials/suggest?' + params.toString());
+  if (!res.ok) throw new Error('Suggest failed ' + res.status);
+  const pairs = await res.json();
+  return pairs.map(([sapVal, breve]) => ({ sap: sapVal, breve_descripcion: breve }));
+}
+
 // UI materials
 function clearResultsUI() {
   const ul = document.getElementById('materials_results');
@@ -92,7 +103,8 @@ const onSearchSapInput = debounce(async () => {
       return;
     }
 
-    const items = await fetchMaterialsBySap(sap, q);
+    // sin texto de descripción alcanza con el índice SAP; con texto usamos /materials/
+    const items = q ? await fetchMaterialsBySap(sap, q) : await fetchSapSuggestions(sap);
     console.log('items fetched:', items.length, items.slice(0,5));
     showResults(items);
   } catch (err) {
@@ -129,10 +141,38 @@ async function loadTecnicosSelect(){
   }
 }
 
+const OTS_SHOWN = 20;
+// solo lo que muestra la lista (el resto de la OT no viaja)
+const OT_LIST_FIELDS = 'id,id_ot,sap_id,id_tecnico,pendiente,procesoIntermedio,observaciones';
+
+function otListItem(ot) {
+  const li = document.createElement('li');
+  const paso = ot.procesoIntermedio ? 'Sí' : 'No';
+  const pendiente = ot.pendiente ? 'Sí' : 'No';
+  const obs = ot.observaciones ? ` | Obs: ${ot.observaciones}` : '';
+  li.dataset.id = ot.id;
+  li.innerText = `${ot.id_ot || ot.id} | SAP: ${ot.sap_id || ot.sap} | Tec: ${ot.id_tecnico || '-'} | Pendiente: ${pendiente} | Paso intermedio: ${paso}${obs}`;
+  return li;
+}
+
+// aplica un delta: reemplaza la OT si ya está en la lista, o la agrega arriba si es nueva
+function applyOt(ot, isNew) {
+  const ul = document.getElementById('ots_list');
+  if (!ul) return;
+  const li = otListItem(ot);
+  const existing = ul.querySelector(`li[data-id="${ot.id}"]`);
+  if (existing) {
+    existing.replaceWith(li);
+  } else if (isNew) {
+    ul.prepend(li);
+    while (ul.children.length > OTS_SHOWN) ul.lastElementChild.remove();
+  }
+}
+
+// carga inicial (y tras un `reset` del feed): solo las últimas OTS_SHOWN
 async function loadOts(){
   try {
-    console.log('loadOts: llamando /ots/');
-    const res = await fetch('/ots/');
+    const res = await fetch(`/ots/?desc=true&limit=${OTS_SHOWN}&fields=${OT_LIST_FIELDS}`);
     if (!res.ok) {
       console.error('loadOts: response NOT OK', res.status);
       return;
@@ -144,20 +184,38 @@ async function loadOts(){
       return;
     }
     ul.innerHTML = '';
-    items.slice().reverse().slice(0,20).forEach(ot => {
-      const li = document.createElement('li');
-      const paso = ot.procesoIntermedio ? 'Sí' : 'No';
-      const pendiente = ot.pendiente ? 'Sí' : 'No';
-      const obs = ot.observaciones ? ` | Obs: ${ot.observaciones}` : '';
-      li.innerText = `${ot.id_ot || ot.id} | SAP: ${ot.sap_id || ot.sap} | Tec: ${ot.id_tecnico || '-'} | Pendiente: ${pendiente} | Paso intermedio: ${paso}${obs}`;
-      ul.appendChild(li);
-    });
+    items.forEach(ot => ul.appendChild(otListItem(ot)));
     console.log('OTs cargadas:', items.length);
   } catch (err) {
     console.error('Error cargando OTs', err);
   }
 }
 
+// feed en vivo: en vez de volver a pedir /ots/ se aplican los deltas.
+// La lista se carga recién con `ready` (ya suscriptos); lo que llega mientras tanto
+// se guarda y se aplica encima
+function subscribeOts() {
+  if (!window.EventSource) { loadOts(); return; }
+  let buffered = [];   // null = lista cargada
+  const resync = async () => {
+    buffered = buffered || [];
+    await loadOts();
+    const pending = buffered;
+    buffered = null;
+    pending.forEach(([ot, isNew]) => applyOt(ot, isNew));
+  };
+  const onChange = (isNew) => (e) => {
+    const ot = JSON.parse(e.data);
+    if (buffered) buffered.push([ot, isNew]); else applyOt(ot, isNew);
+  };
+  let ready = false;
+  const es = new EventSource('/ots/stream');
+  es.addEventListener('ready', () => { if (!ready) { ready = true; resync(); } });
+  es.addEventListener('ot_created', onChange(true));
+  es.addEventListener('ot_updated', onChange(false));
+  es.addEventListener('reset', resync);
+}
+
 // bloque principal: listeners e inicialización
 document.addEventListener("DOMContentLoaded", () => {
   // evitar ENTER que haga submit accidental al tipear en búsqueda
@@ -235,7 +293,7 @@ document.addEventListener("DOMContentLoaded", () => {
       document.getElementById('procesoIntermedio').checked = false;
       document.getElementById('observaciones').value = '';
       clearResultsUI();
-      loadOts();
+      applyOt(ot, true);  // el evento del feed llega después y solo reemplaza la fila
     } catch (err) {
       console.error('Submit error:', err);
       alert('Error al crear OT. Mirá la consola.');
@@ -244,5 +302,5 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // inicializamos selects y listas
   loadTecnicosSelect();
-  loadOts();
+  subscribeOts();   // carga la lista cuando el feed está suscripto
 });
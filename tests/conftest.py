@@ -0,0 +1,33 @@
+# tests/conftest.py
+# Los tests corren contra una BD SQLite temporal, con la app en modo directo (sync,
+# sin cola de escritura ni archivo periódico). Las variables se fijan antes de que
+# algún test importe database / main, porque el engine se crea al importar.
+#
+# Uso (desde la raíz del repo):
+#   python -m pytest -q
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)   # templates/ y static/ se resuelven relativos al directorio de trabajo
+
+_tmp = tempfile.mkdtemp(prefix="otmanager-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "test.db")
+os.environ["DB_MODE"] = "sync"
+os.environ["DB_AUTO_MIGRATE"] = "1"
+os.environ["WRITE_QUEUE"] = "0"
+os.environ["ARCHIVE_INTERVAL_S"] = "0"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """App con su lifespan (migrations.upgrade sobre la BD temporal), compartida por todos los tests."""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as c:
+        yield c
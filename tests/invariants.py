@@ -0,0 +1,52 @@
+# tests/invariants.py
+# Helpers compartidos por los tests: datos de referencia (materiales / técnicos con
+# un prefijo propio por módulo, porque la BD es una sola) y la comparación de las tablas
+# derivadas de ots contra recalcularlas desde cero.
+from types import SimpleNamespace
+
+import models
+import rollups
+import timeseries
+from database import SessionLocal
+
+
+def make_refs(client, prefix):
+    """Tres materiales (distinto tipo / marca) y dos técnicos; saps con `prefix` para no chocar."""
+    materials = [
+        {"sap": f"{prefix}-100", "breve_descripcion": "Amplificador", "marca": "CISCO", "tipo": "AMPLIFICADOR RF"},
+        {"sap": f"{prefix}-200", "breve_descripcion": "Nodo", "marca": "ARRIS", "tipo": "NODO"},
+        {"sap": f"{prefix}-300", "breve_descripcion": "Fuente", "marca": "AURORA", "tipo": "FUENTE"},
+    ]
+    for m in materials:
+        assert client.post("/materials/", json=m).status_code == 201
+    tecs = [client.post("/tecnicos/", json={"nombre": f"{prefix} {n}"}).json()["id"] for n in ("Ana", "Beto")]
+    return SimpleNamespace(saps=[m["sap"] for m in materials], tecs=tecs)
+
+
+def ot_payload(sap, tec=None, inicio=None, **extra):
+    return {"sap_id": sap, "id_tecnico": tec, "cantidad": 1, "inicio": inicio, **extra}
+
+
+def derived(db):
+    """Contenido de las tablas derivadas, sin las filas que quedaron en cero."""
+    roll = {(r.dim, r.key): tuple(getattr(r, c) for c in rollups.COUNTERS)
+            for r in db.query(models.OTRollup)}
+    ts = {(r.grain, r.dim, r.period, r.key): (r.abiertas, r.cerradas, r.ciclo_n, round(r.ciclo_sum_s, 3))
+          for r in db.query(models.OTTimeseries)}
+    hist = {(r.grain, r.dim, r.period, r.key, r.bucket): r.n for r in db.query(models.OTCycleHistogram)}
+    return ({k: v for k, v in roll.items() if any(v)},
+            {k: v for k, v in ts.items() if any(v)},
+            {k: v for k, v in hist.items() if v})
+
+
+def assert_consistent():
+    """Lo incremental == recalculado desde ots + ots_archive (y deja las tablas recalculadas)."""
+    db = SessionLocal()
+    try:
+        incremental = derived(db)
+        rollups.rebuild(db)
+        timeseries.backfill(db)
+        assert derived(db) == incremental
+        return incremental
+    finally:
+        db.close()
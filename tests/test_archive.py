@@ -0,0 +1,66 @@
+# tests/test_archive.py
+# Archivo de OTs cerradas (archive.py): mover a ots_archive no cambia las tablas
+# derivadas, y las archivadas siguen saliendo por id, en los listados (intercaladas
+# con las de ots por el mismo cursor) y en el export.
+import json
+
+import pytest
+
+from invariants import assert_consistent, make_refs, ot_payload
+
+
+@pytest.fixture(scope="module")
+def refs(client):
+    refs = make_refs(client, "ARC")
+    s2 = refs.saps[1]
+    refs.old = client.post("/ots/batch", json=[ot_payload(s2, None, f"2020-01-0{d}T08:00:00Z")
+                                               for d in range(1, 4)]).json()
+    for i, ot in enumerate(refs.old):
+        r = client.put(f"/admin/ots/{ot['id']}", json={"pendiente": False, "fin": f"2020-01-1{i}T08:00:00Z"})
+        assert r.status_code == 200
+    # cerrada reciente (no se archiva) con inicio entre las viejas, y la de mayor id que nunca se archiva
+    refs.recent = client.post("/ots/", json=ot_payload(s2, None, "2020-01-02T12:00:00Z")).json()
+    client.post(f"/admin/ots/{refs.recent['id']}/close")
+    client.post("/ots/", json=ot_payload(s2, None, "2026-03-09T08:00:00Z"))
+    return refs
+
+
+def test_archive_keeps_derived_tables(client, refs):
+    before = assert_consistent()
+    report = client.post("/admin/ots/archive?days=1000&batch_size=2").json()
+    assert report["moved"] == 3 and report["remaining"] == 0
+    assert assert_consistent() == before
+    assert client.get(f"/ots/{refs.old[0]['id']}").json()["id_ot"] == refs.old[0]["id_ot"]
+
+
+def walk(client, path, **params):
+    seen, cursor = [], None
+    while True:
+        r = client.get(path, params={"fields": "id", **params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        seen += [o["id"] for o in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def test_archived_ots_stay_in_the_listings(client, refs):
+    old = [o["id"] for o in refs.old]
+    recent = refs.recent["id"]
+    listed = [o["id"] for o in client.get("/ots/?limit=1000&fields=id").json()]
+    # (inicio, id): 01-01, 01-02 08:00, 01-02 12:00 (en ots), 01-03
+    assert [i for i in listed if i in old + [recent]] == [old[0], old[1], recent, old[2]]
+    assert walk(client, "/ots/", limit=2) == listed
+    assert walk(client, "/ots/", limit=3, desc="true") == listed[::-1]
+    assert not set(old) & {o["id"] for o in client.get("/ots/?limit=1000&fields=id&include_archive=false").json()}
+
+    closed = walk(client, "/admin/ots/closed", limit=2)
+    # (fin desc, id desc): la cerrada recién va antes que las de 2020, en orden de fin
+    assert [i for i in closed if i in old + [recent]] == [recent, old[2], old[1], old[0]]
+    assert not set(old) & set(walk(client, "/admin/ots/closed", limit=50, include_archive="false"))
+
+
+def test_archived_ots_stay_in_the_export(client, refs):
+    r = client.get("/ots/export", params={"format": "ndjson", "sap_id": refs.saps[1]})
+    ids = [json.loads(line)["id"] for line in r.text.splitlines()]
+    assert ids[:4] == [refs.old[0]["id"], refs.old[1]["id"], refs.recent["id"], refs.old[2]["id"]]
@@ -0,0 +1,58 @@
+# tests/test_assets.py
+# Estáticos y pantallas (assets.py): las páginas apuntan a URLs con hash que se sirven
+# immutable, la ruta sin hash y las páginas revalidan con ETag, se elige la codificación
+# por Accept-Encoding y un hash viejo no queda cacheado para siempre.
+import gzip
+import re
+
+import pytest
+
+import assets
+import main
+
+
+@pytest.fixture(scope="module")
+def script_url(client):
+    html = client.get("/ui/assign-ot").text
+    m = re.search(r'src="(/static/js/assign_ot\.[0-9a-f]{16}\.js)"', html)
+    assert m, "la pantalla no usa la URL con hash"
+    return m.group(1)
+
+
+def test_hashed_urls_are_immutable(client, script_url):
+    r = client.get(script_url, headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200 and r.headers["cache-control"] == assets.IMMUTABLE
+    assert r.headers["content-type"].endswith("javascript; charset=utf-8")
+    with open("static/js/assign_ot.js", "rb") as f:
+        assert r.content == f.read()
+
+
+def test_plain_and_stale_urls_revalidate(client, script_url):
+    plain = client.get("/static/js/assign_ot.js", headers={"Accept-Encoding": "identity"})
+    assert plain.headers["cache-control"] == assets.REVALIDATE
+    assert client.get("/static/js/assign_ot.js", headers={"Accept-Encoding": "identity",
+                                                          "If-None-Match": plain.headers["etag"]}).status_code == 304
+    stale = client.get("/static/js/assign_ot.0123456789abcdef.js", headers={"Accept-Encoding": "identity"})
+    assert stale.status_code == 200 and stale.headers["cache-control"] == assets.REVALIDATE
+
+
+def test_encoding_follows_accept_encoding(client, script_url):
+    r = client.get(script_url, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and r.headers["vary"] == "Accept-Encoding"
+    identity = client.get(script_url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers and r.headers["etag"] != identity.headers["etag"]
+    asset = main.static_files.assets["js/assign_ot.js"]
+    assert gzip.decompress(asset.encoded["gzip"]) == asset.body
+    assert assets.choose_encoding("gzip;q=0, br", {"gzip": b""}) is None
+    assert assets.choose_encoding("*", {"gzip": b"", "br": b""}) == "br"
+
+
+def test_pages_are_prerendered_with_an_etag(client):
+    r = client.get("/ui/tecnicos", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200 and r.headers["cache-control"] == assets.REVALIDATE
+    again = client.get("/ui/tecnicos", headers={"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+
+
+def test_unknown_files_are_a_404(client):
+    assert client.get("/static/js/no-existe.js").status_code == 404
@@ -0,0 +1,40 @@
+# tests/test_batch.py
+# POST /ots/ y POST /ots/batch: números de OT consecutivos en un solo commit, todo o
+# nada si alguna referencia no existe, y el mismo payload que una lectura posterior.
+import pytest
+
+from invariants import assert_consistent, make_refs, ot_payload
+
+
+@pytest.fixture(scope="module")
+def refs(client):
+    return make_refs(client, "BAT")
+
+
+def test_create_single_and_batch(client, refs):
+    s1, s2, s3 = refs.saps
+    t1, t2 = refs.tecs
+    for ot in (ot_payload(s1, t1, "2026-03-01T10:15:00Z"), ot_payload(s2, None, "2026-03-01T23:59:00Z"),
+               ot_payload(s3, t2, "2026-03-02T00:00:00Z")):
+        assert client.post("/ots/", json=ot).status_code == 201
+    r = client.post("/ots/batch", json=[ot_payload(s1, t2, f"2026-03-0{d}T0{d}:30:00Z") for d in range(3, 8)])
+    assert r.status_code == 201
+    numbers = [int(o["id_ot"].split("-")[1]) for o in r.json()]
+    assert numbers == list(range(numbers[0], numbers[0] + 5))
+    assert sum(o["sap_id"] in refs.saps for o in client.get("/ots/?limit=1000").json()) == 8
+    assert_consistent()
+
+
+def test_batch_is_all_or_nothing(client, refs):
+    before = len(client.get("/ots/?limit=1000").json())
+    r = client.post("/ots/batch", json=[ot_payload(refs.saps[0]), ot_payload("NO-EXISTE")])
+    assert r.status_code == 400 and "NO-EXISTE" in r.json()["detail"]
+    r = client.post("/ots/batch", json=[ot_payload(refs.saps[0], 10 ** 6)])
+    assert r.status_code == 400
+    assert len(client.get("/ots/?limit=1000").json()) == before
+
+
+def test_batch_payload_matches_a_later_read(client, refs):
+    created = client.post("/ots/batch", json=[ot_payload(refs.saps[1], None, "2026-03-08T10:00:00Z")]).json()
+    assert created[0] == client.get(f"/ots/{created[0]['id']}").json()
+    assert created[0]["inicio"] == "2026-03-08T10:00:00"
@@ -0,0 +1,44 @@
+# tests/test_bulk.py
+# /admin/ots/bulk-close y /admin/ots/bulk-update: un UPDATE por conjunto que mantiene
+# rollups y series, y el tope OT_BULK_MAX sin leer la tabla entera.
+import pytest
+
+import ot_service
+from invariants import assert_consistent, make_refs, ot_payload
+
+
+@pytest.fixture(scope="module")
+def refs(client):
+    refs = make_refs(client, "BLK")
+    s1, s2, _ = refs.saps
+    t1, t2 = refs.tecs
+    client.post("/ots/batch", json=[ot_payload(s1, t2, f"2026-04-0{d}T0{d}:00:00Z") for d in range(1, 5)]
+                + [ot_payload(s2, t1, "2026-04-05T10:00:00Z")])
+    return refs
+
+
+def test_bulk_update_and_close(client, refs):
+    s1, s2, _ = refs.saps
+    t1, t2 = refs.tecs
+    r = client.post("/admin/ots/bulk-update",
+                    json={"id_tecnico": t2, "pendiente": True, "changes": {"id_tecnico": t1}})
+    assert r.status_code == 200 and r.json()["affected"] == 4
+    assert {o["id_tecnico"] for o in r.json()["ots"]} == {t1}
+    r = client.post("/admin/ots/bulk-close", json={"sap_id": s1})
+    assert r.status_code == 200 and r.json()["affected"] == 4
+    assert all(not o["pendiente"] and o["fin"] for o in r.json()["ots"])
+    # solo toca las pendientes: repetirlo no afecta a ninguna
+    assert client.post("/admin/ots/bulk-close", json={"sap_id": s1}).json()["affected"] == 0
+    assert_consistent()
+
+
+def test_bulk_requires_a_selection(client, refs):
+    assert client.post("/admin/ots/bulk-close", json={}).status_code == 400
+    assert client.post("/admin/ots/bulk-update", json={"sap_id": refs.saps[1], "changes": {}}).status_code == 400
+
+
+def test_bulk_rejects_selections_over_the_limit(client, refs, monkeypatch):
+    monkeypatch.setattr(ot_service, "OT_BULK_MAX", 2)
+    r = client.post("/admin/ots/bulk-update", json={"sap_id": refs.saps[0],
+                                                    "changes": {"observaciones": "x"}})
+    assert r.status_code == 400 and "más de 2" in r.json()["detail"]
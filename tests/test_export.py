@@ -0,0 +1,57 @@
+# tests/test_export.py
+# /ots/export: CSV y NDJSON en streaming, ordenado por (inicio, id), con los filtros
+# de rango [desde, hasta), sap_id, id_tecnico y pendiente, y los nombres opcionales.
+import csv
+import io
+import json
+
+import pytest
+
+from invariants import make_refs, ot_payload
+
+
+@pytest.fixture(scope="module")
+def refs(client):
+    refs = make_refs(client, "EXP")
+    s1, s2, _ = refs.saps
+    t1, t2 = refs.tecs
+    refs.ids = [o["id"] for o in client.post("/ots/batch", json=[
+        ot_payload(s1, t1, "2026-06-03T10:00:00Z"),
+        ot_payload(s1, t2, "2026-06-01T10:00:00Z", observaciones='con "comillas", y coma'),
+        ot_payload(s2, None, "2026-06-02T10:00:00Z"),
+        ot_payload(s2, t1, "2026-06-05T10:00:00Z"),
+    ]).json()]
+    client.post(f"/admin/ots/{refs.ids[2]}/close")
+    return refs
+
+
+def ndjson(client, **params):
+    r = client.get("/ots/export", params={"format": "ndjson", **params})
+    assert r.status_code == 200 and r.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_filters_and_order(client, refs):
+    s1, s2, _ = refs.saps
+    t1, _ = refs.tecs
+    ids = refs.ids
+    assert [o["id"] for o in ndjson(client, sap_id=s1)] == [ids[1], ids[0]]
+    assert [o["id"] for o in ndjson(client, id_tecnico=t1)] == [ids[0], ids[3]]
+    assert [o["id"] for o in ndjson(client, sap_id=s2, pendiente="false")] == [ids[2]]
+    rango = ndjson(client, desde="2026-06-02T00:00:00", hasta="2026-06-05T10:00:00")
+    assert [o["id"] for o in rango if o["id"] in ids] == [ids[2], ids[0]]
+
+
+def test_csv_with_names(client, refs):
+    r = client.get("/ots/export", params={"sap_id": refs.saps[0], "include_names": "true"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/csv")
+    assert 'filename="ots.csv"' in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["id"] for row in rows] == [str(refs.ids[1]), str(refs.ids[0])]
+    assert rows[0]["observaciones"] == 'con "comillas", y coma'
+    assert rows[0]["material_breve_descripcion"] == "Amplificador" and rows[0]["tecnico_nombre"] == "EXP Beto"
+    assert rows[0]["inicio"] == "2026-06-01T10:00:00"
+
+
+def test_unknown_format_is_a_400(client, refs):
+    assert client.get("/ots/export", params={"format": "xlsx"}).status_code == 400
@@ -0,0 +1,52 @@
+# tests/test_http_cache.py
+# ETag / 304 de los GET JSON y el cache de técnicos versionado en la BD: una escritura
+# hecha por otro worker (que no invalidó el cache de este proceso) igual se ve.
+import cache
+import models
+from database import SessionLocal
+
+
+def test_if_none_match_gets_a_304(client):
+    r = client.get("/materials/?limit=5")
+    etag = r.headers["etag"]
+    assert r.headers["cache-control"] == "no-cache"
+    r = client.get("/materials/?limit=5", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b"" and r.headers["etag"] == etag
+    assert client.get("/materials/?limit=5", headers={"If-None-Match": f'W/{etag}, "otro"'}).status_code == 304
+    assert client.get("/materials/?limit=5", headers={"If-None-Match": '"otro"'}).status_code == 200
+
+
+def test_tecnicos_use_the_etag_only(client):
+    r = client.get("/tecnicos/")
+    assert "last-modified" not in r.headers
+    assert client.get("/tecnicos/", headers={"If-Modified-Since": "Tue, 01 Jan 2030 00:00:00 GMT"}).status_code == 200
+    assert client.get("/tecnicos/", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+
+
+def test_tecnicos_cache_follows_the_db_version(client):
+    etag = client.get("/tecnicos/").headers["etag"]
+    # escritura de "otro worker": directo en la BD, sin invalidar el cache de este proceso
+    db = SessionLocal()
+    try:
+        t = models.Tecnico(nombre="HTC otro worker")
+        db.add(t)
+        cache.bump_tecnicos_version(db)
+        db.commit()
+        tecnico_id = t.id
+    finally:
+        db.close()
+    r = client.get("/tecnicos/", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and {"id": tecnico_id, "nombre": "HTC otro worker"} in r.json()
+    assert client.get(f"/tecnicos/{tecnico_id}").json()["nombre"] == "HTC otro worker"
+
+
+def test_tecnico_writes_change_the_etag(client):
+    etag = client.get("/tecnicos/").headers["etag"]
+    tecnico_id = client.post("/tecnicos/", json={"nombre": "HTC alta"}).json()["id"]
+    etag2 = client.get("/tecnicos/", headers={"If-None-Match": etag}).headers["etag"]
+    assert etag2 != etag
+    client.put(f"/tecnicos/{tecnico_id}", json={"nombre": "HTC editado"})
+    assert client.get(f"/tecnicos/{tecnico_id}").json()["nombre"] == "HTC editado"
+    client.delete(f"/tecnicos/{tecnico_id}")
+    assert client.get(f"/tecnicos/{tecnico_id}").status_code == 404
+    assert client.get("/tecnicos/", headers={"If-None-Match": etag2}).status_code == 200
@@ -0,0 +1,74 @@
+# tests/test_material_import.py
+# Importación masiva de materiales (material_import / POST /materials/bulk): conteos,
+# SAP repetidos (gana la última línea), solo se actualizan las columnas que trae la
+# entrada y update_existing=False no toca lo que ya está.
+import material_import
+import models
+from database import SessionLocal
+
+
+def bulk(client, body, fmt="csv", **params):
+    r = client.post("/materials/bulk", params={"format": fmt, **params}, content=body.encode())
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def material(sap):
+    db = SessionLocal()
+    try:
+        m = db.query(models.Material).filter(models.Material.sap == sap).one()
+        return {k: getattr(m, k) for k in material_import.FIELDS}
+    finally:
+        db.close()
+
+
+def test_counts_and_last_duplicate_wins(client):
+    result = bulk(client, "sap,breve_descripcion,marca\n"
+                          "IMP-1,Primera,CISCO\n"
+                          ",sin sap,\n"
+                          "IMP-2,Otra,ARRIS\n"
+                          "IMP-1,  Segunda  ,\n")
+    assert {k: result[k] for k in ("inserted", "updated", "skipped", "total")} == \
+        {"inserted": 2, "updated": 0, "skipped": 2, "total": 4}
+    assert material("IMP-1")["breve_descripcion"] == "Segunda" and material("IMP-1")["marca"] is None
+
+
+def test_duplicates_across_batches(client):
+    body = "".join(f'{{"sap": "IMP-B{i % 2}", "breve_descripcion": "v{i}"}}\n' for i in range(5))
+    result = bulk(client, body, "ndjson", batch_size=1)
+    assert (result["inserted"], result["updated"], result["skipped"]) == (2, 0, 3)
+    assert material("IMP-B0")["breve_descripcion"] == "v4" and material("IMP-B1")["breve_descripcion"] == "v3"
+
+
+def test_missing_columns_are_left_alone(client):
+    bulk(client, "sap,breve_descripcion,descripcion,tipo\nIMP-P,Breve,Descripción larga,NODO\n")
+    result = bulk(client, "sap,breve_descripcion\nIMP-P,Breve nueva\n")
+    assert result["updated"] == 1
+    assert material("IMP-P") == {"sap": "IMP-P", "breve_descripcion": "Breve nueva",
+                                 "descripcion": "Descripción larga", "marca": None, "tipo": "NODO"}
+    # NDJSON con claves distintas por línea: cada fila actualiza solo las suyas
+    bulk(client, '{"sap": "IMP-P", "marca": "ARRIS"}\n{"sap": "IMP-Q", "tipo": "FUENTE"}\n', "ndjson")
+    assert material("IMP-P")["descripcion"] == "Descripción larga" and material("IMP-P")["marca"] == "ARRIS"
+    assert material("IMP-Q")["tipo"] == "FUENTE"
+
+
+def test_no_update_keeps_existing_rows():
+    db = SessionLocal()
+    try:
+        material_import.import_materials(db, [{"sap": "IMP-N", "breve_descripcion": "original"}])
+        result = material_import.import_materials(
+            db, [{"sap": "IMP-N", "breve_descripcion": "pisada"}, {"sap": "IMP-N2"}], update_existing=False)
+    finally:
+        db.close()
+    assert (result["inserted"], result["updated"], result["skipped"]) == (1, 0, 1)
+    assert material("IMP-N")["breve_descripcion"] == "original"
+
+
+def test_invalid_file_is_a_400_and_its_batch_is_rolled_back(client):
+    r = client.post("/materials/bulk?format=ndjson", content=b'{"sap": "IMP-X"}\n[1, 2]\n')
+    assert r.status_code == 400
+    db = SessionLocal()
+    try:
+        assert db.query(models.Material).filter(models.Material.sap == "IMP-X").count() == 0
+    finally:
+        db.close()
@@ -0,0 +1,67 @@
+# tests/test_metrics.py
+# /metrics: etiquetas por ruta declarada (no la URL con ids), status, SQL por request,
+# el detector de N+1 y el formato de texto de Prometheus.
+import re
+
+import metrics
+
+
+def scrape(client):
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"] == metrics.PROMETHEUS_CONTENT_TYPE
+    return r.text
+
+
+def value(text, name, **labels):
+    """Valor de una serie (la línea con exactamente esas etiquetas) o 0."""
+    want = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    pattern = rf"^{re.escape(name)}{re.escape('{' + want + '}') if want else ''} (\S+)$"
+    m = re.search(pattern, text, flags=re.M)
+    return float(m.group(1)) if m else 0.0
+
+
+def test_requests_are_labelled_by_route_template(client):
+    tecnico_id = client.post("/tecnicos/", json={"nombre": "MET uno"}).json()["id"]
+    before = scrape(client)
+    client.get(f"/tecnicos/{tecnico_id}")
+    client.get("/tecnicos/999999")
+    client.get("/no-existe")
+    after = scrape(client)
+
+    route = {"method": "GET", "route": "/tecnicos/{tecnico_id}"}
+    for status in ("200", "404"):
+        assert value(after, "http_requests_total", **route, status=status) == \
+            value(before, "http_requests_total", **route, status=status) + 1
+    assert f"/tecnicos/{tecnico_id}" not in after
+    assert value(after, "http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    assert value(after, "http_request_sql_queries_count", **route) == \
+        value(before, "http_request_sql_queries_count", **route) + 2
+    assert value(after, "sql_statements_total") > value(before, "sql_statements_total")
+
+
+def test_not_modified_responses_are_counted(client):
+    etag = client.get("/materials/?limit=1").headers["etag"]
+    before = scrape(client)
+    assert client.get("/materials/?limit=1", headers={"If-None-Match": etag}).status_code == 304
+    route = {"method": "GET", "route": "/materials/", "status": "304"}
+    assert value(scrape(client), "http_requests_total", **route) == value(before, "http_requests_total", **route) + 1
+
+
+def test_histograms_are_cumulative(client):
+    client.get("/health")
+    text = scrape(client)
+    route = {"method": "GET", "route": "/health"}
+    buckets = [float(v) for v in re.findall(
+        r'^http_request_duration_seconds_bucket\{method="GET",route="/health",le="[^"]+"\} (\S+)$', text, re.M)]
+    assert buckets == sorted(buckets) and buckets[-1] == value(text, "http_request_duration_seconds_count", **route)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+
+
+def test_repeated_statements_flag_n_plus_one_unless_batched():
+    stats = metrics.RequestStats()
+    for _ in range(metrics.N_PLUS_ONE_THRESHOLD):
+        stats.add_query("SELECT 1", 0.001)
+    stats.add_query("SELECT 2", 0.001)
+    assert stats.repeated() == [("SELECT 1", metrics.N_PLUS_ONE_THRESHOLD)]
+    stats.batched = True
+    assert stats.repeated() == []
@@ -0,0 +1,93 @@
+# tests/test_ot_events.py
+# Bus de eventos de /ots/stream: replay desde Last-Event-ID, `reset` cuando el id no lo
+# emitió este proceso (otro arranque / otro worker) o ya salió del buffer, y `ready`
+# como primer evento del stream, antes de cualquier delta.
+import asyncio
+
+import ot_events
+from invariants import make_refs, ot_payload
+
+
+def drain(q):
+    out = []
+    while not q.empty():
+        out.append(q.get_nowait())
+    return out
+
+
+def events(msgs):
+    return [next(l[7:] for l in m.splitlines() if l.startswith("event: ")) for m in msgs]
+
+
+def last_id(msgs):
+    return next(l[4:] for l in msgs[-1].splitlines() if l.startswith("id: "))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_replay_from_last_event_id():
+    async def go():
+        bus = ot_events.OTEventBus()
+        q = bus.subscribe()
+        bus.publish(ot_events.OT_CREATED, {"id": 1})
+        seen = drain(q)
+        bus.publish(ot_events.OT_UPDATED, {"id": 1, "pendiente": False})
+        bus.publish(ot_events.OT_CREATED, {"id": 2})
+        return drain(bus.subscribe(last_id(seen)))
+    replay = run(go())
+    assert events(replay) == [ot_events.OT_UPDATED, ot_events.OT_CREATED]
+    assert '"id":2' in replay[1]
+
+
+def test_unknown_ids_get_a_reset():
+    async def go():
+        bus, other = ot_events.OTEventBus(), ot_events.OTEventBus()
+        bus.publish(ot_events.OT_CREATED, {"id": 1})
+        other.publish(ot_events.OT_CREATED, {"id": 9})
+        other_id = last_id(drain(other.subscribe(f"{other.boot}-0")))
+        return [events(drain(bus.subscribe(i)))
+                for i in (other_id, f"{bus.boot}-99", f"{bus.boot}-x", "basura")]
+    assert run(go()) == [[ot_events.RESET]] * 4
+
+
+def test_ids_older_than_the_buffer_get_a_reset():
+    async def go():
+        bus = ot_events.OTEventBus(buffer_size=2)
+        for i in range(5):
+            bus.publish(ot_events.OT_CREATED, {"id": i})
+        return events(drain(bus.subscribe(f"{bus.boot}-1"))), events(drain(bus.subscribe(f"{bus.boot}-3")))
+    assert run(go()) == ([ot_events.RESET], [ot_events.OT_CREATED, ot_events.OT_CREATED])
+
+
+def test_stream_starts_with_ready_and_keeps_the_event_id():
+    class Request:
+        async def is_disconnected(self):
+            return True
+
+    async def go():
+        bus = ot_events.OTEventBus()
+        stream = bus.stream(Request())
+        first = await stream.__anext__()
+        bus.publish(ot_events.OT_CREATED, {"id": 1})
+        second = await stream.__anext__()
+        await stream.aclose()
+        return first, second, bus.subscribers
+    first, second, subscribers = run(go())
+    assert "event: ready" in first and "id:" not in first
+    assert events([second]) == [ot_events.OT_CREATED]
+    assert subscribers == 0
+
+
+def test_writes_publish_the_full_ot(client):
+    refs = make_refs(client, "EVT")
+    q = ot_events.bus.subscribe()
+    try:
+        ot = client.post("/ots/", json=ot_payload(refs.saps[0], refs.tecs[0])).json()
+        client.post(f"/admin/ots/{ot['id']}/close")
+        msgs = drain(q)
+    finally:
+        ot_events.bus.unsubscribe(q)
+    assert events(msgs) == [ot_events.OT_CREATED, ot_events.OT_UPDATED]
+    assert f'"id_ot":"{ot["id_ot"]}"' in msgs[0] and '"pendiente":false' in msgs[1]
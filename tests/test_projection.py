@@ -0,0 +1,47 @@
+# tests/test_projection.py
+# Camino rápido de los listados (projection.py): el mismo JSON que response_model,
+# `fields` en el orden del schema, 400 con campos desconocidos y fechas como pydantic.
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import projection
+from invariants import make_refs, ot_payload
+
+
+@pytest.fixture(scope="module")
+def refs(client):
+    refs = make_refs(client, "PRJ")
+    refs.ot = client.post("/ots/", json=ot_payload(refs.saps[0], refs.tecs[0], "2026-07-01T08:30:00Z",
+                                                   observaciones="ñandú")).json()
+    return refs
+
+
+def test_listing_matches_the_response_model(client, refs):
+    listed = next(o for o in client.get("/ots/?limit=1000").json() if o["id"] == refs.ot["id"])
+    assert listed == client.get(f"/ots/{refs.ot['id']}").json() == refs.ot
+    material = client.get("/materials/", params={"sap": refs.saps[0]}).json()[0]
+    assert material == client.get(f"/materials/{material['id']}").json()
+
+
+def test_fields_keep_the_schema_order(client, refs):
+    r = client.get("/materials/", params={"sap": refs.saps[0], "fields": "breve_descripcion, sap"})
+    assert list(r.json()[0]) == ["sap", "breve_descripcion"]
+    r = client.get("/admin/ots/pending", params={"fields": "id_ot,id", "limit": 1})
+    assert list(r.json()[0]) == [f for f in projection.OT_FIELDS if f in ("id", "id_ot")]
+
+
+def test_unknown_field_is_a_400(client, refs):
+    r = client.get("/ots/", params={"fields": "id,password"})
+    assert r.status_code == 400 and "password" in r.json()["detail"]
+
+
+def test_datetimes_are_encoded_like_pydantic():
+    aware = datetime(2026, 7, 1, 8, 30, tzinfo=timezone.utc)
+    naive = datetime(2026, 7, 1, 8, 30, 0, 123000)
+    other = datetime(2026, 7, 1, 8, 30, tzinfo=timezone(timedelta(hours=-3)))
+    expected = ["2026-07-01T08:30:00Z", "2026-07-01T08:30:00.123000", "2026-07-01T08:30:00-03:00"]
+    assert json.loads(projection.FastJSONResponse([aware, naive, other]).body) == expected
+    # sin orjson (dependencia opcional) el resultado es el mismo
+    assert json.loads(json.dumps([aware, naive, other], default=projection._json_default)) == expected
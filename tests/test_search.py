@@ -0,0 +1,54 @@
+# tests/test_search.py
+# /materials/?q= sobre el índice FTS5: sin importar mayúsculas ni acentos, por prefijo,
+# todas las palabras (AND) y ordenado por relevancia (breve_descripcion pesa más).
+import pytest
+
+import search
+
+MATERIALS = [
+    {"sap": "FTS-1", "breve_descripcion": "Módulo transmisor óptico", "descripcion": "Equipo de cabecera",
+     "marca": "CISCO", "tipo": "TRANSMISOR"},
+    {"sap": "FTS-2", "breve_descripcion": "Fuente 90V", "descripcion": "Reemplaza el módulo de potencia",
+     "marca": "AURORA", "tipo": "FUENTE"},
+    {"sap": "FTS-3", "breve_descripcion": "Amplificador de línea", "descripcion": "Línea troncal",
+     "marca": "ARRIS", "tipo": "AMPLIFICADOR RF"},
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def materials(client):
+    for m in MATERIALS:
+        assert client.post("/materials/", json=m).status_code == 201
+    assert search.FTS_ENABLED
+
+
+def saps(client, q, **params):
+    r = client.get("/materials/", params={"q": q, "fields": "sap", **params})
+    assert r.status_code == 200
+    return [m["sap"] for m in r.json() if m["sap"].startswith("FTS-")]
+
+
+def test_accents_and_case_do_not_matter(client):
+    assert saps(client, "MODULO") == saps(client, "módulo") == ["FTS-1", "FTS-2"]
+    assert saps(client, "linea") == ["FTS-3"]
+
+
+def test_words_are_prefixes_and_all_must_match(client):
+    assert saps(client, "transm cis") == ["FTS-1"]
+    assert saps(client, "amplif cisco") == []
+
+
+def test_breve_descripcion_ranks_first(client):
+    # "módulo" está en la breve de FTS-1 y solo en la descripción larga de FTS-2
+    assert saps(client, "modulo")[0] == "FTS-1"
+
+
+def test_index_follows_updates(client):
+    client.post("/materials/bulk?format=ndjson",
+                content=b'{"sap": "FTS-3", "breve_descripcion": "Amplificador puente"}\n',
+                headers={"Content-Type": "application/x-ndjson"})
+    assert saps(client, "puente") == ["FTS-3"]
+
+
+def test_query_without_words_does_not_fail(client):
+    assert client.get("/materials/", params={"q": "%%"}).status_code == 200
@@ -0,0 +1,33 @@
+# tests/test_suggest.py
+# /materials/suggest: pares [sap, breve] por prefijo, en orden, con tope, y el índice
+# en memoria al día con las altas y las importaciones.
+import pytest
+
+
+@pytest.fixture(scope="module", autouse=True)
+def materials(client):
+    for sap, breve in (("SUG-0102", "Nodo"), ("SUG-0100", "Fuente"), ("SUG-0200", None), ("SUG-0101", "Tap")):
+        assert client.post("/materials/", json={"sap": sap, "breve_descripcion": breve}).status_code == 201
+
+
+def suggest(client, sap, **params):
+    r = client.get("/materials/suggest", params={"sap": sap, **params})
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_prefix_matches_in_order(client):
+    assert suggest(client, "SUG-01") == [["SUG-0100", "Fuente"], ["SUG-0101", "Tap"], ["SUG-0102", "Nodo"]]
+    assert suggest(client, "SUG-02") == [["SUG-0200", ""]]
+    assert suggest(client, "SUG-03") == []
+
+
+def test_limit_is_clamped(client):
+    assert len(suggest(client, "SUG-", limit=2)) == 2
+    assert len(suggest(client, "SUG-", limit=0)) == 1
+
+
+def test_new_and_imported_materials_show_up(client):
+    client.post("/materials/", json={"sap": "SUG-0103", "breve_descripcion": "Nueva"})
+    client.post("/materials/bulk?format=ndjson", content=b'{"sap": "SUG-0104", "breve_descripcion": "Importada"}\n')
+    assert suggest(client, "SUG-010")[-2:] == [["SUG-0103", "Nueva"], ["SUG-0104", "Importada"]]
@@ -0,0 +1,56 @@
+# tests/test_timeseries.py
+# Series de OTs (timeseries.py): inicio / fin se guardan en UTC naive aunque lleguen con
+# otro offset (alta, PUT, bulk-update), así las series incrementales coinciden con el
+# backfill; /admin/ots/timeseries y los percentiles de ciclo.
+import pytest
+
+import timeseries
+from invariants import assert_consistent, make_refs, ot_payload
+
+
+@pytest.fixture(scope="module")
+def refs(client):
+    return make_refs(client, "TS")
+
+
+def test_offsets_are_stored_as_utc(client, refs):
+    s1, s2, _ = refs.saps
+    ot = client.post("/ots/", json=ot_payload(s1, None, "2026-03-01T22:30:00-03:00")).json()
+    assert ot["inicio"] == "2026-03-02T01:30:00"
+    batch = client.post("/ots/batch", json=[ot_payload(s2, None, "2026-03-05T23:00:00-05:00")] * 2).json()
+    assert [o["inicio"] for o in batch] == ["2026-03-06T04:00:00"] * 2
+
+    r = client.put(f"/admin/ots/{ot['id']}", json={"pendiente": False, "fin": "2026-03-02T21:30:00-03:00"})
+    assert r.json()["fin"] == "2026-03-03T00:30:00"
+    r = client.post("/admin/ots/bulk-update", json={"sap_id": s2, "pendiente": True,
+                                                    "changes": {"pendiente": False, "fin": "2026-03-06T10:00:00+06:00"}})
+    assert [o["fin"] for o in r.json()["ots"]] == ["2026-03-06T04:00:00"] * 2
+    assert_consistent()
+
+
+def test_series_by_day_and_material(client, refs):
+    s1, s2, _ = refs.saps
+    params = {"from": "2026-03-01T00:00:00Z", "to": "2026-03-08T00:00:00Z", "group_by": "material"}
+    r = client.get("/admin/ots/timeseries", params={**params, "key": s1})
+    assert r.status_code == 200
+    points = {(p["period"][:10], p["key"]): p for p in r.json()["series"]}
+    # abierta el 02 (UTC, no el 01 local), cerrada el 03 tras 23 h
+    assert points[("2026-03-02", s1)]["abiertas"] == 1 and ("2026-03-01", s1) not in points
+    assert points[("2026-03-03", s1)]["cerradas"] == 1
+    assert points[("2026-03-03", s1)]["ciclo_promedio_h"] == pytest.approx(23.0)
+    totales = client.get("/admin/ots/timeseries", params={**params, "key": s2}).json()["totales"]
+    assert totales == [{"key": s2, "abiertas": 2, "cerradas": 2, "ciclo_promedio_h": 0.0,
+                        "ciclo_p50_h": 0.0, "ciclo_p90_h": 0.0, "ciclo_p95_h": 0.0}]
+
+
+def test_invalid_ranges_are_a_400(client, refs):
+    assert client.get("/admin/ots/timeseries", params={"from": "2026-03-02", "to": "2026-03-01"}).status_code == 400
+    assert client.get("/admin/ots/timeseries", params={"grain": "minute"}).status_code == 400
+    assert client.get("/admin/ots/timeseries", params={"from": "2026-01-01", "to": "2026-03-01",
+                                                       "grain": "hour"}).status_code == 400
+
+
+def test_cycle_percentiles_stay_within_observed_range():
+    # todos los ciclos en ~0 h: los percentiles no pueden quedar en la mitad del primer bucket
+    assert [timeseries.percentile_from_hist({0: 10}, p, 0.0) for p in (50, 90, 95)] == [0.0, 0.0, 0.0]
+    assert timeseries.percentile_from_hist({}, 50) is None
@@ -0,0 +1,122 @@
+# tests/test_write_queue.py
+# Escritor por lotes (write_queue.py): los pedidos inválidos no tiran abajo el lote, un
+# lote que volvió atrás se reintenta de a uno, uno ya grabado no se reintenta nunca
+# (duplicaría altas) y cada pedido recibe su propio error.
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import models
+import ot_service
+import write_queue
+from database import SessionLocal
+from invariants import assert_consistent, make_refs, ot_payload
+from schemas import OTCreate
+
+
+@pytest.fixture(scope="module")
+def refs(client):
+    refs = make_refs(client, "WQ")
+    refs.open_id = client.post("/ots/", json=ot_payload(refs.saps[0], refs.tecs[0])).json()["id"]
+    return refs
+
+
+def item(kind, payload):
+    """Pedido de la cola sin future (apply_batch solo usa kind / payload)."""
+    return SimpleNamespace(kind=kind, payload=payload)
+
+
+def count_ots(sap):
+    db = SessionLocal()
+    try:
+        return db.query(models.OT).filter(models.OT.sap_id == sap).count()
+    finally:
+        db.close()
+
+
+def test_write_queue_isolates_invalid_items(client, refs):
+    s1 = refs.saps[0]
+    db = SessionLocal()
+    try:
+        results = write_queue.apply_batch(db, [
+            item(write_queue.CREATE, OTCreate(**ot_payload(s1, None, "2026-03-10T09:00:00Z"))),
+            item(write_queue.CREATE, OTCreate(**ot_payload("NO-EXISTE"))),
+            item(write_queue.CLOSE, 10 ** 9),
+            item(write_queue.CLOSE, refs.open_id),
+        ])
+    finally:
+        db.close()
+    assert [ok for ok, _ in results] == [True, False, False, True]
+    assert results[1][1].status_code == 400 and results[2][1].status_code == 404
+    assert results[3][1]["pendiente"] is False and results[3][1]["fin"].tzinfo is None
+    assert_consistent()
+
+
+def test_closes_lock_the_rows(refs, monkeypatch):
+    calls = []
+    load_ots = ot_service.load_ots
+    monkeypatch.setattr(ot_service, "load_ots", lambda db, ids, for_update=False:
+                        calls.append(for_update) or load_ots(db, ids, for_update))
+    db = SessionLocal()
+    try:
+        write_queue.apply_batch(db, [item(write_queue.CLOSE, refs.open_id)])
+    finally:
+        db.close()
+    assert calls == [True, False]   # la lectura para el cierre, después la relectura
+
+
+def test_rolled_back_batch_is_retried_one_by_one(refs, monkeypatch):
+    s2 = refs.saps[1]
+    allocate = ot_service.allocate_ot_numbers
+    fails = iter([True])
+
+    def flaky(db, n=1):
+        if next(fails, False):
+            raise OperationalError("UPDATE ot_counters", {}, Exception("database is locked"))
+        return allocate(db, n)
+    monkeypatch.setattr(ot_service, "allocate_ot_numbers", flaky)
+    before = count_ots(s2)
+    batch = [item(write_queue.CREATE, OTCreate(**ot_payload(s2))) for _ in range(3)]
+    results = write_queue.WriteQueue(SessionLocal)._write(batch)
+    assert [ok for ok, _ in results] == [True, True, True]
+    assert count_ots(s2) == before + 3
+
+
+def test_committed_batch_is_not_retried(refs, monkeypatch):
+    s3 = refs.saps[2]
+
+    def reload_fails(db, results, touched):
+        raise OperationalError("SELECT ots", {}, Exception("disk I/O error"))
+    monkeypatch.setattr(write_queue, "finish_batch", reload_fails)
+    before = count_ots(s3)
+    batch = [item(write_queue.CREATE, OTCreate(**ot_payload(s3))) for _ in range(3)]
+    with pytest.raises(OperationalError):
+        write_queue.WriteQueue(SessionLocal)._write(batch)
+    # grabadas una sola vez: el error de después del commit no dispara el reintento
+    assert count_ots(s3) == before + 3
+    assert_consistent()
+
+
+def test_write_queue_failed_batch_gets_one_error_per_item():
+    async def run():
+        queue = write_queue.WriteQueue(SessionLocal)
+
+        def boom(batch):
+            raise RuntimeError("falla el lote")
+        queue._write = boom
+        loop = asyncio.get_running_loop()
+        items = [write_queue._Item(write_queue.CLOSE, 1, loop.create_future()) for _ in range(3)]
+        await queue._flush(items)
+        return [i.future.exception() for i in items]
+
+    errors = asyncio.run(run())
+    assert len({id(e) for e in errors}) == 3
+    assert all(e.status_code == 500 and isinstance(e.__cause__, RuntimeError) for e in errors)
+
+
+def test_stats_say_the_writer_is_per_process():
+    stats = write_queue.WriteQueue(SessionLocal).stats()
+    assert stats["scope"] == "process" and stats["pid"] == os.getpid()
@@ -0,0 +1,292 @@
+# timeseries.py
+# Series de tiempo de OTs para tableros: por día y por hora, OTs abiertas (según inicio)
+# y cerradas (según fin) con su tiempo de ciclo (fin - inicio), en total y por material,
+# tipo, marca y técnico. Igual que rollups.py, cada alta / cierre / edición aplica su
+# delta en la misma transacción, así /admin/ots/timeseries no recorre ots.
+# Los percentiles del tiempo de ciclo salen de un histograma por período (buckets
+# logarítmicos en CYCLE_BOUNDS_H), interpolados dentro del bucket: son aproximados.
+#
+# Los períodos son en UTC; tipo / marca son los del material al momento del alta / cierre.
+#
+# Variables de entorno:
+#   TIMESERIES_GRAINS=day,hour     granularidades que se mantienen
+#
+# Para llenar las series con las OTs existentes (o si se desincronizan):
+#   python timeseries.py backfill
+# El backfill es lineal en la cantidad de OTs (~8 s cada 20k, unos minutos con 1M);
+# migrations.upgrade lo corre solo si las series están vacías y ya hay OTs.
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+
+import cache
+import models
+from database import dialect_insert
+
+GRAINS = ("day", "hour")
+TIMESERIES_GRAINS = tuple(g for g in (x.strip() for x in os.getenv("TIMESERIES_GRAINS", "day,hour").split(","))
+                          if g in GRAINS)
+DIMS = ("all", "material", "tipo", "marca", "tecnico")
+COUNTERS = ("abiertas", "cerradas", "ciclo_n", "ciclo_sum_s")
+# límite superior (horas) de cada bucket del histograma; después del último queda uno abierto
+CYCLE_BOUNDS_H = (0.5, 1, 2, 4, 8, 12, 24, 36, 48, 72, 96, 120, 168, 240, 336, 504, 720)
+PERCENTILES = (50, 90, 95)
+# rango máximo por consulta (puntos = períodos x claves)
+MAX_RANGE = {"day": timedelta(days=731), "hour": timedelta(days=31)}
+BACKFILL_YIELD_PER = 5000
+
+
+def _utc(dt):
+    """Parámetros desde / hasta a naive en UTC, como se guardan inicio / fin."""
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def truncate(dt, grain):
+    if grain == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def cycle_bucket(seconds):
+    return bisect_left(CYCLE_BOUNDS_H, seconds / 3600.0)
+
+
+def state_of(ot):
+    """Lo que cuenta de una OT para las series (None = la OT no existe). fin solo si está cerrada."""
+    pendiente = True if ot.pendiente is None else bool(ot.pendiente)
+    # inicio / fin ya se guardan en UTC naive (ot_service.naive_utc al escribir)
+    return (ot.sap_id, ot.id_tecnico, ot.inicio, None if pendiente else ot.fin)
+
+
+def _keys(state, material):
+    sap_id, id_tecnico, _, _ = state
+    material = material or {}
+    return [("all", ""), ("material", sap_id), ("tipo", material.get("tipo") or ""),
+            ("marca", material.get("marca") or ""), ("tecnico", "" if id_tecnico is None else str(id_tecnico))]
+
+
+def _new_deltas():
+    return defaultdict(lambda: dict.fromkeys(COUNTERS, 0)), defaultdict(int)
+
+
+def _add(deltas, hist, state, material, sign, grains, opened=True, closed=True):
+    _, _, inicio, fin = state
+    keys = _keys(state, material)
+    cycle = max(0.0, (fin - inicio).total_seconds()) if fin is not None and inicio is not None else None
+    for grain in grains:
+        if opened and inicio is not None:
+            period = truncate(inicio, grain)
+            for dim, key in keys:
+                deltas[(grain, dim, period, key)]["abiertas"] += sign
+        if closed and fin is not None:
+            period = truncate(fin, grain)
+            for dim, key in keys:
+                d = deltas[(grain, dim, period, key)]
+                d["cerradas"] += sign
+                if cycle is not None:
+                    d["ciclo_n"] += sign
+                    d["ciclo_sum_s"] += sign * cycle
+                    hist[(grain, dim, period, key, cycle_bucket(cycle))] += sign
+
+
+def _upsert(db, deltas, hist):
+    rows = [{"grain": g, "dim": d, "period": p, "key": k, **v}
+            for (g, d, p, k), v in deltas.items() if any(v.values())]
+    if rows:
+        table = models.OTTimeseries.__table__
+        stmt = dialect_insert(db, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["grain", "dim", "period", "key"],
+            set_={c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+        )
+        db.execute(stmt, rows)
+    hrows = [{"grain": g, "dim": d, "period": p, "key": k, "bucket": b, "n": n}
+             for (g, d, p, k, b), n in hist.items() if n]
+    if hrows:
+        table = models.OTCycleHistogram.__table__
+        stmt = dialect_insert(db, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["grain", "dim", "period", "key", "bucket"],
+            set_={"n": table.c.n + stmt.excluded.n},
+        )
+        db.execute(stmt, hrows)
+    return len(rows), len(hrows)
+
+
+def apply_changes(db, changes, grains=TIMESERIES_GRAINS):
+    """
+    changes: iterable de (estado_antes, estado_despues) de timeseries.state_of; None en el alta.
+    Upsert de los períodos afectados en cada granularidad. No hace commit.
+    """
+    if not grains:
+        return
+    deltas, hist = _new_deltas()
+    for before, after in changes:
+        if before == after:
+            continue
+        for state, sign in ((before, -1), (after, +1)):
+            if state is not None:
+                _add(deltas, hist, state, cache.material_by_sap(db, state[0]), sign, grains)
+    _upsert(db, deltas, hist)
+
+
+def apply_change(db, before, after):
+    apply_changes(db, [(before, after)])
+
+
+# ---- backfill ----
+
+def _backfill_pass(db, model, order_col, grains, opened, closed):
+    """
+    Recorre una tabla ordenada por inicio (altas) o por fin (cierres) y hace el upsert de
+    a un día por vez: la memoria queda acotada a las claves de un día.
+    """
+    ot = model
+    stmt = (select(ot.sap_id, ot.id_tecnico, ot.inicio, ot.fin, ot.pendiente,
+                   models.Material.tipo, models.Material.marca)
+            .outerjoin(models.Material, models.Material.sap == ot.sap_id)
+            .where(order_col.isnot(None)))
+    if closed:
+        stmt = stmt.where(ot.pendiente == False)
+    stmt = stmt.order_by(order_col).execution_options(yield_per=BACKFILL_YIELD_PER)
+    deltas, hist = _new_deltas()
+    current = None
+    n = 0
+    for r in db.execute(stmt):
+        day = truncate(getattr(r, order_col.key), "day")
+        if day != current:
+            _upsert(db, deltas, hist)
+            deltas, hist = _new_deltas()
+            current = day
+        _add(deltas, hist, state_of(r), {"tipo": r.tipo, "marca": r.marca}, 1, grains, opened, closed)
+        n += 1
+    _upsert(db, deltas, hist)
+    return n
+
+
+def backfill(db, grains=TIMESERIES_GRAINS):
+    """Recalcula las series desde ots + ots_archive (tipo / marca actuales del material). Hace commit."""
+    db.execute(delete(models.OTTimeseries))
+    db.execute(delete(models.OTCycleHistogram))
+    counts = {"abiertas": 0, "cerradas": 0}
+    if grains:
+        for model in (models.OT, models.OTArchive):
+            counts["abiertas"] += _backfill_pass(db, model, model.inicio, grains, opened=True, closed=False)
+            counts["cerradas"] += _backfill_pass(db, model, model.fin, grains, opened=False, closed=True)
+    db.commit()
+    return counts
+
+
+# ---- consultas ----
+
+def percentile_from_hist(counts, p, mean_h=None):
+    """
+    Percentil (horas) de un histograma {bucket: n}, interpolando linealmente dentro del bucket.
+    Si todo cae en un solo bucket y se pasa el promedio (mean_h), se interpola en el tramo
+    del bucket centrado en el promedio: con todos los ciclos en ~0 h da 0, no la mitad del bucket.
+    """
+    buckets = [b for b in sorted(counts) if counts[b] > 0]
+    total = sum(counts[b] for b in buckets)
+    if total <= 0:
+        return None
+    target = p / 100.0 * total
+    acc = 0
+    for b in buckets:
+        n = counts[b]
+        if acc + n >= target:
+            lower = CYCLE_BOUNDS_H[b - 1] if b > 0 else 0.0
+            if b >= len(CYCLE_BOUNDS_H):
+                return float(lower)   # bucket abierto: cota inferior
+            upper = CYCLE_BOUNDS_H[b]
+            if mean_h is not None and len(buckets) == 1:
+                mean_h = min(max(mean_h, lower), upper)
+                half = min(mean_h - lower, upper - mean_h)
+                lower, upper = mean_h - half, mean_h + half
+            return lower + (target - acc) / n * (upper - lower)
+        acc += n
+    return float(CYCLE_BOUNDS_H[-1])
+
+
+def _point(values, hist):
+    mean_h = values["ciclo_sum_s"] / values["ciclo_n"] / 3600.0 if values["ciclo_n"] > 0 else None
+    out = {"abiertas": values["abiertas"], "cerradas": values["cerradas"],
+           "ciclo_promedio_h": round(mean_h, 3) if mean_h is not None else None}
+    for p in PERCENTILES:
+        v = percentile_from_hist(hist, p, mean_h)
+        out[f"ciclo_p{p}_h"] = round(v, 3) if v is not None else None
+    return out
+
+
+def query(db, desde=None, hasta=None, grain="day", group_by="all", key=None):
+    """
+    Serie [desde, hasta) leída de ot_timeseries / ot_cycle_hist: un punto por (período, clave)
+    con datos y el total del rango por clave. ValueError si los parámetros no son válidos.
+    """
+    if grain not in TIMESERIES_GRAINS:
+        raise ValueError(f"grain debe ser uno de: {', '.join(TIMESERIES_GRAINS) or '(ninguno activo)'}")
+    if group_by not in DIMS:
+        raise ValueError(f"group_by debe ser uno de: {', '.join(DIMS)}")
+    hasta = _utc(hasta) or truncate(datetime.utcnow(), grain) + (timedelta(hours=1) if grain == "hour"
+                                                                   else timedelta(days=1))
+    desde = _utc(desde) or hasta - (timedelta(days=30) if grain == "day" else timedelta(days=2))
+    if desde >= hasta:
+        raise ValueError("from debe ser anterior a to")
+    if hasta - desde > MAX_RANGE[grain]:
+        raise ValueError(f"Rango máximo para grain={grain}: {MAX_RANGE[grain].days} días")
+
+    criteria = []
+    for m in (models.OTTimeseries, models.OTCycleHistogram):
+        c = [m.grain == grain, m.dim == group_by, m.period >= desde, m.period < hasta]
+        if key is not None:
+            c.append(m.key == key)
+        criteria.append(c)
+    ts, h = models.OTTimeseries, models.OTCycleHistogram
+    rows = db.execute(select(ts.period, ts.key, *[getattr(ts, c) for c in COUNTERS])
+                      .where(*criteria[0]).order_by(ts.period, ts.key)).all()
+    hist = defaultdict(dict)
+    totals_hist = defaultdict(lambda: defaultdict(int))
+    for period, k, bucket, n in db.execute(select(h.period, h.key, h.bucket, h.n).where(*criteria[1])):
+        hist[(period, k)][bucket] = n
+        totals_hist[k][bucket] += n
+
+    series = []
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for r in rows:
+        values = dict(zip(COUNTERS, r[2:]))
+        if not (values["abiertas"] or values["cerradas"]):
+            continue
+        series.append({"period": r.period, "key": r.key, **_point(values, hist.get((r.period, r.key), {}))})
+        t = totals[r.key]
+        for c in COUNTERS:
+            t[c] += values[c]
+    return {
+        "grain": grain,
+        "group_by": group_by,
+        "desde": desde,
+        "hasta": hasta,
+        "series": series,
+        "totales": [{"key": k, **_point(totals[k], totals_hist.get(k, {}))} for k in sorted(totals)],
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from database import SessionLocal
+
+    if sys.argv[1:] != ["backfill"]:
+        print("Uso: python timeseries.py backfill")
+        sys.exit(2)
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    try:
+        counts = backfill(db)
+    finally:
+        db.close()
+    print(f"Series recalculadas ({', '.join(TIMESERIES_GRAINS)}): {counts['abiertas']} altas, "
+          f"{counts['cerradas']} cierres en {time.perf_counter() - t0:.1f}s.")
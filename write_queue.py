@@ -0,0 +1,280 @@
+# write_queue.py
+# Modo write-behind (opcional) para las escrituras de OTs más frecuentes: alta (POST /ots/)
+# y cierre (POST /admin/ots/{id}/close). En vez de un commit por request, los pedidos se
+# encolan y un único escritor por proceso junta los que llegan dentro de una ventana corta
+# y los graba en una sola transacción. Con SQLite son menos commits peleando por el lock de
+# escritura (y menos fsync); cada request recibe igual su propia OT (con su id_ot) o su
+# error (400 / 404), como en el camino directo.
+#
+# Variables de entorno:
+#   WRITE_QUEUE=0                 1 = activar
+#   WRITE_QUEUE_WINDOW_MS=5       cuánto se espera desde el primer pedido para juntar el lote
+#   WRITE_QUEUE_MAX_BATCH=200     pedidos por transacción
+#   WRITE_QUEUE_MAX_DEPTH=10000   pedidos en cola como máximo; más -> 503
+#
+# El escritor es por proceso: con varios workers de uvicorn cada uno tiene el suyo, y se
+# pasa de un commit por request a un commit por lote y por worker (los lotes de distintos
+# workers siguen compitiendo por el lock de escritura). /health lo indica con
+# write_queue.scope = "process" y el pid.
+import asyncio
+import logging
+import os
+import time
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+import metrics
+import ot_service
+import rollups
+import timeseries
+
+WRITE_QUEUE = os.getenv("WRITE_QUEUE", "0") not in ("0", "false", "no", "")
+WRITE_QUEUE_WINDOW_MS = float(os.getenv("WRITE_QUEUE_WINDOW_MS", "5"))
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "200"))
+WRITE_QUEUE_MAX_DEPTH = int(os.getenv("WRITE_QUEUE_MAX_DEPTH", "10000"))
+
+CREATE = "create"
+CLOSE = "close"
+
+log = logging.getLogger("write_queue")
+
+batch_sizes = metrics.register(metrics.Histogram(
+    "write_queue_batch_size", "Pedidos por transacción del escritor de OTs",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)))
+wait_time = metrics.register(metrics.Histogram(
+    "write_queue_wait_seconds", "Desde que se encola un pedido hasta que se resuelve (cola + commit)", ("kind",)))
+items_total = metrics.register(metrics.Counter(
+    "write_queue_items_total", "Pedidos procesados por el escritor de OTs", ("kind", "outcome")))
+
+
+class _Item:
+    __slots__ = ("kind", "payload", "future", "t0")
+
+    def __init__(self, kind, payload, future):
+        self.kind = kind
+        self.payload = payload
+        self.future = future
+        self.t0 = time.perf_counter()
+
+
+def _db_error(e):
+    """Error para un pedido: una instancia nueva cada vez (no se comparte entre requests)."""
+    if isinstance(e, IntegrityError):
+        return HTTPException(status_code=400, detail="Error al insertar OT (posible constraint)")
+    err = HTTPException(status_code=500, detail="Error de base de datos al grabar la OT")
+    err.__cause__ = e
+    return err
+
+
+def stage_batch(db, items):
+    """
+    Agrega altas y cierres a la transacción de `db`, sin commit.
+    Devuelve (results, touched): results tiene los errores de los pedidos inválidos (que
+    no se graban, sin afectar al resto del lote) y None en los demás; touched son los
+    (posición, id) de las OTs a devolver después del commit.
+    """
+    results = [None] * len(items)
+    changes = []
+    ts_changes = []
+    touched = []   # (posición, id) de las OTs a devolver
+
+    creates = [(i, it.payload) for i, it in enumerate(items) if it.kind == CREATE]
+    if creates:
+        # validación por conjunto, como en POST /ots/batch
+        bad_saps, bad_tecs = map(set, ot_service.missing_references(db, [o for _, o in creates]))
+        valid = []
+        for i, ot_in in creates:
+            if ot_in.sap_id in bad_saps:
+                results[i] = (False, HTTPException(status_code=400, detail="Material (sap_id) no existe"))
+            elif ot_in.id_tecnico and ot_in.id_tecnico in bad_tecs:
+                results[i] = (False, HTTPException(status_code=400, detail="Tecnico indicado no existe"))
+            else:
+                valid.append((i, ot_in))
+        if valid:
+            first = ot_service.allocate_ot_numbers(db, len(valid))
+            new = [(i, ot_service.build_ot(ot_in, first + n)) for n, (i, ot_in) in enumerate(valid)]
+            db.add_all([ot for _, ot in new])
+            changes += [(None, rollups.state_of(ot)) for _, ot in new]
+            ts_changes += [(None, timeseries.state_of(ot)) for _, ot in new]
+            db.flush()
+            touched += [(i, ot.id) for i, ot in new]
+
+    closes = [(i, it.payload) for i, it in enumerate(items) if it.kind == CLOSE]
+    if closes:
+        # bloqueadas hasta el commit, como en el cierre directo (Postgres)
+        ids = sorted({ot_id for _, ot_id in closes})
+        found = {ot.id: ot for ot in ot_service.load_ots(db, ids, for_update=True)}
+        now = ot_service.close_time()
+        for i, ot_id in closes:
+            ot = found.get(ot_id)
+            if ot is None:
+                results[i] = (False, HTTPException(status_code=404, detail="OT no encontrada"))
+                continue
+            before, ts_before = rollups.state_of(ot), timeseries.state_of(ot)
+            ot.pendiente = False
+            ot.fin = now
+            changes.append((before, rollups.state_of(ot)))
+            ts_changes.append((ts_before, timeseries.state_of(ot)))
+            touched.append((i, ot_id))
+
+    rollups.apply_changes(db, changes)
+    timeseries.apply_changes(db, ts_changes)
+    return results, touched
+
+
+def finish_batch(db, results, touched):
+    """Completa results con las OTs grabadas (después del commit de stage_batch)."""
+    # una sola consulta para devolverlas (mismos valores que un refresh)
+    loaded = {ot.id: ot_service.ot_to_dict(ot) for ot in ot_service.load_ots(db, sorted({x for _, x in touched}))}
+    for i, ot_id in touched:
+        results[i] = (True, loaded[ot_id])
+    return results
+
+
+def apply_batch(db, items):
+    """
+    Graba altas y cierres en la transacción de `db` (un solo commit).
+    Devuelve [(ok, ot_dict | HTTPException)] en el orden de `items`.
+    """
+    results, touched = stage_batch(db, items)
+    db.commit()
+    return finish_batch(db, results, touched)
+
+
+class WriteQueue:
+    def __init__(self, session_factory, window_ms=WRITE_QUEUE_WINDOW_MS, max_batch=WRITE_QUEUE_MAX_BATCH,
+                 max_depth=WRITE_QUEUE_MAX_DEPTH):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_depth = max_depth
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.last_batch = 0
+
+    # ---- ciclo de vida (lifespan de la app) ----
+
+    def start(self):
+        self.queue = asyncio.Queue(self.max_depth)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Graba lo que quedó en cola y termina."""
+        if self.task is None:
+            return
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    @property
+    def depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def stats(self):
+        # scope: un escritor por proceso, no uno compartido entre workers
+        return {"scope": "process", "pid": os.getpid(), "running": self.running, "depth": self.depth,
+                "batches": self.batches, "last_batch": self.last_batch, "window_ms": self.window * 1000.0,
+                "max_batch": self.max_batch}
+
+    # ---- API para los endpoints ----
+
+    async def submit(self, kind, payload):
+        if not self.running:
+            raise HTTPException(status_code=503, detail="Cola de escritura detenida")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait(_Item(kind, payload, future))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Cola de escritura llena; reintentar")
+        return await future
+
+    async def create_ot(self, ot_in):
+        """Encola el alta; devuelve la OT creada (dict con id e id_ot)."""
+        return await self.submit(CREATE, ot_in)
+
+    async def close_ot(self, ot_id):
+        """Encola el cierre; devuelve la OT cerrada (dict)."""
+        return await self.submit(CLOSE, ot_id)
+
+    # ---- escritor ----
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                return
+            # ventana: se espera un poco a que lleguen más pedidos (salvo que ya haya un lote lleno)
+            if self.window > 0 and self.queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.window)
+            batch = [item]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                nxt = self.queue.get_nowait()
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            results = await run_in_threadpool(self._write, batch)
+        except Exception as e:
+            log.exception("Falló el lote de %d pedidos", len(batch))
+            results = [(False, _db_error(e)) for _ in batch]
+        self.batches += 1
+        self.last_batch = len(batch)
+        batch_sizes.observe(len(batch))
+        now = time.perf_counter()
+        for item, (ok, value) in zip(batch, results):
+            items_total.inc(item.kind, "ok" if ok else "error")
+            wait_time.observe(now - item.t0, item.kind)
+            if item.future.done():   # el cliente se desconectó
+                continue
+            if ok:
+                item.future.set_result(value)
+            else:
+                item.future.set_exception(value)
+
+    def _write(self, batch):
+        db = self.session_factory()
+        try:
+            try:
+                results, touched = stage_batch(db, batch)
+                db.commit()
+            except SQLAlchemyError:
+                # no se grabó nada: el lote entero volvió atrás
+                db.rollback()
+                if len(batch) == 1:
+                    raise
+            else:
+                # ya está grabado: si falla la relectura no se reintenta (duplicaría las altas)
+                return finish_batch(db, results, touched)
+            # falló el lote entero (constraint, lock): se reintenta de a uno para aislar al culpable
+            results = []
+            for item in batch:
+                try:
+                    results.extend(apply_batch(db, [item]))
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    results.append((False, _db_error(e)))
+            return results
+        finally:
+            db.close()
+
+
+# instancia del proceso (None = modo directo, un commit por request)
+writer = None
+if WRITE_QUEUE:
+    from database import SessionLocal
+
+    writer = WriteQueue(SessionLocal)
+    metrics.gauge("write_queue_depth", "Pedidos esperando en la cola de escritura", lambda: writer.depth)
+    metrics.gauge("write_queue_last_batch_size", "Pedidos en el último lote grabado", lambda: writer.last_batch)